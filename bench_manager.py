@@ -0,0 +1,162 @@
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+
+# Keep password hashing cheap so user operations measure the data store, not bcrypt.
+os.environ.setdefault("TRELLOMIZE_BCRYPT_ROUNDS", "4")
+
+from manager import (TASK_STATUSES, DataManager, ProjectManager, TaskManager,
+                     UserManager, generate_workspace)
+
+
+def build_fixture(directory, tasks, projects, users, comments, assignees):
+    """
+    Writes a synthetic workspace with roughly the given number of tasks
+    spread evenly over projects and statuses.
+    """
+    per_status = max(1, tasks // (projects * len(TASK_STATUSES)))
+    user_data, data = generate_workspace(
+        users, projects, {status: per_status for status in TASK_STATUSES}, comments, assignees
+    )
+    user_file = os.path.join(directory, "users.json")
+    data_file = os.path.join(directory, "data.json")
+    DataManager(user_file, data_file).write_workspace(user_data, data)
+    return user_file, data_file
+
+
+def operations(user_file, data_file):
+    """
+    Returns (name, function of the repetition number) pairs. They run in
+    order once per repetition and leave the workspace as they found it.
+    """
+    users = UserManager(user_file, data_file)
+    projects = ProjectManager(user_file, data_file)
+    tasks = TaskManager(user_file, data_file)
+    project = "Project 0"
+    task = "bench-task-{}".format
+    comment_ids = {}
+
+    def add_comment(i):
+        comment_ids[i] = tasks.add_comment(project, task(i), "Benchmark comment", "user0")["id"]
+
+    return [
+        ("UserManager.get_user", lambda i: users.get_user("user1")),
+        ("UserManager.get_members", lambda i: users.get_members()),
+        ("UserManager.list_users", lambda i: users.list_users({"is_active": True, "min_projects": 1}, 0, 50)),
+        ("UserManager.create_user", lambda i: users.create_user(f"bench-user-{i}", "password", True, "bench@example.com")),
+        ("UserManager.update_user", lambda i: users.update_user(f"bench-user-{i}", {"email": "changed@example.com"})),
+        ("ProjectManager.get_project", lambda i: projects.get_project(project)),
+        ("ProjectManager.list_projects", lambda i: projects.list_projects()),
+        ("ProjectManager.get_projects_for_user", lambda i: projects.get_projects_for_user("user1")),
+        ("ProjectManager.get_member_role", lambda i: projects.get_member_role(project, "user0")),
+        ("ProjectManager.is_project_owner", lambda i: projects.is_project_owner(project, "user0")),
+        ("ProjectManager.create_project", lambda i: projects.create_project(f"bench-project-{i}", "01/01/2024", "user0")),
+        ("ProjectManager.add_member", lambda i: projects.add_member(f"bench-project-{i}", "user1", "member", projects)),
+        ("ProjectManager.remove_member_from_project", lambda i: projects.remove_member_from_project(f"bench-project-{i}", "user1")),
+        ("ProjectManager.delete_project", lambda i: projects.delete_project(f"bench-project-{i}")),
+        ("TaskManager.get_tasks_for_project", lambda i: tasks.get_tasks_for_project(project)),
+        ("TaskManager.get_project_stats", lambda i: tasks.get_project_stats(project)),
+        ("TaskManager.get_schedule", lambda i: tasks.get_schedule(project)),
+        ("TaskManager.suggest", lambda i: tasks.suggest("tasks", "Tsak 0-", project)),
+        ("TaskManager.add_task", lambda i: tasks.add_task(project, task(i), "Benchmark task", 3, "HIGH")),
+        ("TaskManager.get_task", lambda i: tasks.get_task(project, task(i))),
+        ("TaskManager.edit_task", lambda i: tasks.edit_task(project, task(i), None, "Edited", None, "LOW")),
+        ("TaskManager.move_task", lambda i: tasks.move_task(project, task(i), "DOING")),
+        ("TaskManager.assignee_member", lambda i: tasks.assignee_member(project, task(i), "user1")),
+        ("TaskManager.remove_assignee", lambda i: tasks.remove_assignee(project, task(i), "user1")),
+        ("TaskManager.add_comment", add_comment),
+        ("TaskManager.get_comments", lambda i: tasks.get_comments(project, task(i), 0, 20)),
+        ("TaskManager.edit_comment", lambda i: tasks.edit_comment(project, task(i), comment_ids[i], "Edited comment")),
+        ("TaskManager.delete_comment", lambda i: tasks.delete_comment(project, task(i), comment_ids[i])),
+        ("TaskManager.delete_task", lambda i: tasks.delete_task(project, task(i))),
+    ]
+
+
+def run_size(tasks, args):
+    with tempfile.TemporaryDirectory() as directory:
+        user_file, data_file = build_fixture(directory, tasks, args.projects, args.users, args.comments, args.assignees)
+        timings = {}
+        ops = operations(user_file, data_file)
+        # The managers print confirmations; keep them out of the JSON on stdout.
+        with redirect_stdout(io.StringIO()):
+            for i in range(args.repeat):
+                for name, op in ops:
+                    start = time.perf_counter()
+                    op(i)
+                    timings.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+        return {
+            "data_file_bytes": os.path.getsize(data_file),
+            "operations": {
+                name: {"min_ms": round(min(values), 3), "median_ms": round(statistics.median(values), 3)}
+                for name, values in timings.items()
+            },
+        }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns a line per operation whose median got slower than the baseline by more than tolerance.
+    """
+    regressions = []
+    for size, result in results["sizes"].items():
+        for name, timing in result["operations"].items():
+            before = baseline.get("sizes", {}).get(size, {}).get("operations", {}).get(name)
+            if before and timing["median_ms"] > before["median_ms"] * (1 + tolerance):
+                regressions.append(f"{name} @ {size} tasks: {before['median_ms']}ms -> {timing['median_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark manager operations on synthetic workspaces")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Total task counts to benchmark")
+    parser.add_argument("--projects", type=int, default=10, help="Projects the tasks are spread over (default 10)")
+    parser.add_argument("--users", type=int, default=1000, help="Number of users (default 1000)")
+    parser.add_argument("--comments", type=int, default=2, help="Comments per task (default 2)")
+    parser.add_argument("--assignees", type=int, default=1, help="Assignees per task (default 1)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per operation (default 3)")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a previous results file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown over the baseline (default 25%%)")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "projects": args.projects,
+            "users": args.users,
+            "comments": args.comments,
+            "assignees": args.assignees,
+            "repeat": args.repeat,
+        },
+        "sizes": {},
+    }
+    for size in args.sizes:
+        print(f"Benchmarking {size} tasks...", file=sys.stderr)
+        results["sizes"][str(size)] = run_size(size, args)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"Regression: {line}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+# Keep the benchmark's own board reloads out of app.log.
+os.environ.setdefault("TRELLOMIZE_LOG_LEVEL", "WARNING")
+
+import main
+from manager import TASK_STATUSES, DataManager, ProjectManager, TaskManager, generate_workspace
+
+
+def build_board(directory, tasks):
+    per_status = max(1, tasks // len(TASK_STATUSES))
+    user_data, data = generate_workspace(10, 1, {status: per_status for status in TASK_STATUSES}, assignees=1)
+    user_file = os.path.join(directory, "users.json")
+    data_file = os.path.join(directory, "data.json")
+    DataManager(user_file, data_file).write_workspace(user_data, data)
+    return ProjectManager(user_file, data_file), TaskManager(user_file, data_file)
+
+
+def frame(board, screen, console):
+    """
+    Draws one board frame the way display_project does and returns (ms, lines written, bytes written).
+    """
+    out = screen.file
+    before = out.tell()
+    start = time.perf_counter()
+    board.refresh()
+    content = board.render(console, max_rows=max(1, console.size.height - 20))
+    lines = screen.draw(console, "Project Board: [info]Project 0[/info]", board.render_stats(), content, "[1] Add Task   [0] Exit")
+    return (time.perf_counter() - start) * 1000, lines, out.tell() - before
+
+
+def run_size(tasks, args):
+    with tempfile.TemporaryDirectory() as directory:
+        project_manager, task_manager = build_board(directory, tasks)
+        screen = main.Screen(io.StringIO())
+        console = main._setup_console(file=screen, force_terminal=True, width=args.width, height=args.height)
+
+        start = time.perf_counter()
+        board = main.ProjectBoard("Project 0", project_manager)
+        load_ms = (time.perf_counter() - start) * 1000
+        first = frame(board, screen, console)
+
+        idle, update = [], []
+        for i in range(args.runs):
+            idle.append(frame(board, screen, console))
+            # Another session moves a task between columns; only those two columns are re-rendered.
+            with redirect_stdout(io.StringIO()):
+                task_manager.move_task("Project 0", f"Task 0-TODO-{i}", "BACKLOG")
+            update.append(frame(board, screen, console))
+
+        # What every loop used to cost: all rows of every status printed from scratch.
+        legacy = io.StringIO()
+        legacy_console = main._setup_console(file=legacy, force_terminal=True, width=args.width, height=args.height)
+        board.max_rows = None
+        start = time.perf_counter()
+        legacy_console.print(main.Columns([board.render_status(status) for status in board.STATUSES]))
+        legacy_ms = (time.perf_counter() - start) * 1000
+
+        def summary(frames):
+            return {
+                "median_ms": round(statistics.median(ms for ms, _, _ in frames), 3),
+                "lines_written": statistics.median(lines for _, lines, _ in frames),
+                "bytes_written": statistics.median(size for _, _, size in frames),
+            }
+
+        return {
+            "load_ms": round(load_ms, 3),
+            "first_frame": summary([first]),
+            "idle_frame": summary(idle),
+            "update_frame": summary(update),
+            "full_print": {"ms": round(legacy_ms, 3), "bytes_written": len(legacy.getvalue())},
+        }
+
+
+def main_():
+    parser = argparse.ArgumentParser(description="Measure project board frame times on large projects")
+    parser.add_argument("--tasks", type=int, nargs="+", default=[1000, 5000], help="Task counts to benchmark")
+    parser.add_argument("--runs", type=int, default=20, help="Frames per measurement; the median is reported")
+    parser.add_argument("--width", type=int, default=200, help="Terminal width (default 200)")
+    parser.add_argument("--height", type=int, default=50, help="Terminal height (default 50)")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    for tasks in args.tasks:
+        print(f"Benchmarking {tasks} tasks...", file=sys.stderr)
+        results[str(tasks)] = run_size(tasks, args)
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Entry points whose cold start we track: (name, code run with -X importtime, module to attribute).
+TARGETS = [
+    ("import manager", "import manager", "manager"),
+    ("import main", "import main", "main"),
+    ("manager.py --help", "import runpy, sys; sys.argv = ['manager.py', '--help']; runpy.run_path('manager.py', run_name='__main__')", None),
+]
+
+
+def parse_importtime(stderr, module=None):
+    """
+    Returns the cumulative import time in microseconds of module, or of every
+    top-level import when module is None, from python -X importtime output.
+    """
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only top-level imports are counted; nested ones are already in their parent's cumulative time.
+        if module is None and not name.startswith("  "):
+            total += int(cumulative)
+        elif name.strip() == module:
+            return int(cumulative)
+    return total
+
+
+def measure(code, module, runs):
+    import_times = []
+    wall_times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        wall_times.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr)
+        import_times.append(parse_importtime(result.stderr, module) / 1000)
+    return {
+        "import_ms": round(statistics.median(import_times), 2),
+        "wall_ms": round(statistics.median(wall_times), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the Trellomize entry points")
+    parser.add_argument("--runs", type=int, default=10, help="Runs per entry point; the median is reported")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a previous results file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown over the baseline (default 25%%)")
+    args = parser.parse_args()
+
+    results = {name: measure(code, module, args.runs) for name, code, module in TARGETS}
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = [
+            name for name, result in results.items()
+            if name in baseline and result["import_ms"] > baseline[name]["import_ms"] * (1 + args.tolerance)
+        ]
+        for name in regressions:
+            print(f"Regression: {name} {baseline[name]['import_ms']}ms -> {results[name]['import_ms']}ms", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+import array
+import bisect
+import json
+import mmap
+import os
+import threading
+from datetime import date
+
+from manager import TASK_PRIORITIES, TASK_STATUSES, comment_count, percentile
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b"TRLCOL01"
+DONE_STATUSES = ["DONE", "ARCHIVED"]
+DURATION_BINS = [1, 2, 3, 5, 8, 13, 21, 34]
+
+# Column name -> array typecode. Dates are stored as ordinals, statuses and
+# priorities as their index in TASK_STATUSES and TASK_PRIORITIES.
+COLUMNS = {
+    "project": "i",
+    "status": "b",
+    "priority": "b",
+    "start": "i",
+    "end": "i",
+    "comments": "i",
+    # Task i's assignees are assignee_codes[assignee_offsets[i]:assignee_offsets[i + 1]].
+    "assignee_offsets": "q",
+    "assignee_codes": "i",
+}
+
+
+class TaskColumns:
+    """
+    Every task of a workspace as parallel arrays, one entry per task.
+    Columns are numpy arrays when numpy is installed, and array.array or
+    memoryview objects otherwise.
+    """
+
+    def __init__(self, columns, projects, assignees, source=None, mapped=None):
+        if np is not None:
+            columns = {name: np.frombuffer(column, dtype=COLUMNS[name]) for name, column in columns.items()}
+        self.columns = columns
+        self.projects = projects
+        self.assignees = assignees
+        self.source = source
+        # The open map when the columns were loaded from a file; the columns are views into it.
+        self.mapped = mapped
+
+    def __len__(self):
+        return len(self.columns["project"])
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["columns"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def save(self, filename):
+        """
+        Writes the columns to filename in a layout load() can map without copying.
+        """
+        header = {"count": len(self), "source": self.source, "projects": self.projects, "assignees": self.assignees, "columns": {}}
+        blobs = []
+        offset = 0
+        for name, typecode in COLUMNS.items():
+            blob = memoryview(self.columns[name]).cast("B").tobytes()
+            header["columns"][name] = [typecode, offset, len(self.columns[name])]
+            # Keep every column 8-byte aligned in the file.
+            blobs.append(blob + b"\0" * (-len(blob) % 8))
+            offset += len(blobs[-1])
+        header_bytes = json.dumps(header).encode()
+        header_bytes += b" " * (-(len(MAGIC) + 8 + len(header_bytes)) % 8)
+        tmp_filename = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_filename, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header_bytes).to_bytes(8, "little"))
+            f.write(header_bytes)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(tmp_filename, filename)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Maps a file written by save(); the columns are read lazily from the page cache.
+        """
+        with open(filename, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"'{filename}' is not a task columns file")
+        start = len(MAGIC) + 8
+        header_length = int.from_bytes(mapped[len(MAGIC):start], "little")
+        header = json.loads(mapped[start:start + header_length])
+        base = start + header_length
+        view = memoryview(mapped)
+        columns = {}
+        for name, (typecode, offset, length) in header["columns"].items():
+            size = length * array.array(typecode).itemsize
+            columns[name] = view[base + offset:base + offset + size].cast(typecode)
+        return cls(columns, header["projects"], header["assignees"], header["source"], mapped)
+
+
+def build_columns(data, source=None):
+    """
+    Builds the columns from data in the data.json layout.
+    """
+    columns = {name: array.array(typecode) for name, typecode in COLUMNS.items()}
+    columns["assignee_offsets"].append(0)
+    status_codes = {status: code for code, status in enumerate(TASK_STATUSES)}
+    priority_codes = {priority: code for code, priority in enumerate(TASK_PRIORITIES)}
+    assignee_codes = {}
+    projects = []
+    for project in data.get("projects", []):
+        project_code = len(projects)
+        projects.append(project["title"])
+        for task_list in project.get("tasks", {}).values():
+            for task in task_list:
+                columns["project"].append(project_code)
+                columns["status"].append(status_codes[task["status"]])
+                columns["priority"].append(priority_codes[task["priority"]])
+                columns["start"].append(date.fromisoformat(task["start_date"]).toordinal())
+                columns["end"].append(date.fromisoformat(task["end_date"]).toordinal())
+                columns["comments"].append(comment_count(task))
+                for username in task["assignees"]:
+                    columns["assignee_codes"].append(assignee_codes.setdefault(username, len(assignee_codes)))
+                columns["assignee_offsets"].append(len(columns["assignee_codes"]))
+    return TaskColumns(columns, projects, list(assignee_codes), source)
+
+
+def load_columns(data_filename="data.json", columns_filename=None, rebuild=False):
+    """
+    Returns the columns of data_filename. The snapshot saved next to it is
+    mapped when it was built from the data file as it is now; otherwise it
+    is rebuilt and saved for the next report.
+    """
+    columns_filename = columns_filename or f"{data_filename}.columns"
+    stat = os.stat(data_filename)
+    source = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if not rebuild:
+        try:
+            columns = TaskColumns.load(columns_filename)
+            if columns.source == source:
+                return columns
+        except (FileNotFoundError, ValueError):
+            pass
+    with open(data_filename) as f:
+        data = json.load(f)
+    columns = build_columns(data, source)
+    columns.save(columns_filename)
+    return columns
+
+
+# --- Reports ---
+# Each report has a numpy path and a plain Python fallback that give the same result.
+
+def _done_mask(columns):
+    done_codes = [TASK_STATUSES.index(status) for status in DONE_STATUSES]
+    if np is not None:
+        return np.isin(columns.status, done_codes)
+    return [code in done_codes for code in columns.status]
+
+
+def _distribution(values):
+    """
+    Summarises a sorted sequence of day counts.
+    """
+    count = len(values)
+    total = int(values.sum()) if np is not None else sum(values)
+    return {
+        "count": count,
+        "mean": round(total / count, 2) if count else 0.0,
+        "p50": int(percentile(values, 0.5)),
+        "p90": int(percentile(values, 0.9)),
+        "max": int(values[-1]) if count else 0,
+    }
+
+
+def status_counts(columns):
+    """
+    Returns the number of tasks per status in every project.
+    """
+    size = len(TASK_STATUSES)
+    if np is not None:
+        counts = np.bincount(columns.project.astype(np.int64) * size + columns.status, minlength=len(columns.projects) * size)
+        counts = counts.reshape(len(columns.projects), size).tolist()
+    else:
+        counts = [[0] * size for _ in columns.projects]
+        for project, status in zip(columns.project, columns.status):
+            counts[project][status] += 1
+    return {title: dict(zip(TASK_STATUSES, row)) for title, row in zip(columns.projects, counts)}
+
+
+def cycle_times(columns):
+    """
+    Returns the distribution of planned days (end date minus start date) of
+    finished tasks, overall and per project. Tasks don't record when they
+    were finished, so the planned duration stands in for the cycle time.
+    """
+    done = _done_mask(columns)
+    if np is not None:
+        projects = columns.project[done]
+        durations = (columns.end - columns.start)[done]
+        order = np.lexsort((durations, projects))
+        projects, durations = projects[order], durations[order]
+        counts = np.bincount(projects, minlength=len(columns.projects))
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        per_project = [durations[start:start + count] for start, count in zip(starts, counts)]
+        overall = np.sort(durations)
+    else:
+        per_project = [[] for _ in columns.projects]
+        for project, start, end, finished in zip(columns.project, columns.start, columns.end, done):
+            if finished:
+                per_project[project].append(end - start)
+        for durations in per_project:
+            durations.sort()
+        overall = sorted(duration for durations in per_project for duration in durations)
+    return {
+        "all": _distribution(overall),
+        "projects": {title: _distribution(durations) for title, durations in zip(columns.projects, per_project) if len(durations)},
+    }
+
+
+def throughput_by_assignee(columns):
+    """
+    Returns the number of open and finished tasks of every assignee, busiest first.
+    """
+    done = _done_mask(columns)
+    size = len(columns.assignees)
+    if np is not None:
+        offsets = columns.assignee_offsets
+        slot_task = np.repeat(np.arange(len(columns)), np.diff(offsets))
+        finished_slots = done[slot_task]
+        finished = np.bincount(columns.assignee_codes[finished_slots], minlength=size).tolist()
+        total = np.bincount(columns.assignee_codes, minlength=size).tolist()
+    else:
+        finished, total = [0] * size, [0] * size
+        offsets, codes = columns.assignee_offsets, columns.assignee_codes
+        for task, is_done in enumerate(done):
+            for slot in range(offsets[task], offsets[task + 1]):
+                total[codes[slot]] += 1
+                finished[codes[slot]] += is_done
+    rows = {name: {"done": finished[code], "open": total[code] - finished[code]} for code, name in enumerate(columns.assignees)}
+    return dict(sorted(rows.items(), key=lambda item: (-item[1]["done"], item[0])))
+
+
+def duration_histogram(columns, bins=DURATION_BINS):
+    """
+    Returns the number of tasks whose planned duration in days is below each
+    bin edge (and not below the previous one), plus those at or above the last edge.
+    """
+    labels = [f"<{edge}" for edge in bins] + [f">={bins[-1]}"]
+    if np is not None:
+        buckets = np.searchsorted(np.asarray(bins), columns.end - columns.start, side="right")
+        counts = np.bincount(buckets, minlength=len(labels)).tolist()
+    else:
+        counts = [0] * len(labels)
+        for start, end in zip(columns.start, columns.end):
+            counts[bisect.bisect_right(bins, end - start)] += 1
+    return dict(zip(labels, counts))
+
+
+def completed_per_week(columns):
+    """
+    Returns the number of finished tasks per week of their end date, keyed by the week's Monday.
+    """
+    done = _done_mask(columns)
+    # Ordinal 1 (0001-01-01) is a Monday, so (ordinal - 1) // 7 numbers the weeks.
+    if np is not None:
+        weeks = (columns.end[done] - 1) // 7
+        numbers, counts = np.unique(weeks, return_counts=True)
+        weekly = dict(zip(numbers.tolist(), counts.tolist()))
+    else:
+        weekly = {}
+        for end, finished in zip(columns.end, done):
+            if finished:
+                week = (end - 1) // 7
+                weekly[week] = weekly.get(week, 0) + 1
+    return {date.fromordinal(week * 7 + 1).isoformat(): count for week, count in sorted(weekly.items())}
+
+
+def task_report(columns):
+    return {
+        "tasks": len(columns),
+        "projects": len(columns.projects),
+        "backend": "numpy" if np is not None else "array",
+        "status": status_counts(columns),
+        "cycle_time_days": cycle_times(columns),
+        "throughput_by_assignee": throughput_by_assignee(columns),
+        "duration_histogram": duration_histogram(columns),
+        "completed_per_week": completed_per_week(columns),
+    }
@@ -0,0 +1,189 @@
+import json
+import multiprocessing
+import os
+import re
+from datetime import date, datetime, timedelta
+
+from manager import WorkspaceSnapshot, open_snapshot, reversed_lines
+
+DONE_STATUSES = ["DONE", "ARCHIVED"]
+# Change feed operations that show up in digests.
+DIGEST_OPS = {"move_task", "add_comment"}
+TIMESTAMP = re.compile(rb'"timestamp": "([^"]*)"')
+
+
+def read_events(changes_filename, since):
+    """
+    Returns the move and comment entries of the change feed newer than
+    since, grouped by project id. The feed is appended in time order, so
+    it is read from the end back to since and no further; only moves and
+    comments are decoded.
+    """
+    since = since.isoformat().encode()
+    lines = []
+    try:
+        f = open(changes_filename, "rb")
+    except FileNotFoundError:
+        return {}
+    with f:
+        for line in reversed_lines(f):
+            # An entry's own timestamp comes before its task data.
+            match = TIMESTAMP.search(line)
+            if match and match.group(1) < since:
+                break
+            if b'"move_task"' in line or b'"add_comment"' in line:
+                lines.append(line)
+    events = {}
+    for line in reversed(lines):
+        change = json.loads(line)
+        if change["op"] in DIGEST_OPS:
+            events.setdefault(change["project_id"], []).append(change)
+    return events
+
+
+def collect_digests(snapshot, titles, events, today, days):
+    """
+    Walks the tasks of the given projects once and returns the digest items
+    of every assignee: open tasks due within days of today (overdue ones
+    included), and the moves and new comments in events on their tasks.
+    """
+    digests = {}
+    due_by = (today + timedelta(days=days)).isoformat()
+    today = today.isoformat()
+
+    def digest(username):
+        return digests.setdefault(username, {"due": [], "moved": [], "comments": []})
+
+    for title in titles:
+        project = snapshot.get_project(title)
+        if not project:
+            continue
+        by_id = {}
+        for task_list in project.get("tasks", {}).values():
+            for task in task_list:
+                by_id[task.get("id", task["title"])] = task
+                if task["status"] in DONE_STATUSES or task["end_date"] > due_by:
+                    continue
+                item = {"project": title, "task": task["title"], "status": task["status"], "end_date": task["end_date"], "overdue": task["end_date"] < today}
+                for username in task["assignees"]:
+                    digest(username)["due"].append(item)
+        new_comments = {}
+        for change in events.get(project.get("id"), []):
+            task = by_id.get(change["task_data"].get("id", change["task"]))
+            if task is None:
+                continue
+            if change["op"] == "move_task":
+                item = {"project": title, "task": task["title"], "from": change["from_status"], "to": change["task_data"]["status"], "timestamp": change["timestamp"]}
+                for username in task["assignees"]:
+                    digest(username)["moved"].append(item)
+            else:
+                new_comments.setdefault(id(task), [task, 0])[1] += 1
+        for task, count in new_comments.values():
+            for username in task["assignees"]:
+                digest(username)["comments"].append({"project": title, "task": task["title"], "count": count})
+    return digests
+
+
+def _collect_worker(job):
+    snapshot_filename, comments_filename, source, titles, events, today, days = job
+    with WorkspaceSnapshot.open(snapshot_filename, comments_filename) as snapshot:
+        if snapshot.source != source:
+            raise ValueError("The snapshot was rebuilt while the digests were being generated; run digest again.")
+        return collect_digests(snapshot, titles, events, date.fromisoformat(today), days)
+
+
+def render_markdown(username, digest, today):
+    lines = [f"# Digest for {username} - {today}", ""]
+    if digest["due"]:
+        lines += ["## Due soon", ""]
+        for item in digest["due"]:
+            overdue = " **overdue**" if item["overdue"] else ""
+            lines.append(f"- {item['task']} ({item['project']}, {item['status']}): due {item['end_date']}{overdue}")
+        lines.append("")
+    if digest["moved"]:
+        lines += ["## Moved", ""]
+        for item in digest["moved"]:
+            lines.append(f"- {item['task']} ({item['project']}): {item['from']} -> {item['to']}")
+        lines.append("")
+    if digest["comments"]:
+        lines += ["## New comments", ""]
+        for item in digest["comments"]:
+            lines.append(f"- {item['task']} ({item['project']}): {item['count']} new comment{'s' if item['count'] != 1 else ''}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def digest_filename(output_dir, username, extension):
+    return os.path.join(output_dir, re.sub(r"[^\w.-]", "_", username) + extension)
+
+
+def write_digests(job):
+    """
+    Writes the digest files of (username, digest) pairs and returns how many were written.
+    """
+    output_dir, formats, digests, today = job
+    written = 0
+    for username, digest in digests:
+        if "markdown" in formats:
+            with open(digest_filename(output_dir, username, ".md"), "w") as f:
+                f.write(render_markdown(username, digest, today))
+            written += 1
+        if "json" in formats:
+            with open(digest_filename(output_dir, username, ".json"), "w") as f:
+                json.dump({"user": username, "date": today, **digest}, f, indent=2)
+            written += 1
+    return written
+
+
+def generate_digests(user_filename="users.json", data_filename="data.json", output_dir="digests",
+                     formats=("markdown",), days=3, hours=24, workers=1, now=None):
+    """
+    Writes one digest per active user with something in it to output_dir,
+    from one pass over the workspace snapshot and the change feed. With
+    more than one worker the projects, and then the files, are split over
+    worker processes. Returns a summary of what was written.
+    """
+    now = now or datetime.now()
+    today = now.date()
+    events = read_events(f"{data_filename}.changes", now - timedelta(hours=hours))
+    os.makedirs(output_dir, exist_ok=True)
+    with open_snapshot(user_filename, data_filename) as snapshot:
+        entries = snapshot.header["projects"]
+        active = {user["username"] for user in snapshot.list_users() if user.get("is_active", True)}
+        workers = max(1, min(workers, len(entries)))
+        if workers == 1:
+            partials = [collect_digests(snapshot, [entry[0] for entry in entries], events, today, days)]
+        else:
+            jobs = []
+            for n in range(workers):
+                chunk = entries[n::workers]
+                # Each worker only gets the feed entries of its own projects.
+                chunk_events = {entry[1]: events[entry[1]] for entry in chunk if entry[1] in events}
+                jobs.append((f"{data_filename}.snapshot", f"{data_filename}.comments", snapshot.source, [entry[0] for entry in chunk], chunk_events, today.isoformat(), days))
+            with multiprocessing.Pool(workers) as pool:
+                partials = pool.map(_collect_worker, jobs)
+
+    digests = {}
+    for partial in partials:
+        for username, items in partial.items():
+            merged = digests.setdefault(username, {"due": [], "moved": [], "comments": []})
+            for key, values in items.items():
+                merged[key].extend(values)
+    digests = sorted((username, digest) for username, digest in digests.items() if username in active)
+    for _, digest in digests:
+        digest["due"].sort(key=lambda item: (item["end_date"], item["project"], item["task"]))
+        digest["moved"].sort(key=lambda item: item["timestamp"])
+        digest["comments"].sort(key=lambda item: (item["project"], item["task"]))
+
+    if workers == 1:
+        files = write_digests((output_dir, formats, digests, today.isoformat()))
+    else:
+        jobs = [(output_dir, formats, digests[n::workers], today.isoformat()) for n in range(workers)]
+        with multiprocessing.Pool(workers) as pool:
+            files = sum(pool.map(write_digests, jobs))
+    return {
+        "users": len(digests),
+        "files": files,
+        "projects": len(entries),
+        "events": sum(len(changes) for changes in events.values()),
+    }
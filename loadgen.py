@@ -0,0 +1,226 @@
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+# Keep password hashing cheap so the load measures the data store, not bcrypt.
+os.environ.setdefault("TRELLOMIZE_BCRYPT_ROUNDS", "4")
+
+from manager import TASK_STATUSES, DataManager, Workspace, generate_workspace, percentile
+
+# Operations that only read; they never take the data file lock.
+READ_OPS = {"get_project", "get_task", "get_tasks_for_project", "get_comments", "get_user", "get_members", "list_projects", "get_projects_for_user"}
+
+# Relative weights of each operation in generated workloads.
+WORKLOAD_MIX = [
+    ("add_task", 20),
+    ("move_task", 20),
+    ("assignee_member", 10),
+    ("add_comment", 20),
+    ("get_tasks_for_project", 30),
+]
+
+
+def generate_workload(ops, projects, tasks_per_status, users, seed=0):
+    """
+    Returns a list of workload records against a workspace built by
+    generate_workspace(users, projects, tasks_per_status). Each record is
+    {"op": method name, "args": [...]} and can be written as one JSONL line.
+    """
+    rng = random.Random(seed)
+    names, weights = zip(*WORKLOAD_MIX)
+    records = []
+    for n in range(ops):
+        op = rng.choices(names, weights)[0]
+        project = f"Project {rng.randrange(projects)}"
+        task = f"Task {project.split()[1]}-{rng.choice(TASK_STATUSES)}-{rng.randrange(tasks_per_status)}"
+        if op == "add_task":
+            args = [project, f"load-task-{n}", "Created by the load generator", rng.randint(1, 10), "MEDIUM"]
+        elif op == "move_task":
+            args = [project, task, rng.choice(TASK_STATUSES)]
+        elif op == "assignee_member":
+            args = [project, task, f"user{rng.randrange(users)}"]
+        elif op == "add_comment":
+            args = [project, task, f"load-comment-{n}", f"user{rng.randrange(users)}"]
+        else:
+            args = [project]
+        records.append({"op": op, "args": args})
+    return records
+
+
+def run_worker(job):
+    """
+    Replays a slice of the workload in its own process and returns one
+    result per operation: op, latency, lock wait, success and the record.
+    The lock wait is the time the managers spent waiting for the data file
+    lock they take around every write.
+    """
+    user_file, data_file, records = job
+    workspace = Workspace(user_file, data_file)
+    results = []
+    with redirect_stdout(io.StringIO()):
+        for record in records:
+            method = getattr(workspace, record["op"])
+            waited = workspace.lock_wait
+            start = time.perf_counter()
+            error = None
+            try:
+                method(*record["args"])
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            results.append({
+                "op": record["op"],
+                "ms": (time.perf_counter() - start) * 1000,
+                "lock_wait_ms": (workspace.lock_wait - waited) * 1000,
+                "error": error,
+                "record": record,
+            })
+    return results
+
+
+def count_lost_updates(results, user_file, data_file):
+    """
+    Counts acknowledged writes whose effect is missing from the final data:
+    created tasks, comments and assignments that succeeded but were
+    overwritten by a concurrent writer.
+    """
+    workspace = Workspace(user_file, data_file)
+    tasks = {}
+    for project in workspace.data.get("projects", []):
+        for task_list in project["tasks"].values():
+            for task in task_list:
+                tasks[(project["title"], task["title"])] = task
+
+    lost = {"add_task": 0, "add_comment": 0, "assignee_member": 0}
+    for result in results:
+        op, args = result["op"], result["record"]["args"]
+        if result["error"] or op not in lost:
+            continue
+        if op == "add_task":
+            missing = (args[0], args[1]) not in tasks
+        else:
+            task = tasks.get((args[0], args[1]))
+            if op == "add_comment":
+                missing = task is None or not any(comment["comment"] == args[2] for comment in workspace.comments.list(task.get("id")))
+            else:
+                missing = task is None or args[2] not in task["assignees"]
+        lost[op] += missing
+    lost["total"] = sum(lost.values())
+    return lost
+
+
+def summarize(results, elapsed, lost_updates, workers):
+    latencies = sorted(result["ms"] for result in results)
+    per_op = {}
+    for result in results:
+        per_op.setdefault(result["op"], []).append(result["ms"])
+    waits = sorted(result["lock_wait_ms"] for result in results if result["op"] not in READ_OPS)
+    return {
+        "workers": workers,
+        "operations": len(results),
+        "errors": sum(1 for result in results if result["error"]),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_ops_s": round(len(results) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.5), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+        "per_operation": {
+            op: {
+                "count": len(values),
+                "p50_ms": round(percentile(sorted(values), 0.5), 3),
+                "p95_ms": round(percentile(sorted(values), 0.95), 3),
+            }
+            for op, values in sorted(per_op.items())
+        },
+        "lock_contention": {
+            "writes": len(waits),
+            "contended": sum(1 for wait in waits if wait > 1.0),
+            "total_wait_ms": round(sum(waits), 3),
+            "p95_wait_ms": round(percentile(waits, 0.95), 3),
+            "max_wait_ms": round(waits[-1], 3) if waits else 0.0,
+        },
+        "lost_updates": lost_updates,
+    }
+
+
+def replay(records, user_file, data_file, workers):
+    """
+    Splits the workload round-robin over worker processes that all edit
+    the same data files, and returns the summary report.
+    """
+    slices = [records[n::workers] for n in range(workers)]
+    jobs = [(user_file, data_file, records_slice) for records_slice in slices]
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        results = [result for worker_results in pool.map(run_worker, jobs) for result in worker_results]
+    elapsed = time.perf_counter() - start
+    lost_updates = count_lost_updates(results, user_file, data_file)
+    return summarize(results, elapsed, lost_updates, workers)
+
+
+def write_fixture(directory, users, projects, tasks_per_status):
+    user_data, data = generate_workspace(users, projects, {status: tasks_per_status for status in TASK_STATUSES})
+    user_file = os.path.join(directory, "users.json")
+    data_file = os.path.join(directory, "data.json")
+    DataManager(user_file, data_file).write_workspace(user_data, data)
+    return user_file, data_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay manager workloads from many processes against one data directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = subparsers.add_parser("generate", help="Write a synthetic JSONL workload")
+    generate_parser.add_argument("--ops", type=int, default=2000, help="Number of operations (default 2000)")
+    generate_parser.add_argument("--projects", type=int, default=3, help="Projects in the target workspace (default 3)")
+    generate_parser.add_argument("--tasks_per_status", type=int, default=20, help="Tasks per status in each project (default 20)")
+    generate_parser.add_argument("--users", type=int, default=50, help="Users in the target workspace (default 50)")
+    generate_parser.add_argument("--seed", type=int, default=0, help="Random seed (default 0)")
+    generate_parser.add_argument("--output", default="-", help="Workload file, or '-' for stdout (default)")
+
+    replay_parser = subparsers.add_parser("replay", help="Replay a JSONL workload across worker processes")
+    replay_parser.add_argument("--workload", default="-", help="Workload file, or '-' for stdin (default)")
+    replay_parser.add_argument("--workers", type=int, default=4, help="Worker processes (default 4)")
+    replay_parser.add_argument("--data_dir", help="Directory with users.json and data.json (default: a fresh synthetic workspace)")
+    replay_parser.add_argument("--projects", type=int, default=3, help="Projects in the synthetic workspace (default 3)")
+    replay_parser.add_argument("--tasks_per_status", type=int, default=20, help="Tasks per status in the synthetic workspace (default 20)")
+    replay_parser.add_argument("--users", type=int, default=50, help="Users in the synthetic workspace (default 50)")
+    replay_parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        records = generate_workload(args.ops, args.projects, args.tasks_per_status, args.users, args.seed)
+        out = sys.stdout if args.output == "-" else open(args.output, "w")
+        with out:
+            for record in records:
+                out.write(json.dumps(record) + "\n")
+        return
+
+    source = sys.stdin if args.workload == "-" else open(args.workload)
+    with source:
+        records = [json.loads(line) for line in source if line.strip()]
+    with tempfile.TemporaryDirectory() as directory:
+        if args.data_dir:
+            user_file = os.path.join(args.data_dir, "users.json")
+            data_file = os.path.join(args.data_dir, "data.json")
+        else:
+            user_file, data_file = write_fixture(directory, args.users, args.projects, args.tasks_per_status)
+        report = replay(records, user_file, data_file, args.workers)
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
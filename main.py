@@ -1,57 +1,255 @@
-import argparse
+import importlib
 import json
 import os
+import random
 import re
+import sys
+import time
 from datetime import date, datetime, timedelta
 
-import bcrypt
-from loguru import logger
-from rich.columns import Columns
-from rich.console import Console
-from rich.prompt import Prompt
-from rich.table import Table
-from rich.theme import Theme
+from manager import (ChangeFeed, PrefixIndex, ProjectManager, SessionManager, TaskManager, UndoHistory, UserManager,
+                     count_task, instrumented, place_task, project_stats, record_burndown, rollup_summary,
+                     summarize_project_stats, task_rank, timed)
 
-from manager import ProjectManager, TaskManager, UserManager
 
-# Set up Loguru configuration
-logger.remove()  # Remove the default handler
-logger.add("app.log", rotation="1 MB", level="DEBUG", format="{time} {level} {message}")
+class Lazy:
+    """
+    Stands in for an object that is only created the first time it is used,
+    so importing this module doesn't load rich or loguru.
+    """
 
-theme = Theme({
-    "info": "bold blue",
-    "warning": "bold yellow",
-    "danger": "bold red",
-    "success": "bold green",
-})
+    def __init__(self, factory):
+        self._factory = factory
+        self._target = None
 
-console = Console(theme=theme)
+    def _resolve(self):
+        if self._target is None:
+            self._target = self._factory()
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+
+def lazy_import(module, name):
+    return Lazy(lambda: getattr(importlib.import_module(module), name))
+
+
+class Screen:
+    """
+    Stands in for stdout and draws frames in place: only the lines that
+    differ from the previous frame are rewritten, using cursor movement
+    instead of clearing the terminal. Everything else written through it is
+    counted, so a frame that may have scrolled away is redrawn in full.
+    rich's Live isn't used: it rewrites its whole region on every refresh,
+    and the board waits on a Prompt between frames, which Live can't share
+    the terminal with (a transient Live would also erase the board first).
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.frame = []
+        self.size = None
+        self.lines_below = 0
+        self.open_line = False
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+    def write(self, text):
+        if "\x1b[2J" in text:
+            # Cleared by someone else (console.clear()); the frame is gone.
+            self.frame = []
+        if text:
+            # A line left open by a prompt is closed by the user's Enter, which is echoed without passing through here.
+            self.lines_below += self.open_line + text.count("\n")
+            self.open_line = not text.endswith("\n")
+        return self.file.write(text)
+
+    def draw(self, console, *parts):
+        """
+        Draws parts (renderables, or lists of already rendered lines) as one
+        frame at the top of the terminal and returns how many lines had to
+        be written.
+        """
+        lines = []
+        for part in parts:
+            if isinstance(part, list):
+                lines.extend(part)
+                continue
+            with console.capture() as capture:
+                console.print(part)
+            lines.extend(capture.get().split("\n")[:-1])
+        if not console.is_terminal:
+            self.write("".join(line + "\n" for line in lines))
+            return len(lines)
+        size = tuple(console.size)
+        in_place = self.frame and size == self.size and len(self.frame) + self.lines_below < size[1]
+        out = [] if in_place else ["\x1b[H\x1b[2J"]
+        written = 0
+        for y, line in enumerate(lines):
+            if not in_place or y >= len(self.frame) or self.frame[y] != line:
+                out.append(f"\x1b[{y + 1};1H{line}\x1b[K")
+                written += 1
+        # Wipe whatever was below the frame (prompts, messages, a taller old frame).
+        out.append(f"\x1b[{len(lines) + 1};1H\x1b[J")
+        self.file.write("".join(out))
+        self.file.flush()
+        self.frame, self.size = lines, size
+        self.lines_below, self.open_line = 0, False
+        return written
+
+
+def _parse_sample_rates(spec):
+    """
+    Parses TRELLOMIZE_LOG_SAMPLE, e.g. "0.5" or "board.view=0.1,*=1",
+    into a mapping of operation to the fraction of records kept.
+    """
+    rates = {"*": 1.0}
+    for part in filter(None, (part.strip() for part in spec.split(","))):
+        op, _, rate = part.rpartition("=")
+        rates[op or "*"] = float(rate)
+    return rates
+
+
+def _format_record(record):
+    fields = {"time": record["time"].isoformat(), "level": record["level"].name, "message": record["message"]}
+    fields.update(record["extra"])
+    record["extra"]["json"] = json.dumps(fields, default=str)
+    return "{extra[json]}\n"
+
+
+def _setup_logger():
+    from loguru import logger
+
+    rates = _parse_sample_rates(os.environ.get("TRELLOMIZE_LOG_SAMPLE", ""))
+
+    def sample(record):
+        # Warnings and errors are always kept; routine records can be sampled down per operation.
+        if record["level"].no >= 30:
+            return True
+        rate = rates.get(record["extra"].get("op"), rates["*"])
+        if rate < 1:
+            record["extra"]["sample"] = rate
+        return rate >= 1 or random.random() < rate
+
+    # Records are queued and written by loguru's background thread, so the menu loop never waits on disk.
+    logger.remove()  # Remove the default handler
+    logger.add(
+        "app.log",
+        rotation="1 MB",
+        level=os.environ.get("TRELLOMIZE_LOG_LEVEL", "DEBUG"),
+        format=_format_record,
+        filter=sample,
+        enqueue=True,
+    )
+    return logger
+
+
+def log_event(level, op, message, start=None, **fields):
+    """
+    Logs a structured record for an operation. Pass start (a perf_counter
+    reading) to record how long the operation took as duration_ms.
+    """
+    if start is not None:
+        fields["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    getattr(logger.bind(op=op, **fields), level)(message)
+
+
+def _setup_console(**kwargs):
+    from rich.console import Console
+    from rich.theme import Theme
+
+    theme = Theme({
+        "info": "bold blue",
+        "warning": "bold yellow",
+        "danger": "bold red",
+        "success": "bold green",
+    })
+    return Console(theme=theme, **kwargs)
+
+
+logger = Lazy(_setup_logger)
+console = Lazy(_setup_console)
+Columns = lazy_import("rich.columns", "Columns")
+Panel = lazy_import("rich.panel", "Panel")
+Prompt = lazy_import("rich.prompt", "Prompt")
+IntPrompt = lazy_import("rich.prompt", "IntPrompt")
+Table = lazy_import("rich.table", "Table")
+Text = lazy_import("rich.text", "Text")
+escape = lazy_import("rich.markup", "escape")
+
+screen = Screen(sys.stdout)
 
 def clear_screen():
-    if os.name == "nt":
-        os.system("cls")
-    else:
-        os.system("clear")
+    console.clear()
+
+def _readline():
+    try:
+        return importlib.import_module("readline")
+    except ImportError:  # e.g. on Windows; prompts then work without tab completion
+        return None
+
+def ask_name(prompt, kind=None, project_title=None, choices=None):
+    """
+    Prompt.ask with tab completion of usernames, project titles or a
+    project's task titles (kind "users", "projects" or "tasks"), or of
+    choices when given. Answers that are not one of those names get a
+    "did you mean" hint and the question again; an empty answer is
+    returned as is so callers can go back.
+    """
+    index = PrefixIndex(choices) if choices is not None else task_manager.name_index(kind, project_title)
+    readline = _readline()
+    if readline:
+        matches = []
+
+        def complete(text, state):
+            if state == 0:
+                matches[:] = index.complete(text, 50)
+            return matches[state] if state < len(matches) else None
+
+        # Titles contain spaces, so complete the whole line.
+        readline.set_completer_delims("")
+        readline.parse_and_bind("bind ^I rl_complete" if "libedit" in (readline.__doc__ or "") else "tab: complete")
+        readline.set_completer(complete)
+    try:
+        while True:
+            answer = Prompt.ask(prompt)
+            if not answer or answer in index:
+                return answer
+            suggestions = index.suggest(answer)
+            hint = f" Did you mean: {', '.join(escape(name) for name in suggestions)}?" if suggestions else ""
+            console.print(f"'{escape(answer)}' not found.{hint} Press enter to go back.", style="warning")
+    finally:
+        if readline:
+            readline.set_completer(None)
 
 def login(username, password):
-    with open("users.json") as f:
-        users = json.load(f)["users"]
-    user = next((user for user in users if user["username"] == username), None)
-    if not user:
-        logger.warning(f"Login failed for {username}: user not found")
-        return False, False
-    if not user["is_active"]:
-        logger.warning(f"Login failed for {username}: user is inactive")
+    start = time.perf_counter()
+    try:
+        user = user_manager.authenticate(username, password)
+    except ValueError as e:
+        log_event("warning", "auth.login", "Login failed", user=username, reason=str(e), start=start)
         return False, False
 
-    password_matches = bcrypt.checkpw(password.encode("utf-8"), user["password"].encode("utf-8"))
-    if user["username"] == username and password_matches:
-        logger.info(f"User {username} logged in successfully")
-        return True, user
-    else:
-        logger.warning(f"Login failed for {username}: incorrect password")
-        return False, False
+    session_manager.issue(username)
+    log_event("info", "auth.login", "Logged in", user=username, start=start)
+    return True, user
 
+def resume_session():
+    username = session_manager.validate()
+    if not username:
+        return None
+    if Prompt.ask(f"Continue as {username}?", choices=["yes", "no"], default="yes") == "no":
+        session_manager.revoke()
+        return None
+    log_event("info", "auth.resume", "Resumed session", user=username)
+    return user_manager.get_user(username)
+
+@instrumented("render.project_list")
 def display_project_list(project_manager, current_user):
     user = user_manager.get_user(current_user)
     if user["is_admin"]:
@@ -67,7 +265,7 @@ def display_project_list(project_manager, current_user):
             table.add_row(project["title"], project["start_date"])
         console.print(table)
 
-        project_title = Prompt.ask("Enter the project title, or press enter to go back")
+        project_title = ask_name("Enter the project title, or press enter to go back", choices=[project["title"] for project in projects])
         if project_title == "":
             clear_screen()
             return
@@ -92,19 +290,20 @@ def create_new_project(current_user):
         except ValueError:
             start_date = Prompt.ask("Invalid date format. Enter the start date of the project (dd/mm/yyyy)")
     try:
+        start = time.perf_counter()
         project = project_manager.create_project(title, start_date, current_user)
+        log_event("info", "project.create", "Project created", user=current_user, project=title, start=start)
         clear_screen()
         console.print(f"New project created successfully with Title: {project['title']}", style="success")
-        logger.info(f"Project '{title}' created successfully by {current_user}")
     except Exception as e:
         console.print(f"Error creating project: {e}", style="danger")
-        logger.error(f"Error creating project '{title}': {e}")
+        log_event("error", "project.create", str(e), user=current_user, project=title)
 
 def profile_settings(username):
     user = user_manager.get_user(username)
     if not user:
         console.print("User not found!", style="danger")
-        logger.warning(f"Profile settings: user {username} not found")
+        log_event("warning", "profile.view", "User not found", user=username)
         return
 
     console.print("Edit your profile", style="info")
@@ -125,67 +324,197 @@ def profile_settings(username):
         new_value = Prompt.ask(f"Enter new {field}")
 
         if field == "password":
-            new_value = bcrypt.hashpw(
-                new_value.encode("utf-8"), bcrypt.gensalt()
-            ).decode("utf-8")
+            new_value = user_manager.hash_password(new_value)
 
         updates = {field: new_value}
         try:
+            start = time.perf_counter()
             user_manager.update_user(username, updates)
-            logger.info(f"{field.capitalize()} updated successfully for {username}")
+            if field == "password":
+                # Changing the password revokes existing sessions; keep this one logged in.
+                session_manager.issue(username)
+            log_event("info", "profile.update", "Profile updated", user=username, field=field, start=start)
         except Exception as e:
             console.print(f"Error updating user: {e}", style="danger")
-            logger.error(f"Error updating {field} for {username}: {e}")
+            log_event("error", "profile.update", str(e), user=username, field=field)
             continue
 
         console.print(f"{field} updated successfully!", style="success")
 
+class ProjectBoard:
+    """
+    A project as shown on its board, kept current from the change feed.
+    The data file is only re-read when the board opens or falls behind the
+    feed, and only the status tables a change touches are rebuilt.
+    """
+
+    STATUSES = ["BACKLOG", "TODO", "DOING", "DONE", "ARCHIVED"]
+
+    def __init__(self, project_title, project_manager):
+        self.project_title = project_title
+        self.project_manager = project_manager
+        self.feed = ChangeFeed(project_manager.changes_filename)
+        self.tables = {}
+        self.max_rows = None
+        self.width = None
+        self.reload()
+
+    def reload(self):
+        # Skip to the feed's end first: anything appended after that is either already in the loaded copy or replayed by refresh().
+        self.feed.seek_end()
+        self.project = self.project_manager.get_project(self.project_title)
+        self.version = self.project.get("version", 0) if self.project else 0
+        if self.project is not None and "stats" not in self.project:
+            self.project["stats"] = project_stats(self.project)
+        self.tables = {}
+        log_event("debug", "board.reload", "Board reloaded", project=self.project_title, version=self.version)
+
+    def refresh(self):
+        """
+        Applies the feed entries for this project written since the last refresh.
+        """
+        changes = self.feed.poll()
+        if changes is None:
+            return self.reload()
+        for change in changes:
+            if self.project is None or change["project_id"] != self.project.get("id") or change["version"] <= self.version:
+                continue
+            if change["version"] != self.version + 1:
+                # An entry is missing, e.g. a writer without a feed; start over from the data file.
+                return self.reload()
+            self.apply(change)
+            self.version = change["version"]
+            if self.project is not None:
+                self.project["version"] = self.version
+
+    def apply(self, change):
+        op = change["op"]
+        if op == "delete_project":
+            self.project = None
+        elif op in ("add_member", "remove_member", "restore_members"):
+            self.project["members"] = change["members"]
+        elif op == "rebalance":
+            for task in self.project["tasks"].get(change["status"], []):
+                task["rank"] = change["ranks"].get(task["title"], task_rank(task))
+        elif "task" in change:
+            tasks, stats = self.project["tasks"], self.project["stats"]
+            title = change.get("old_title", change["task"])
+            found = next(((status, index) for status, task_list in tasks.items()
+                          for index, task in enumerate(task_list) if task["title"] == title), None)
+            task = change.get("task_data")
+            replaced = False
+            if found:
+                status, index = found
+                count_task(stats, tasks[status][index], -1)
+                self.tables.pop(status, None)
+                if task is None or task["status"] != status or op in ("move_task", "restore_task"):
+                    del tasks[status][index]
+                else:
+                    tasks[status][index] = task
+                    replaced = True
+            if task is not None:
+                count_task(stats, task)
+                if not replaced:
+                    place_task(tasks.setdefault(task["status"], []), task)
+                    if op == "restore_task":
+                        # Undo restores a rebalanced column's old ranks one task at a time.
+                        tasks[task["status"]].sort(key=task_rank)
+                    self.tables.pop(task["status"], None)
+            record_burndown(stats)
+
+    def members(self):
+        self.refresh()
+        return self.project["members"] if self.project else []
+
+    def role(self, username):
+        for member in self.members():
+            if username in member:
+                return member[username]
+        return None
+
+    def has_tasks(self):
+        return any(self.project["tasks"].values())
+
+    def render_stats(self):
+        stats = summarize_project_stats(self.project["stats"])
+        counts = "  ".join(f"{status} {count}" for status, count in stats["status"].items())
+        top = ", ".join(f"{name} ({count})" for name, count in list(stats["assignee"].items())[:3]) or "-"
+        burndown = [count for _, count in stats["burndown"][-14:]]
+        peak = max(burndown, default=0) or 1
+        spark = "".join(" ▁▂▃▄▅▆▇█"[round(count / peak * 8)] for count in burndown)
+        checklist = stats["checklist"]
+        progress = f"\nChecklists {checklist['done']}/{checklist['items']} done ({checklist['percent']}%), {checklist['remaining_days']} days left" if checklist["items"] else ""
+        return Panel(
+            f"{stats['tasks']} tasks: {counts}\n"
+            f"Overdue [danger]{stats['overdue']}[/danger]  Comments {stats['comments']}  "
+            f"Top assignees: {top}  Open tasks, last 14 days: {spark}{progress}",
+            title="Stats",
+        )
+
+    @instrumented("render.status_table")
+    def render_status(self, status):
+        # Narrow terminals only get the title and priority of each task.
+        detailed = self.width is None or self.width >= 40
+        task_table = Table(title=status.upper(), style="bold magenta", expand=True)
+        task_table.add_column("Title", style="italic", no_wrap=True, ratio=2)
+        if detailed:
+            task_table.add_column("Assignee", justify="right", no_wrap=True, ratio=1)
+        task_table.add_column("Priority", justify="center", style="bold", no_wrap=True, ratio=None if detailed else 1)
+        if detailed:
+            task_table.add_column("Due Date", justify="right", no_wrap=True)
+        tasks = self.project["tasks"].get(status, [])
+        for task in tasks[:self.max_rows]:
+            title = task["title"]
+            if "rollup" in task:
+                # Checklist progress, kept up to date on the task itself.
+                title += f" [dim]{rollup_summary(task['rollup'])['percent']}%[/dim]"
+            if detailed:
+                due_date = datetime.strptime(task["end_date"], "%Y-%m-%d").strftime("%d/%m/%Y")
+                assignees = ", ".join(task.get("assignees", []))
+                if "rollup" in task:
+                    due_date += f" ({task['rollup']['remaining']}d left)"
+                task_table.add_row(title, assignees, task["priority"], due_date)
+            else:
+                task_table.add_row(title, task["priority"])
+        if self.max_rows is not None and len(tasks) > self.max_rows:
+            task_table.add_row(f"... {len(tasks) - self.max_rows} more", style="dim")
+        return task_table
+
+    @instrumented("render.project_board")
+    def render(self, console, max_rows=None):
+        """
+        Returns the board as rendered lines, one status column per fifth of
+        the console width and at most max_rows tasks per status. Columns are
+        cached and only re-rendered after a change touches them.
+        """
+        width = console.width // len(self.STATUSES)
+        if (max_rows, width) != (self.max_rows, self.width):
+            self.max_rows, self.width = max_rows, width
+            self.tables = {}
+        for status in self.STATUSES:
+            if status not in self.tables:
+                with console.capture() as capture:
+                    console.print(self.render_status(status), width=width)
+                self.tables[status] = capture.get().split("\n")[:-1]
+        columns = [self.tables[status] for status in self.STATUSES]
+        blank = " " * width
+        return [
+            "".join(column[y] if y < len(column) else blank for column in columns)
+            for y in range(max(map(len, columns)))
+        ]
+
 def display_project(project_title, project_manager, task_manager, current_user):
     clear_screen()
+    board = ProjectBoard(project_title, project_manager)
     try:
         while True :
-            clear_screen()
-            project = project_manager.get_project(project_title)
-            if not project:
+            board.refresh()
+            if not board.project:
                 console.print(f"Project '{project_title}' not found!", style="danger")
-                logger.warning(f"Project '{project_title}' not found")
+                log_event("warning", "project.view", "Project not found", user=current_user, project=project_title)
                 return
 
-            console.print(f"Project Board: [info]{project_title}[/info]")
-
-            try:
-                tasks = task_manager.get_tasks_for_project(project_title)
-                if not tasks:
-                    console.print("No tasks found for this project.", style="warning")
-                else:
-                    # Create a table for each task status
-                    task_tables = {}
-                    for status in ["BACKLOG","TODO", "DOING", "DONE", "ARCHIVED"]:
-                        task_table = Table(title=status.upper(), style="bold magenta")
-                        task_table.add_column("Title", style="italic")
-                        task_table.add_column("Assignee", justify="right")
-                        task_table.add_column("Priority", justify="center", style="bold")
-                        task_table.add_column("Due Date", justify="right")
-                        task_tables[status] = task_table
-
-                    # Add tasks to their respective tables
-                    for status, tasks in project["tasks"].items():
-                        for task in tasks:
-                            due_date = datetime.strptime(task["end_date"], "%Y-%m-%d").strftime("%d/%m/%Y")
-                            assignees = ", ".join(task.get("assignees", []))
-                            task_tables[status].add_row(task["title"], assignees, task["priority"], due_date)
-
-                    # Create a list of the tables to display side by side
-                    tables = [task_tables[status] for status in ["BACKLOG","TODO", "DOING", "DONE", "ARCHIVED"]]
-
-                    # Print the task tables side by side
-                    console.print(Columns(tables))
-
-            except ValueError as e:
-                console.print(f"{e}", style="danger")
-                logger.error(f"Error retrieving tasks for project '{project_title}': {e}")
-                
-            member_role = project_manager.get_member_role(project_title, current_user)
+            member_role = board.role(current_user)
             
             menu_options = {
                 "1": "Add Task",
@@ -198,28 +527,37 @@ def display_project(project_title, project_manager, task_manager, current_user):
                 "8": "Remove Assignee",
                 "9": "View Members",
                 "11": "Comments",
+                "12": "Schedule",
+                "13": "Dependencies",
+                "14": "Undo",
+                "15": "Redo",
                 "0": "Exit",
             }
-            if project_manager.is_project_owner(project_title, current_user):
-                menu_options.pop("0")
-                menu_options.pop("11")
+            if board.project["owner"] == current_user:
                 menu_options["10"] = "Delete Project"
-                menu_options["11"] = "Comments"
-                menu_options["0"] = "Exit"
+                # Keep the options in numeric order with Exit last.
+                menu_options = dict(sorted(menu_options.items(), key=lambda item: int(item[0]) or 100))
             
-            for key, value in menu_options.items():
-                console.print(f"[{key}] {value}")
+            menu = Columns([f"[{key}] {value}" for key, value in menu_options.items()], padding=(0, 3))
+            if not board.has_tasks():
+                content = "[warning]No tasks found for this project.[/warning]"
+            else:
+                # Leave room for the title, table borders, menu and the prompts under the frame.
+                content = board.render(console, max_rows=max(1, console.size.height - 20))
+            with timed("render.frame"):
+                screen.draw(console, f"Project Board: [info]{project_title}[/info]", board.render_stats(), content, menu)
+
             action = Prompt.ask("Select an option", choices=menu_options.keys())
             if action == "1":
                 if member_role == "member":
                     console.print("You do not have permission to add tasks!", style="warning")
-                    input("Press any key to continue...")
+                    console.input("Press any key to continue...")
                     continue
                 try:
                     task_title = Prompt.ask("Enter task title, or press enter to go back")
                     if task_title == "":
                         continue
-                    while task_manager.get_task(project_title, task_title):
+                    while task_title in task_manager.name_index("tasks", project_title):
                         console.print(f"Task '{task_title}' already exists! Please enter a different title.", style="warning")
                         task_title = Prompt.ask("Enter task title")
                     while not task_title:
@@ -232,192 +570,181 @@ def display_project(project_title, project_manager, task_manager, current_user):
                         task_duration = int(Prompt.ask("Enter task duration (days)"))
                     task_priority = Prompt.ask("Enter task priority (CRITICAL, HIGH, MEDIUM, LOW)", choices=["CRITICAL", "HIGH", "MEDIUM", "LOW"], default="MEDIUM")
 
-                    task = {
-                        "title": task_title,
-                        "description": task_description,
-                        "duration": task_duration,
-                        "priority": task_priority
-                    }
-
+                    start = time.perf_counter()
                     task_manager.add_task(project_title, task_title, task_description, task_duration, task_priority)
+                    log_event("info", "task.add", "Task added", user=current_user, project=project_title, task=task_title, start=start)
                     console.print(f"Task '{task_title}' added successfully!", style="success")
-                    logger.info(f"Task '{task_title}' added to project '{project_title}' by {current_user}")
                 except Exception as e:
                     console.print(f"An error occurred while adding the task: {e}", style="danger")
-                    logger.error(f"Error adding task '{task_title}' to project '{project_title}': {e}")
+                    log_event("error", "task.add", str(e), user=current_user, project=project_title, task=task_title)
             elif action == "2":
                 if member_role == "member":
                     console.print("You do not have permission to edit tasks!", style="warning")
-                    input("Press any key to continue...")
+                    console.input("Press any key to continue...")
                     continue
                 try:
-                    task_title = Prompt.ask("Enter task title to edit, or press enter to go back")
+                    task_title = ask_name("Enter task title to edit, or press enter to go back", "tasks", project_title)
                     if task_title == "":
                         continue
                     new_title = Prompt.ask("Enter new title (optional)")
                     new_description = Prompt.ask("Enter new description (optional)")
                     new_duration = Prompt.ask("Enter new duration (days) (optional)")
                     new_priority = Prompt.ask("Enter new priority (CRITICAL, HIGH, MEDIUM, LOW) (optional)", choices=["CRITICAL", "HIGH", "MEDIUM", "LOW"])
+                    start = time.perf_counter()
                     task_manager.edit_task(project_title, task_title, new_title, new_description, new_duration, new_priority)
+                    log_event("info", "task.edit", "Task updated", user=current_user, project=project_title, task=task_title, start=start)
                     console.print(f"Task '{task_title}' updated successfully!", style="success")
-                    logger.info(f"Task '{task_title}' updated in project '{project_title}' by {current_user}")
                 except Exception as e:
                     console.print(f"An error occurred while updating the task: {e}", style="danger")
-                    logger.error(f"Error updating task '{task_title}' in project '{project_title}': {e}")
+                    log_event("error", "task.edit", str(e), user=current_user, project=project_title, task=task_title)
             elif action == "3":
                 if member_role == "member":
                     console.print("You do not have permission to move tasks!", style="warning")
-                    input("Press any key to continue...")
+                    console.input("Press any key to continue...")
                     continue
                 try:
-                    task_title = Prompt.ask("Enter task title to move, or press enter to go back")
+                    task_title = ask_name("Enter task title to move, or press enter to go back", "tasks", project_title)
                     if task_title == "":
                         continue
                     new_status = Prompt.ask("Enter new status (BACKLOG,TODO, DOING, DONE, ARCHIVED)", choices=["BACKLOG","TODO", "DOING", "DONE", "ARCHIVED"])
-                    task_manager.move_task(project_title, task_title, new_status)
+                    position = Prompt.ask("Enter position in the column, 1 being the top (optional, default bottom)", default="")
+                    start = time.perf_counter()
+                    task_manager.move_task(project_title, task_title, new_status, int(position) - 1 if position else None)
+                    log_event("info", "task.move", "Task moved", user=current_user, project=project_title, task=task_title, status=new_status, start=start)
                     console.print(f"Task '{task_title}' moved to {new_status} successfully!", style="success")
-                    logger.info(f"Task '{task_title}' moved to {new_status} in project '{project_title}' by {current_user}")
                 except Exception as e:
                     console.print(f"An error occurred while moving the task: {e}", style="danger")
-                    logger.error(f"Error moving task '{task_title}' in project '{project_title}': {e}")
+                    log_event("error", "task.move", str(e), user=current_user, project=project_title, task=task_title)
 
             elif action == "4":
                 if member_role == "member":
                     console.print("You do not have permission to delete tasks!", style="warning")
-                    input("Press any key to continue...")
+                    console.input("Press any key to continue...")
                     continue
                 try:
-                    task_title = Prompt.ask("Enter task title to delete, or press enter to go back")
+                    task_title = ask_name("Enter task title to delete, or press enter to go back", "tasks", project_title)
                     if task_title == "":
                         continue
+                    start = time.perf_counter()
                     task_manager.delete_task(project_title, task_title)
+                    log_event("info", "task.delete", "Task deleted", user=current_user, project=project_title, task=task_title, start=start)
                     console.print(f"Task '{task_title}' deleted successfully!", style="success")
-                    logger.info(f"Task '{task_title}' deleted from project '{project_title}' by {current_user}")
                 except Exception as e:
                     console.print(f"An error occurred while deleting the task: {e}", style="danger")
-                    logger.error(f"Error deleting task '{task_title}' from project '{project_title}': {e}")
+                    log_event("error", "task.delete", str(e), user=current_user, project=project_title, task=task_title)
 
             elif action == "5":
                 if member_role == "member":
                     console.print("You do not have permission to add members!", style="warning")
-                    input("Press any key to continue...")
+                    console.input("Press any key to continue...")
                     continue
                 try:
                     console.print("Available members:")
-                    avl_members = set(user_manager.get_members()) - set(list(member.keys())[0] for member in project_manager.get_project(project_title)["members"])
+                    avl_members = set(user_manager.get_members()) - set(list(member.keys())[0] for member in board.members())
                     if not avl_members:
                         console.print("No members available to add!", style="warning")
                     else:
                         for member in avl_members:
                             console.print(member)
-                        member_name = Prompt.ask("Enter member's name to add, or press enter to go back")
+                        member_name = ask_name("Enter member's name to add, or press enter to go back", choices=avl_members)
                         if member_name == "":
                             continue
-                        while member_name not in avl_members and member_name != '0':
-                            console.print(f"Member '{member_name}' not found! Enter 0 to exit", style="danger")
-                            member_name = Prompt.ask("Enter member's name to add")
                         role_list = ["admin", "manager", "member"]
                         role = Prompt.ask("Enter member's role", choices=role_list)
                         while role not in role_list:
                             role = Prompt.ask("Choose a valid role", choices=role_list)
-                        if member_name != '0':
+                        if member_name:
+                            start = time.perf_counter()
                             project_manager.add_member(project_title, member_name, role, project_manager)
+                            log_event("info", "member.add", "Member added", user=current_user, project=project_title, member=member_name, role=role, start=start)
                             console.print(f"Member '{member_name}' added successfully!", style="success")
-                            logger.info(f"Member '{member_name}' added to project '{project_title}' with role '{role}' by {current_user}")
                 except Exception as e:
                     console.print(f"An error occurred while adding the member: {e}", style="danger")
-                    logger.error(f"Error adding member '{member_name}' to project '{project_title}': {e}")
+                    log_event("error", "member.add", str(e), user=current_user, project=project_title)
 
             elif action == "6":
                 if member_role == "member":
                     console.print("You do not have permission to remove members!", style="warning")
-                    input("Press any key to continue...")
+                    console.input("Press any key to continue...")
                     continue
                 try:
                     project_members_name = list()
                     console.print("Members in the project:")
-                    for member in project_manager.get_project(project_title)["members"]:
+                    for member in board.members():
                         for name, role in member.items():
                             console.print(f"{name} ({role})")
                             project_members_name.append(name)
-                    member_name = Prompt.ask("Enter member's name to remove, or press enter to go back")
-                    if member_name == "":
-                        continue
-                    while member_name not in project_members_name and member_name != '0':
-                        console.print(f"Member '{member_name}' is not part of the project! Enter 0 to exit", style="danger")
-                        member_name = Prompt.ask("Enter member's name to remove")
-                    if member_name != '0':
+                    member_name = ask_name("Enter member's name to remove, or press enter to go back", choices=project_members_name)
+                    if member_name:
+                        start = time.perf_counter()
                         project_manager.remove_member_from_project(project_title, member_name)
+                        log_event("info", "member.remove", "Member removed", user=current_user, project=project_title, member=member_name, start=start)
                         console.print(f"Member '{member_name}' removed successfully!", style="success")
-                        logger.info(f"Member '{member_name}' removed from project '{project_title}' by {current_user}")
                 except Exception as e:
                     console.print(f"An error occurred while removing the member: {e}", style="danger")
-                    logger.error(f"Error removing member '{member_name}' from project '{project_title}': {e}")
+                    log_event("error", "member.remove", str(e), user=current_user, project=project_title)
 
             elif action == "7":
                 if member_role == "member":
                     console.print("You do not have permission to assign members!", style="warning")
-                    input("Press any key to continue...")
+                    console.input("Press any key to continue...")
                     continue
                 try:
-                    task_title = Prompt.ask("Enter task title to assign a member, or press enter to go back")
+                    task_title = ask_name("Enter task title to assign a member, or press enter to go back", "tasks", project_title)
                     if task_title == "":
                         continue
                     console.print("Members in the project:")
-                    for member in project_manager.get_project(project_title)["members"]:
+                    for member in board.members():
                         for name, role in member.items():
                             console.print(f"{name} ({role})")
-                    member_name = Prompt.ask("Enter member's name to assign")
-                    project_members_name = [list(member.keys())[0] for member in project_manager.get_project(project_title)["members"]]
-                    while member_name not in project_members_name and member_name != '0':
-                        console.print(f"Member '{member_name}' is not part of the project! Enter 0 to exit", style="danger")
-                        member_name = Prompt.ask("Enter member's name to assign")
-                    if member_name != '0':
-                        task_manager.assign_member(project_title, task_title, member_name)
+                    project_members_name = [list(member.keys())[0] for member in board.members()]
+                    member_name = ask_name("Enter member's name to assign, or press enter to go back", choices=project_members_name)
+                    if member_name:
+                        start = time.perf_counter()
+                        task_manager.assignee_member(project_title, task_title, member_name)
+                        log_event("info", "task.assign", "Member assigned", user=current_user, project=project_title, task=task_title, member=member_name, start=start)
                         console.print(f"Member '{member_name}' assigned to task '{task_title}' successfully!", style="success")
-                        logger.info(f"Member '{member_name}' assigned to task '{task_title}' in project '{project_title}' by {current_user}")
                 except Exception as e:
                     console.print(f"An error occurred while assigning the member: {e}", style="danger")
-                    logger.error(f"Error assigning member '{member_name}' to task '{task_title}' in project '{project_title}': {e}")
+                    log_event("error", "task.assign", str(e), user=current_user, project=project_title, task=task_title)
 
             elif action == "8":
                 if member_role == "member":
                     console.print("You do not have permission to remove assignees!", style="warning")
-                    input("Press any key to continue...")
+                    console.input("Press any key to continue...")
                     continue
                 try:
-                    task_title = Prompt.ask("Enter task title to remove assignee, or press enter to go back")
+                    task_title = ask_name("Enter task title to remove assignee, or press enter to go back", "tasks", project_title)
                     if task_title == "":
                         continue
+                    assignees = task_manager.get_task(project_title, task_title)["assignees"]
                     console.print("Assignees in the task:")
-                    for assignee in task_manager.get_task(project_title, task_title)["assignees"]:
+                    for assignee in assignees:
                         console.print(assignee)
-                    member_name = Prompt.ask("Enter member's name to remove")
-                    while member_name not in task_manager.get_task(project_title, task_title)["assignees"] and member_name != '0':
-                        console.print(f"Member '{member_name}' is not assigned to the task! Enter 0 to exit", style="danger")
-                        member_name = Prompt.ask("Enter member's name to remove")
-                    if member_name != '0':
-                        task_manager.remove_assignee_from_task(project_title, task_title, member_name)
+                    member_name = ask_name("Enter member's name to remove, or press enter to go back", choices=assignees)
+                    if member_name:
+                        start = time.perf_counter()
+                        task_manager.remove_assignee(project_title, task_title, member_name)
+                        log_event("info", "task.unassign", "Assignee removed", user=current_user, project=project_title, task=task_title, member=member_name, start=start)
                         console.print(f"Member '{member_name}' removed from task '{task_title}' successfully!", style="success")
-                        logger.info(f"Member '{member_name}' removed from task '{task_title}' in project '{project_title}' by {current_user}")
                 except Exception as e:
                     console.print(f"An error occurred while removing the assignee: {e}", style="danger")
-                    logger.error(f"Error removing assignee '{member_name}' from task '{task_title}' in project '{project_title}': {e}")
+                    log_event("error", "task.unassign", str(e), user=current_user, project=project_title, task=task_title)
 
             elif action == "9":
                 try:
                     console.print("Members in the project:")
-                    for member in project_manager.get_project(project_title)["members"]:
+                    for member in board.members():
                         for name, role in member.items():
                             console.print(f"{name} ({role})")
                 except Exception as e:
                     console.print(f"An error occurred while viewing the members: {e}", style="danger")
-                    logger.error(f"Error viewing members in project '{project_title}': {e}")
+                    log_event("error", "member.list", str(e), user=current_user, project=project_title)
             elif action == "10":
                 # no need to write this, but who cares
                 if member_role != "owner":
                     console.print("You do not have permission to delete the project!", style="warning")
-                    input("Press any key to continue...")
+                    console.input("Press any key to continue...")
                     continue
                 try:
                     sure = Prompt.ask("Are you sure you want to delete the project? (yes/no)")
@@ -427,112 +754,284 @@ def display_project(project_title, project_manager, task_manager, current_user):
                     else:
                         sure = Prompt.ask("Are you really sure you want to delete the project? (yes/no)")
                         if sure.lower() == "yes":
+                            start = time.perf_counter()
                             project_manager.delete_project(project_title)
+                            log_event("info", "project.delete", "Project deleted", user=current_user, project=project_title, start=start)
                             console.print(f"Project '{project_title}' deleted successfully!", style="success")
-                            logger.info(f"Project '{project_title}' deleted by {current_user}")
-                            input("Press any key to continue...")
+                            console.input("Press any key to continue...")
                             break
                     console.print("Project deletion cancelled.", style="warning")
                 except Exception as e:
                     console.print(f"An error occurred while deleting the project: {e}", style="danger")
-                    logger.error(f"Error deleting project '{project_title}': {e}")
+                    log_event("error", "project.delete", str(e), user=current_user, project=project_title)
             
             elif action == "11":
-                all_tasks = task_manager.get_tasks_for_project(project_title)
-                if len(all_tasks) == 0:
+                board.refresh()
+                if not board.has_tasks():
                     console.print("No tasks found in the project.", style="warning")
-                    input("Press any key to continue...")
+                    console.input("Press any key to continue...")
                     clear_screen()
                     continue
                 handle_comments(project_title, task_manager, current_user)
-                
+
+            elif action == "12":
+                try:
+                    handle_schedule(project_title, task_manager)
+                    clear_screen()
+                    continue
+                except Exception as e:
+                    console.print(f"An error occurred while scheduling the project: {e}", style="danger")
+                    log_event("error", "project.schedule", str(e), user=current_user, project=project_title)
+
+            elif action == "13":
+                if member_role == "member":
+                    console.print("You do not have permission to change dependencies!", style="warning")
+                    console.input("Press any key to continue...")
+                    continue
+                try:
+                    task_title = ask_name("Enter task title, or press enter to go back", "tasks", project_title)
+                    if task_title == "":
+                        continue
+                    dependency_action = Prompt.ask("Add or remove a blocker?", choices=["add", "remove"], default="add")
+                    blocked_by = ask_name(f"Enter the title of the task that blocks '{task_title}'", "tasks", project_title)
+                    if blocked_by == "":
+                        continue
+                    start = time.perf_counter()
+                    if dependency_action == "add":
+                        task_manager.add_dependency(project_title, task_title, blocked_by)
+                    else:
+                        task_manager.remove_dependency(project_title, task_title, blocked_by)
+                    log_event("info", f"task.dependency.{dependency_action}", "Dependency updated", user=current_user, project=project_title, task=task_title, blocked_by=blocked_by, start=start)
+                    console.print(f"Dependency updated: '{blocked_by}' blocks '{task_title}'." if dependency_action == "add" else f"'{blocked_by}' no longer blocks '{task_title}'.", style="success")
+                except Exception as e:
+                    console.print(f"An error occurred while updating the dependency: {e}", style="danger")
+                    log_event("error", "task.dependency", str(e), user=current_user, project=project_title, task=task_title)
+
+            elif action in ("14", "15"):
+                undo_action = "undo" if action == "14" else "redo"
+                try:
+                    start = time.perf_counter()
+                    entry = getattr(task_manager, undo_action)()
+                    log_event("info", f"history.{undo_action}", "Change reverted" if undo_action == "undo" else "Change reapplied", user=current_user, project=entry["project"], change=entry["label"], start=start)
+                    console.print(f"{'Undid' if undo_action == 'undo' else 'Redid'} {entry['label']} of '{entry['title']}' in '{entry['project']}'.", style="success")
+                except Exception as e:
+                    console.print(f"Could not {undo_action}: {e}", style="danger")
+                    log_event("error", f"history.{undo_action}", str(e), user=current_user, project=project_title)
+
             elif action == "0":
                 break
 
             else:
                 console.print("Invalid option, please try again.", style="danger")
-                logger.warning(f"Invalid menu option selected in project '{project_title}' by {current_user}")
+                log_event("warning", "project.menu", "Invalid option", user=current_user, project=project_title)
 
             
-            input("Press any key to continue...")
+            console.input("Press any key to continue...")
     except Exception as e:
         console.print(f"An error occurred in the menu: {e}")
-        logger.error(f"Error in project '{project_title}' menu: {e}")
+        log_event("error", "project.menu", str(e), user=current_user, project=project_title)
 
 def handle_comments(project_title, task_manager, current_user):
-    task_title = Prompt.ask("Enter the task title to manage comments")
+    task_title = ask_name("Enter the task title to manage comments, or press enter to go back", "tasks", project_title)
+    if task_title == "":
+        return
+    page = 0
     while True:
         clear_screen()
-        console.print(f"Managing comments for task: [bold]{task_title}[/bold] in project: [bold]{project_title}[/bold]")
-        comments = task_manager.get_comments(project_title, task_title)
+        # Leave room for the heading, the prompts and the page line.
+        page_size = max(1, console.size.height - 8)
+        console.print(f"Managing comments for task: [bold]{escape(task_title)}[/bold] in project: [bold]{escape(project_title)}[/bold]")
+        # One extra comment tells whether there is a next page.
+        comments = task_manager.get_comments(project_title, task_title, page * page_size, page_size + 1)
+        has_next = len(comments) > page_size
+        comments = comments[:page_size]
         if comments:
-            for index, comment in enumerate(comments):
-                console.print(f"[{index}] {comment['comment']} (by {comment['author']} - at {comment['timestamp']})")
+            for number, comment in enumerate(comments, 1):
+                console.print(f"[{number}] {escape(comment['comment'])} (by {comment['author']} - at {comment['timestamp']})")
+            console.print(f"Page {page + 1}", style="info")
         else:
             console.print("No comments found.", style="warning")
 
-        comment_action = Prompt.ask("Choose an option", choices=["add", "edit", "delete", "back"], default="back")
-        if comment_action == "add":
+        choices = ["add", "edit", "delete"] + (["next"] if has_next else []) + (["previous"] if page else []) + ["back"]
+        comment_action = Prompt.ask("Choose an option", choices=choices, default="back")
+        if comment_action == "next":
+            page += 1
+            continue
+        elif comment_action == "previous":
+            page -= 1
+            continue
+        elif comment_action == "add":
             comment = Prompt.ask("Enter your comment")
             task_manager.add_comment(project_title, task_title, comment, current_user)
             console.print(f"Comment added successfully.", style="success")
+        elif comment_action in ("edit", "delete") and not comments:
+            console.print("There are no comments on this page.", style="warning")
         elif comment_action == "edit":
-            index = int(Prompt.ask("Enter the comment zindex to edit"))
+            # The number picks a comment on this page; its id stays valid if others are deleted meanwhile.
+            number = IntPrompt.ask("Enter the comment number to edit", choices=[str(n) for n in range(1, len(comments) + 1)])
             new_comment = Prompt.ask("Enter your new comment")
-            task_manager.edit_comment(project_title, task_title, index, new_comment)
+            task_manager.edit_comment(project_title, task_title, comments[number - 1]["id"], new_comment)
             console.print(f"Comment edited successfully.", style="success")
         elif comment_action == "delete":
-            index = int(Prompt.ask("Enter the comment index to delete"))
-            task_manager.delete_comment(project_title, task_title, index)
+            number = IntPrompt.ask("Enter the comment number to delete", choices=[str(n) for n in range(1, len(comments) + 1)])
+            task_manager.delete_comment(project_title, task_title, comments[number - 1]["id"])
             console.print(f"Comment deleted successfully.", style="success")
         elif comment_action == "back":
             break
-        input("Press any key to continue...")
+        console.input("Press any key to continue...")
+
+def gantt_lines(schedule, titles, width):
+    """
+    Returns a rich Text line per task title: a bar from its earliest start to
+    its earliest finish (red on the critical path) followed by its slack.
+    The time axis is scaled so the whole project fits in width columns.
+    """
+    label_width = min(24, max(8, width // 4))
+    days_per_column = max(1, -(-schedule["duration_days"] // max(1, width - label_width - 1)))
+    lines = []
+    for title in titles:
+        task = schedule["tasks"][title]
+        start = task["start_day"] // days_per_column
+        length = max(1, -(-task["duration_days"] // days_per_column))
+        slack = task["slack_days"] // days_per_column
+        line = Text(title[:label_width - 1].ljust(label_width), no_wrap=True, overflow="crop")
+        line.append(" " * start)
+        line.append("█" * length, style="bold red" if task["slack_days"] == 0 else "green")
+        line.append("·" * slack, style="dim")
+        lines.append(line)
+    return lines, days_per_column
+
+
+def handle_schedule(project_title, task_manager):
+    schedule = task_manager.get_schedule(project_title)
+    critical_only = False
+    page = 0
+    while True:
+        titles = [title for title, task in schedule["tasks"].items() if not critical_only or task["slack_days"] == 0]
+        # Leave room for the header, legend and the prompt.
+        rows = max(1, console.size.height - 6)
+        pages = max(1, -(-len(titles) // rows))
+        page = min(page, pages - 1)
+        lines, days_per_column = gantt_lines(schedule, titles[page * rows:(page + 1) * rows], console.width)
+        clear_screen()
+        console.print(f"Schedule: [info]{project_title}[/info] {schedule['start']} to {schedule['finish']} ({schedule['duration_days']} days), page {page + 1}/{pages}")
+        for line in lines:
+            console.print(line)
+        console.print(f"[bold red]█[/bold red] critical  [green]█[/green] task  [dim]·[/dim] slack  (1 column = {days_per_column} day{'s' if days_per_column > 1 else ''})")
+        choice = Prompt.ask("[n]ext, [p]revious, [c]ritical only/all tasks, [b]ack", choices=["n", "p", "c", "b"], default="b")
+        if choice == "n":
+            page = min(page + 1, pages - 1)
+        elif choice == "p":
+            page = max(page - 1, 0)
+        elif choice == "c":
+            critical_only = not critical_only
+            page = 0
+        else:
+            break
+
+def ask_user_filters():
+    """
+    Prompts for the user filters of UserManager.list_users(); empty answers match everyone.
+    """
+    status = Prompt.ask("Status", choices=["all", "active", "inactive"], default="all")
+    email_domain = Prompt.ask("Email domain (optional)", default="")
+    min_projects = Prompt.ask("Minimum number of projects (optional)", default="")
+    max_projects = Prompt.ask("Maximum number of projects (optional)", default="")
+    return {
+        "is_active": {"all": None, "active": True, "inactive": False}[status],
+        "email_domain": email_domain or None,
+        "min_projects": int(min_projects) if min_projects else None,
+        "max_projects": int(max_projects) if max_projects else None,
+    }
 
 def admin_panel():
     console.print("Admin Panel", style="info")
     while True:
         console.print("[1] List Users")
         console.print("[2] Activate/Deactivate User")
-        console.print("[3] Go back")
-        choice = Prompt.ask("Select an option", choices=["1", "2", "3"])
-        usernames = user_manager.get_members()
-        users = [user_manager.get_user(username) for username in usernames]
+        console.print("[3] Bulk Activate/Deactivate/Delete Users")
+        console.print("[4] Go back")
+        choice = Prompt.ask("Select an option", choices=["1", "2", "3", "4"])
         if choice == "1":
-            clear_screen()
-            if not users:
-                console.print("No users found!", style="warning")
-            else:
+            filters = ask_user_filters()
+            page = 0
+            while True:
+                clear_screen()
+                # Leave room for the table borders, the page line and the prompt.
+                page_size = max(1, console.size.height - 8)
+                start = time.perf_counter()
+                result = user_manager.list_users(filters, page * page_size, page_size)
+                if not result["users"]:
+                    console.print("No users found!", style="warning")
+                    break
                 table = Table(show_header=True, header_style="bold magenta")
                 table.add_column("Username")
                 table.add_column("Email")
                 table.add_column("Is Active", justify="right")
-                table.add_column("Is Admin", justify="right")
-                for user in users:
-                    table.add_row(user["username"], user["email"], str(user["is_active"]), str(user["is_admin"]))
+                table.add_column("Projects", justify="right")
+                for user in result["users"]:
+                    table.add_row(escape(user["username"]), escape(user["email"] or "-"), str(user["is_active"]), str(user["projects"]))
                 console.print(table)
-                logger.info("Listed all users in admin panel")
+                log_event("info", "admin.list_users", "Listed users", count=len(result["users"]), total=result["total"], start=start)
+                pages = -(-result["total"] // page_size)
+                console.print(f"Page {page + 1} of {pages} ({result['total']} users)", style="info")
+                choices = (["next"] if page + 1 < pages else []) + (["previous"] if page else []) + ["back"]
+                action = Prompt.ask("Choose an option", choices=choices, default="back")
+                if action == "back":
+                    clear_screen()
+                    break
+                page += 1 if action == "next" else -1
         elif choice == "2":
             clear_screen()
-            console.print("List of users:")
-            for user in users:
-                console.print(user["username"])
-            username = Prompt.ask("Enter the username to activate/deactivate")
+            username = ask_name("Enter the username to activate/deactivate, or press enter to go back", "users")
+            if username == "":
+                continue
             try:
-                user_manager.update_user(username, {"is_active": not user_manager.get_user(username)["is_active"]})
-                console.print(f"User '{username}' new status: {user_manager.get_user(username)['is_active']}", style="success")
-                logger.info(f"User '{username}' status changed to {user_manager.get_user(username)['is_active']} by admin")
+                start = time.perf_counter()
+                user = user_manager.get_user(username)
+                if not user:
+                    raise ValueError("User not found")
+                is_active = not user["is_active"]
+                user_manager.update_user(username, {"is_active": is_active})
+                log_event("info", "admin.toggle_user", "User status changed", member=username, is_active=is_active, start=start)
+                console.print(f"User '{username}' new status: {is_active}", style="success")
             except Exception as e:
                 console.print(f"An error occurred while updating the user: {e}", style="danger")
-                logger.error(f"Error changing status of user '{username}': {e}")
+                log_event("error", "admin.toggle_user", str(e), member=username)
         elif choice == "3":
+            clear_screen()
+            action = Prompt.ask("Action", choices=["activate", "deactivate", "delete"])
+            filters = ask_user_filters()
+            try:
+                matching = user_manager.list_users(filters, 0, 0)["total"]
+                sure = Prompt.ask(f"{action.capitalize()} {matching} matching users? (yes/no)")
+                if sure.lower() != "yes":
+                    console.print("Cancelled.", style="warning")
+                    continue
+                start = time.perf_counter()
+                if action == "delete":
+                    result = user_manager.delete_users(filters)
+                    console.print(f"Deleted {len(result['deleted'])} users.", style="success")
+                    if result["skipped"]:
+                        console.print(f"Kept {len(result['skipped'])} users who own projects.", style="warning")
+                    count = len(result["deleted"])
+                else:
+                    count = len(user_manager.set_users_active(action == "activate", filters))
+                    console.print(f"{action.capitalize()}d {count} users.", style="success")
+                log_event("info", f"admin.bulk_{action}", "Users updated", count=count, start=start, **filters)
+            except Exception as e:
+                console.print(f"An error occurred while updating the users: {e}", style="danger")
+                log_event("error", f"admin.bulk_{action}", str(e))
+        elif choice == "4":
             clear_screen()
             break
         else:
             console.print("Invalid option, please try again.", style="danger")
-            logger.warning("Invalid option selected in admin panel")
+            log_event("warning", "admin.menu", "Invalid option")
 
+@instrumented("render.board")
 def display_project_board(username):
+    start = time.perf_counter()
     all_projects = project_manager.get_projects_for_user(username)
     all_tasks = []
     for project in all_projects:
@@ -545,7 +1044,7 @@ def display_project_board(username):
                 all_tasks.append(task)
     if not all_tasks:
         console.print("No tasks found!", style="warning")
-        logger.warning(f"No tasks found for user {username}")
+        log_event("warning", "board.view", "No tasks found", user=username, start=start)
         return
     
     table = Table(show_header=True, header_style="bold magenta")
@@ -558,11 +1057,15 @@ def display_project_board(username):
     for task in all_tasks:
         table.add_row(task["title"], task["description"], task["duration"], task["priority"], task["status"], task["project"])
     console.print(table)
-    logger.info(f"Displayed project board for {username}")
+    log_event("info", "board.view", "Displayed board", user=username, tasks=len(all_tasks), start=start)
 
 def main():
     console.print("Welcome to the Trellomize app!", style="success")
-    logger.info("Application started")
+    log_event("info", "app.start", "Application started")
+    user = resume_session()
+    if user:
+        main_menu(user["is_admin"], user["username"])
+        return
     while True:
         user_choice = Prompt.ask("Choose an option", choices=["login", "register", "exit"], default="login")
         is_admin = False
@@ -587,7 +1090,7 @@ def main():
                 if username == "exit":
                     clear_screen()
                     continue
-                while user_manager.get_user(username):
+                while username in user_manager.name_index("users"):
                     console.print("Username already exists, please choose a different one.", style="warning")
                     username = Prompt.ask("Choose a username")
                 password = Prompt.ask("Choose a password", password=True)
@@ -598,37 +1101,40 @@ def main():
                 while not re.match(email_regex, email):
                     if Prompt.ask("Proceed with registration? (yes/no)", default="yes") == "no":
                         console.print("Registration canceled.", style="bold magenta")
-                        logger.info("User canceled registration")
+                        log_event("info", "auth.register", "Registration canceled", user=username)
                         return
                     email = Prompt.ask("Enter a valid email")
 
                 if user_manager.create_user(username=username, password=password, email=email):
                     clear_screen()
                     user = {"username": username}
+                    session_manager.issue(username)
                     console.print("Registration successful!", style="info")
-                    logger.info(f"User {username} registered successfully")
+                    log_event("info", "auth.register", "Registered", user=username)
                     break
                 else:
                     clear_screen()
                     console.print("Registration failed, please try again.", style="danger")
-                    logger.warning(f"Registration attempt failed for user {username}")
+                    log_event("warning", "auth.register", "Registration failed", user=username)
 
             elif user_choice == "exit":
                 clear_screen()
                 console.print("Exiting the app. Goodbye!", style="bold magenta")
-                logger.info("Application exited by user")
+                log_event("info", "app.exit", "Application exited")
                 return
 
         except Exception as e:
             clear_screen()
             console.print(f"An error occurred: {e}", style="danger")
-            logger.error(f"Error during login/registration: {e}")
+            log_event("error", "auth", str(e))
 
     main_menu(is_admin, user["username"] if user else None)
 
 
 def main_menu(is_admin=False, current_user=None):
     clear_screen()
+    # Each login gets its own undo history, shared by the project and task managers.
+    project_manager.history = task_manager.history = UndoHistory()
     while True:
         console.print("Main Menu", style="info")
         menu_options = {
@@ -659,18 +1165,24 @@ def main_menu(is_admin=False, current_user=None):
             elif choice == "5" and is_admin:
                 admin_panel()
             elif choice == "0":
+                session_manager.revoke()
                 console.print("Logging Out...", style="danger")
-                logger.info(f"User {current_user} logged out")
+                log_event("info", "auth.logout", "Logged out", user=current_user)
                 break
             else:
                 console.print("Invalid option, please try again.", style="danger")
-                logger.warning(f"Invalid option selected in main menu by {current_user}")
+                log_event("warning", "main.menu", "Invalid option", user=current_user)
         except Exception as e:
             console.print(f"An error occurred in the menu: {e}", style="danger")
-            logger.error(f"Error in main menu for user {current_user}: {e}")
+            log_event("error", "main.menu", str(e), user=current_user)
 
 if __name__ == "__main__":
     user_manager = UserManager()
     project_manager = ProjectManager()
     task_manager = TaskManager()
-    main()
+    session_manager = SessionManager(user_manager)
+    sys.stdout = screen
+    try:
+        main()
+    finally:
+        logger.complete()
@@ -1,567 +1,4149 @@
 import argparse
-import getpass
+import atexit
+import base64
+import bisect
+import difflib
+import functools
+import glob
+import hashlib
+import heapq
+import hmac
+import inspect
+import itertools
 import json
-import multiprocessing
+import math
+import mmap
+import os
+import random
+import shlex
+import sys
+import threading
+import time
+import tracemalloc
 import uuid
+import weakref
+from collections import deque
+from contextlib import contextmanager, nullcontext, redirect_stderr
 from datetime import date, datetime, timedelta
 from io import StringIO
-import bcrypt
-from rich import print
+
+try:
+    import fcntl
+except ImportError:  # Windows has no fcntl; fall back to in-process locking only
+    fcntl = None
 
 
 class CustomHelpFormatter(argparse.HelpFormatter):
     """Custom help formatter to improve readability."""
 
 
-    def _fill_text(self, text, width, indent):
-        return "".join([indent + line for line in text.splitlines(keepends=True)])
+    def _fill_text(self, text, width, indent):
+        return "".join([indent + line for line in text.splitlines(keepends=True)])
+
+
+
+def str2bool(v):
+    if isinstance(v, bool):
+        return v
+    if v.lower() in ("yes", "true", "t", "y", "1"):
+        return True
+    elif v.lower() in ("no", "false", "f", "n", "0"):
+        return False
+    else:
+        raise argparse.ArgumentTypeError("Boolean value expected.")
+
+
+TASK_STATUSES = ["BACKLOG", "TODO", "DOING", "DONE", "ARCHIVED"]
+TASK_PRIORITIES = ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
+OPEN_STATUSES = ["BACKLOG", "TODO", "DOING"]
+
+# --- Project Statistics ---
+# Every project keeps counters in project["stats"] that task mutations adjust
+# as they happen, so reports never have to walk the project's tasks.
+
+def _bump(counts, key, delta):
+    counts[key] = counts.get(key, 0) + delta
+    if not counts[key]:
+        del counts[key]
+
+
+def count_task(stats, task, sign=1):
+    """
+    Adds (sign=1) or removes (sign=-1) a task's contribution to project statistics.
+    """
+    _bump(stats["status"], task["status"], sign)
+    _bump(stats["priority"], task["priority"], sign)
+    for username in task["assignees"]:
+        _bump(stats["assignee"], username, sign)
+    if task["status"] in OPEN_STATUSES:
+        # Open tasks by due date; overdue is the sum over the dates before today.
+        _bump(stats["due"], task["end_date"], sign)
+    stats["comments"] += sign * comment_count(task)
+    for key, value in task.get("rollup", {}).items():
+        _bump(stats.setdefault("checklist", {}), key, sign * value)
+
+
+def comment_count(task):
+    """
+    Returns the number of comments on a task, whether they are in the
+    comment store or still inline in a task from an older data.json.
+    """
+    return task.get("comment_count", len(task.get("comments", [])))
+
+
+def _task_state(task):
+    """
+    Returns a task without its comments, which undo leaves alone.
+    """
+    if task is None:
+        return None
+    return {key: value for key, value in task.items() if key not in ("comment_count", "comments")}
+
+
+def split_comments(data):
+    """
+    Moves the comments inline in data's tasks out into comment store
+    records, leaving each task with an id and a comment_count. Returns the records.
+    """
+    records = []
+    for project in data.get("projects", []):
+        for task_list in project.get("tasks", {}).values():
+            for task in task_list:
+                task.setdefault("id", str(uuid.uuid4()))
+                comments = task.pop("comments", [])
+                task["comment_count"] = task.get("comment_count", 0) + len(comments)
+                for comment in comments:
+                    records.append({
+                        "id": comment.get("id") or str(uuid.uuid4()),
+                        "task": task["id"],
+                        "comment": comment["comment"],
+                        "author": comment["author"],
+                        "timestamp": comment["timestamp"],
+                    })
+    return records
+
+
+def record_burndown(stats, today=None):
+    """
+    Records the number of open tasks as today's point of the burndown series.
+    """
+    today = (today or date.today()).isoformat()
+    stats["burndown"][today] = sum(stats["status"].get(status, 0) for status in OPEN_STATUSES)
+
+
+def project_stats(project):
+    """
+    Builds a project's statistics from its tasks, for new projects and
+    projects saved before statistics were kept.
+    """
+    stats = {"status": {}, "priority": {}, "assignee": {}, "due": {}, "comments": 0, "burndown": {}}
+    for task_list in project.get("tasks", {}).values():
+        for task in task_list:
+            count_task(stats, task)
+    record_burndown(stats)
+    return stats
+
+
+def summarize_project_stats(stats, today=None):
+    today = (today or date.today()).isoformat()
+    return {
+        "tasks": sum(stats["status"].values()),
+        "status": {status: stats["status"].get(status, 0) for status in TASK_STATUSES},
+        "priority": {priority: stats["priority"].get(priority, 0) for priority in TASK_PRIORITIES},
+        "assignee": dict(sorted(stats["assignee"].items(), key=lambda item: (-item[1], item[0]))),
+        "overdue": sum(count for end_date, count in stats["due"].items() if end_date < today),
+        "comments": stats["comments"],
+        "checklist": rollup_summary(stats.get("checklist", {})),
+        "burndown": sorted(stats["burndown"].items()),
+    }
+
+
+# --- Subtasks ---
+# A task's "subtasks" is a checklist whose items can have subtasks of their
+# own, to any depth. An item's id is its parent's id plus its number, e.g.
+# "2.1". The task and every item with subtasks keep a "rollup" of the items
+# at the bottom of their tree: how many there are, how many are done and the
+# days the open ones still need. A change to an item adds the difference it
+# makes to the rollups on its path up to the task, and the task's rollup is
+# counted in the project statistics, so nothing walks the whole tree.
+
+ROLLUP_KEYS = ("items", "done", "remaining")
+
+
+def item_rollup(item):
+    if item.get("subtasks"):
+        return dict(item["rollup"])
+    return {"items": 1, "done": int(item["done"]), "remaining": 0 if item["done"] else item["duration"]}
+
+
+def sum_rollups(items):
+    """
+    Adds up the rollups of items, which are siblings; only they are read, not their subtasks.
+    """
+    total = dict.fromkeys(ROLLUP_KEYS, 0)
+    for item in items:
+        for key, value in item_rollup(item).items():
+            total[key] += value
+    return total
+
+
+def rollup_summary(rollup):
+    items, done = rollup.get("items", 0), rollup.get("done", 0)
+    return {"items": items, "done": done, "percent": round(done * 100 / items) if items else 0, "remaining_days": rollup.get("remaining", 0)}
+
+
+def subtask_path(task, subtask_id):
+    """
+    Returns the items from the top of task's checklist down to subtask_id.
+    """
+    path, items, parts = [], task.get("subtasks", []), subtask_id.split(".")
+    for depth in range(len(parts)):
+        wanted = ".".join(parts[:depth + 1])
+        item = next((item for item in items if item["id"] == wanted), None)
+        if item is None:
+            raise ValueError(f"Subtask '{subtask_id}' not found on task '{task['title']}'.")
+        path.append(item)
+        items = item.get("subtasks", [])
+    return path
+
+
+def propagate_rollup(task, ancestors, before, after):
+    """
+    Adds the change from before to after of one subtree's rollup to the
+    rollups of its ancestors (items, top first) and of the task.
+    """
+    for node in [task] + ancestors:
+        rollup = node.setdefault("rollup", dict.fromkeys(ROLLUP_KEYS, 0))
+        for key in ROLLUP_KEYS:
+            rollup[key] += after[key] - before[key]
+    if not task.get("subtasks"):
+        task.pop("subtasks", None)
+        task.pop("rollup", None)
+
+
+def _set_done(item, done):
+    """
+    Checks or unchecks item and everything under it.
+    """
+    if item.get("subtasks"):
+        for child in item["subtasks"]:
+            _set_done(child, done)
+        item["rollup"] = sum_rollups(item["subtasks"])
+    item["done"] = done
+
+
+# --- Scheduling ---
+# A task's "blocked_by" lists the titles of tasks that have to finish before it
+# starts. project["schedule"] keeps the critical-path numbers of every task in
+# days from the project start: [earliest start, earliest finish, latest start,
+# latest finish], and the project's finish. It also keeps the dependency graph:
+# every task's duration, the tasks it is blocked by and the tasks it blocks, and
+# a rank that orders blockers before the tasks they block, so a change only has
+# to look at the tasks around it.
+
+def task_duration(task):
+    return max(0, (date.fromisoformat(task["end_date"]) - date.fromisoformat(task["start_date"])).days)
+
+
+def _task_graph(project):
+    tasks = {task["title"]: task for task_list in project.get("tasks", {}).values() for task in task_list}
+    predecessors = {title: [blocker for blocker in task.get("blocked_by", []) if blocker in tasks] for title, task in tasks.items()}
+    successors = {title: [] for title in tasks}
+    for title, blockers in predecessors.items():
+        for blocker in blockers:
+            successors[blocker].append(title)
+    return tasks, predecessors, successors
+
+
+def _topological(predecessors, successors):
+    """
+    Orders task titles so every task comes after the tasks blocking it.
+    """
+    pending = {title: len(blockers) for title, blockers in predecessors.items()}
+    ready = [title for title, count in pending.items() if not count]
+    order = []
+    while ready:
+        title = ready.pop()
+        order.append(title)
+        for successor in successors[title]:
+            pending[successor] -= 1
+            if not pending[successor]:
+                ready.append(successor)
+    if len(order) != len(pending):
+        raise ValueError("Task dependencies contain a cycle!")
+    return order
+
+
+def _reachable(graph, start, key, inside):
+    seen, stack = {start}, [start]
+    while stack:
+        for other in graph[stack.pop()][key]:
+            if other not in seen and inside(graph[other]["rank"]):
+                seen.add(other)
+                stack.append(other)
+    return seen
+
+
+def _reorder(graph, blocker, title):
+    """
+    Restores the ranks after blocker, ranked after title, was made to block
+    it (Pearce and Kelly). Only the tasks ranked between the two that title
+    leads to or that lead to blocker swap their ranks around.
+    """
+    low, high = graph[title]["rank"], graph[blocker]["rank"]
+    after = _reachable(graph, title, "blocks", lambda rank: rank <= high)
+    if blocker in after:
+        raise ValueError("Task dependencies contain a cycle!")
+    before = _reachable(graph, blocker, "blocked_by", lambda rank: rank >= low)
+    moved = sorted(before, key=lambda other: graph[other]["rank"]) + sorted(after, key=lambda other: graph[other]["rank"])
+    for other, rank in zip(moved, sorted(graph[other]["rank"] for other in moved)):
+        graph[other]["rank"] = rank
+
+
+def schedule_graph(project):
+    """
+    Returns the project's saved dependency graph, computing the schedule
+    first if the project has none yet.
+    """
+    if "graph" not in project.get("schedule", {}):
+        schedule_project(project)
+    return project["schedule"]["graph"]
+
+
+def rename_scheduled_task(project, old_title, new_title):
+    """
+    Renames a task in the saved schedule and in its neighbours' edges.
+    """
+    schedule = project.get("schedule")
+    if schedule is None or old_title not in schedule["tasks"]:
+        return
+    schedule["tasks"][new_title] = schedule["tasks"].pop(old_title)
+    graph = schedule.get("graph")
+    if graph is not None and old_title in graph:
+        node = graph[new_title] = graph.pop(old_title)
+        for key, other_key in (("blocked_by", "blocks"), ("blocks", "blocked_by")):
+            for other in node[key]:
+                edges = graph[other][other_key]
+                edges[edges.index(old_title)] = new_title
+
+
+def find_dependency_path(project, start, goal):
+    """
+    Returns the titles from start to goal following "blocks" edges, or None
+    when start doesn't (transitively) block goal. Only tasks ranked before
+    goal can lead to it, so the search stops at those ranked after it.
+    """
+    graph = schedule_graph(project)
+    if start not in graph or goal not in graph:
+        return None
+    limit = graph[goal]["rank"]
+    previous = {start: None}
+    queue = [start]
+    for title in queue:
+        if title == goal:
+            path = []
+            while title is not None:
+                path.append(title)
+                title = previous[title]
+            return path[::-1]
+        for other in graph[title]["blocks"]:
+            if other not in previous and graph[other]["rank"] <= limit:
+                previous[other] = title
+                queue.append(other)
+    return None
+
+
+def schedule_project(project, changed=None, removed=()):
+    """
+    Brings project["schedule"] up to date after the tasks in changed were
+    added or got a new duration or new dependencies, and the tasks titled
+    in removed were deleted. Only the graph edges of those tasks are
+    updated; a dependency against the current ranks reorders just the tasks
+    ranked between its two ends. New earliest dates are then passed on to
+    the tasks they block and new latest dates to their blockers, only as far
+    as the numbers actually move. Without a saved graph or with changed=None
+    everything is computed. Returns the number of tasks recomputed.
+    """
+    schedule = project.get("schedule")
+    if schedule is None or "graph" not in schedule or changed is None:
+        tasks, predecessors, successors = _task_graph(project)
+        graph = {title: {"rank": n, "duration": task_duration(tasks[title]), "blocked_by": predecessors[title], "blocks": successors[title]}
+                 for n, title in enumerate(_topological(predecessors, successors))}
+        schedule = project["schedule"] = {"finish": 0, "tasks": {}, "graph": graph, "next_rank": len(graph)}
+        dirty = set(graph)
+        changed, removed = [], ()
+    else:
+        graph, dirty = schedule["graph"], set()
+    entries = schedule["tasks"]
+    finish = schedule["finish"]
+    # Set when the task finishing last may finish earlier now, so the finish has to be looked for.
+    shrunk = False
+
+    for title in removed:
+        node = graph.pop(title, None)
+        if node is None:
+            continue
+        shrunk = shrunk or entries.pop(title)[1] == finish
+        for blocker in node["blocked_by"]:
+            graph[blocker]["blocks"].remove(title)
+            dirty.add(blocker)
+        for successor in node["blocks"]:
+            graph[successor]["blocked_by"].remove(title)
+            dirty.add(successor)
+    for task in changed:
+        if task["title"] not in graph:
+            graph[task["title"]] = {"rank": schedule["next_rank"], "duration": 0, "blocked_by": [], "blocks": []}
+            schedule["next_rank"] += 1
+    for task in changed:
+        title = task["title"]
+        node = graph[title]
+        node["duration"] = task_duration(task)
+        blockers = [blocker for blocker in task.get("blocked_by", []) if blocker in graph]
+        for blocker in node["blocked_by"]:
+            if blocker not in blockers:
+                graph[blocker]["blocks"].remove(title)
+                dirty.add(blocker)
+        for blocker in blockers:
+            if blocker not in node["blocked_by"]:
+                graph[blocker]["blocks"].append(title)
+                dirty.add(blocker)
+                if graph[blocker]["rank"] > node["rank"]:
+                    _reorder(graph, blocker, title)
+        node["blocked_by"] = blockers
+        dirty.add(title)
+    recomputed = 0
+
+    # Forward pass in rank order, so every blocker is final before the tasks it blocks.
+    queue = [(graph[title]["rank"], title) for title in dirty]
+    heapq.heapify(queue)
+    queued = set(dirty)
+    while queue:
+        _, title = heapq.heappop(queue)
+        recomputed += 1
+        node = graph[title]
+        start = max((entries[blocker][1] for blocker in node["blocked_by"]), default=0)
+        entry = entries.setdefault(title, [None] * 4)
+        if entry[:2] != [start, start + node["duration"]]:
+            shrunk = shrunk or (entry[1] == finish and start + node["duration"] < finish)
+            entry[:2] = [start, start + node["duration"]]
+            for successor in node["blocks"]:
+                if successor not in queued:
+                    queued.add(successor)
+                    heapq.heappush(queue, (graph[successor]["rank"], successor))
+    if shrunk:
+        finish = max((entry[1] for entry in entries.values()), default=0)
+    else:
+        finish = max([finish] + [entries[title][1] for title in queued])
+
+    # Backward pass in reverse rank order; a new finish moves every task that blocks nothing.
+    backward = set(dirty)
+    if finish != schedule["finish"]:
+        backward.update(title for title, node in graph.items() if not node["blocks"])
+    schedule["finish"] = finish
+    queue = [(-graph[title]["rank"], title) for title in backward]
+    heapq.heapify(queue)
+    while queue:
+        _, title = heapq.heappop(queue)
+        recomputed += 1
+        node = graph[title]
+        latest_finish = min((entries[successor][2] for successor in node["blocks"]), default=finish)
+        entry = entries[title]
+        if entry[2:] != [latest_finish - node["duration"], latest_finish]:
+            entry[2:] = [latest_finish - node["duration"], latest_finish]
+            for blocker in node["blocked_by"]:
+                if blocker not in backward:
+                    backward.add(blocker)
+                    heapq.heappush(queue, (-graph[blocker]["rank"], blocker))
+    return recomputed
+
+
+def critical_path(project):
+    """
+    Returns one chain of tasks without slack from the project start to its finish.
+    """
+    graph = schedule_graph(project)
+    entries = project["schedule"]["tasks"]
+    critical = {title for title, (start, _, latest_start, _) in entries.items() if start == latest_start}
+    # A task without slack always has a successor without slack starting when it
+    # finishes, unless it finishes the project, so any start of the chain will do.
+    title = min((title for title in critical if entries[title][0] == 0), default=None)
+    path = []
+    while title is not None:
+        path.append(title)
+        finish = entries[title][1]
+        title = min((successor for successor in graph[title]["blocks"]
+                     if successor in critical and entries[successor][0] == finish), default=None)
+    return path
+
+
+def task_rank(task):
+    return task.get("rank", 0)
+
+
+def rank_between(before, after):
+    """
+    Returns a rank that sorts between the ranks of two neighbouring tasks,
+    None standing for the top or bottom of the column. Returns None when
+    the ranks are too close to split and the column needs rebalancing.
+    """
+    if before is None and after is None:
+        return 1
+    if after is None:
+        return math.floor(before) + 1
+    if before is None:
+        return math.ceil(after) - 1
+    rank = (before + after) / 2
+    return rank if before < rank < after else None
+
+
+def rebalance_column(task_list):
+    """
+    Gives the tasks of a column the ranks 1, 2, 3... in their current order.
+    Returns the new ranks by title.
+    """
+    for position, task in enumerate(task_list, 1):
+        task["rank"] = position
+    return {task["title"]: task["rank"] for task in task_list}
+
+
+def place_task(task_list, task):
+    """
+    Inserts task into a column kept sorted by rank.
+    """
+    bisect.insort(task_list, task, key=task_rank)
+
+
+# --- Instrumentation ---
+# Set TRELLOMIZE_STATS=1 to record call counts and latency histograms. When it is
+# unset the decorators below return the original functions, so there is no overhead.
+STATS_ENABLED = os.environ.get("TRELLOMIZE_STATS", "") not in ("", "0")
+STATS_FILENAME = os.environ.get("TRELLOMIZE_STATS_FILE", "stats.json")
+
+_stats = {}
+_stats_lock = threading.Lock()
+_no_timer = nullcontext()
+
+
+def record_timing(name, seconds):
+    """
+    Adds one call of the given duration to the statistics for name.
+    Latencies go into power-of-two microsecond buckets keyed by their upper bound.
+    """
+    micros = seconds * 1_000_000
+    bucket = str(1 << max(0, int(micros)).bit_length())
+    with _stats_lock:
+        entry = _stats.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "histogram": {}})
+        entry["count"] += 1
+        entry["total_ms"] += seconds * 1000
+        entry["max_ms"] = max(entry["max_ms"], seconds * 1000)
+        entry["histogram"][bucket] = entry["histogram"].get(bucket, 0) + 1
+
+
+class _Timer:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        record_timing(self.name, time.perf_counter() - self.start)
+
+
+def timed(name):
+    """
+    Context manager that records how long its block takes under name.
+    """
+    return _Timer(name) if STATS_ENABLED else _no_timer
+
+
+def instrumented(name=None):
+    """
+    Decorator that records call counts and latencies of a function.
+    """
+    def decorate(func):
+        if not STATS_ENABLED:
+            return func
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_timing(label, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def instrument_methods(cls):
+    """
+    Class decorator that instruments every public method defined on the class.
+    Context-manager methods are left alone since timing them would only time their creation.
+    """
+    if STATS_ENABLED:
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith("_") or not inspect.isfunction(value):
+                continue
+            if inspect.isgeneratorfunction(getattr(value, "__wrapped__", value)):
+                continue
+            setattr(cls, attr, instrumented(f"{cls.__name__}.{attr}")(value))
+    return cls
+
+
+def merge_stats(into, other):
+    """
+    Adds the statistics in other to into.
+    """
+    for name, entry in other.items():
+        target = into.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "histogram": {}})
+        target["count"] += entry["count"]
+        target["total_ms"] += entry["total_ms"]
+        target["max_ms"] = max(target["max_ms"], entry["max_ms"])
+        for bucket, count in entry["histogram"].items():
+            target["histogram"][bucket] = target["histogram"].get(bucket, 0) + count
+    return into
+
+
+def dump_stats(filename=None):
+    """
+    Merges this process's statistics into the stats file.
+    """
+    filename = filename or STATS_FILENAME
+    with _stats_lock:
+        current = json.loads(json.dumps(_stats))
+    if not current:
+        return
+    path = os.path.abspath(f"{filename}.lock")
+    with _file_locks_guard:
+        lock = _file_locks.setdefault(path, _FileLock(path))
+    lock.acquire()
+    try:
+        try:
+            with open(filename) as f:
+                merged = merge_stats(json.load(f), current)
+        except (FileNotFoundError, ValueError):
+            merged = current
+        tmp_filename = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp_filename, "w") as f:
+            json.dump(merged, f, indent=2)
+        os.replace(tmp_filename, filename)
+    finally:
+        lock.release()
+
+
+def histogram_percentile(histogram, fraction):
+    """
+    Estimates a latency percentile in milliseconds from a bucketed histogram,
+    returning the upper bound of the bucket it falls in.
+    """
+    total = sum(histogram.values())
+    seen = 0
+    for bucket in sorted(histogram, key=int):
+        seen += histogram[bucket]
+        if seen >= fraction * total:
+            return int(bucket) / 1000
+    return 0.0
+
+
+def summarize_stats(stats):
+    """
+    Returns per-operation counts and latency figures, slowest total time first.
+    """
+    summary = {}
+    for name, entry in sorted(stats.items(), key=lambda item: -item[1]["total_ms"]):
+        summary[name] = {
+            "count": entry["count"],
+            "total_ms": round(entry["total_ms"], 3),
+            "mean_ms": round(entry["total_ms"] / entry["count"], 3),
+            "p50_ms": min(histogram_percentile(entry["histogram"], 0.5), round(entry["max_ms"], 3)),
+            "p95_ms": min(histogram_percentile(entry["histogram"], 0.95), round(entry["max_ms"], 3)),
+            "max_ms": round(entry["max_ms"], 3),
+        }
+    return summary
+
+
+if STATS_ENABLED:
+    atexit.register(dump_stats)
+
+
+DEFAULT_BCRYPT_ROUNDS = 12
+
+
+def bcrypt_rounds():
+    """
+    Returns the configured bcrypt work factor (TRELLOMIZE_BCRYPT_ROUNDS, default 12).
+    """
+    return int(os.environ.get("TRELLOMIZE_BCRYPT_ROUNDS", DEFAULT_BCRYPT_ROUNDS))
+
+
+def hash_cost(hashed_password):
+    """
+    Returns the work factor a bcrypt hash was created with.
+    """
+    return int(hashed_password.split("$")[2])
+
+
+def benchmark_bcrypt(min_cost=4, max_cost=16, target_ms=250, runs=3):
+    """
+    Times bcrypt hashing for each cost on this machine and recommends the
+    highest cost that stays within target_ms. Stops early once a cost takes
+    more than twice the target, since every step doubles the time.
+    """
+    import bcrypt
+
+    results = []
+    recommended = min_cost
+    for cost in range(min_cost, max_cost + 1):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            bcrypt.hashpw(b"benchmark-password", bcrypt.gensalt(cost))
+            timings.append((time.perf_counter() - start) * 1000)
+        elapsed = sorted(timings)[len(timings) // 2]
+        results.append({"cost": cost, "ms": round(elapsed, 2)})
+        if elapsed <= target_ms:
+            recommended = cost
+        if elapsed > target_ms * 2:
+            break
+    return results, recommended
+
+
+def percentile(values, fraction):
+    """
+    Returns the value at the given fraction (0..1) of a sorted sequence.
+    """
+    if len(values) == 0:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def rotated_logs(filename):
+    """
+    Returns filename and the files loguru rotated it into (app.<time>.log
+    for app.log), oldest first.
+    """
+    root, extension = os.path.splitext(filename)
+    return sorted(glob.glob(f"{glob.escape(root)}.*{extension}")) + [filename]
+
+
+def analyze_log(lines):
+    """
+    Aggregates structured log records into per-operation counts, error
+    counts and latency percentiles. Counts of sampled records are scaled
+    back up by their sample rate; lines that aren't JSON records are skipped.
+    """
+    operations = {}
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(record, dict) or "op" not in record:
+            continue
+        op = operations.setdefault(record["op"], {"count": 0.0, "errors": 0, "durations": []})
+        op["count"] += 1 / record.get("sample", 1)
+        if record.get("level") in ("ERROR", "CRITICAL"):
+            op["errors"] += 1
+        if "duration_ms" in record:
+            op["durations"].append(record["duration_ms"])
+
+    summary = {}
+    for name, op in sorted(operations.items()):
+        durations = sorted(op["durations"])
+        summary[name] = {
+            "count": round(op["count"]),
+            "errors": op["errors"],
+            "mean_ms": round(sum(durations) / len(durations), 3) if durations else None,
+            "p50_ms": percentile(durations, 0.5) if durations else None,
+            "p95_ms": percentile(durations, 0.95) if durations else None,
+            "max_ms": durations[-1] if durations else None,
+        }
+    return summary
+
+
+def print(*args, **kwargs):
+    """
+    Prints with rich markup. rich is imported on first use to keep startup fast.
+    """
+    from rich import print as rich_print
+    rich_print(*args, **kwargs)
+
+
+def add_user_filter_arguments(parser):
+    parser.add_argument("--active", dest="is_active", action="store_const", const=True, help="Only active users")
+    parser.add_argument("--inactive", dest="is_active", action="store_const", const=False, help="Only inactive users")
+    parser.add_argument("--email_domain", help="Only users with an email address at this domain")
+    parser.add_argument("--min_projects", type=int, help="Only users in at least this many projects")
+    parser.add_argument("--max_projects", type=int, help="Only users in at most this many projects")
+
+
+def user_filters(args):
+    """
+    Returns the user filters given on the command line, for UserManager.list_users() and friends.
+    """
+    return {key: getattr(args, key) for key in ("is_active", "email_domain", "min_projects", "max_projects")}
+
+
+def build_parser():
+    """
+    Builds the command-line parser. Kept out of module scope so importing
+    this module as a library doesn't pay for it.
+    """
+    # Create main parser
+    parser = argparse.ArgumentParser(description="Manage administrative tasks", formatter_class=CustomHelpFormatter)
+
+    # Create subparsers for each command
+    subparsers = parser.add_subparsers(dest="command", help="Command to execute")
+
+    # --- Admin Management ---
+    admin_parser = subparsers.add_parser("create-user",help="Create a new administrator account",formatter_class=CustomHelpFormatter)
+    admin_parser.add_argument("--username", required=True, help="Username for the administrator account")
+    admin_parser.add_argument("--password", required=True, help="Password for the administrator account")
+    admin_parser.add_argument("--is_active", type=str2bool, nargs="?", const=True, default=True, help="Activate the administrator account")
+    admin_parser.add_argument("--email", required=True, help="Email address for the administrator")
+
+    list_users_parser = subparsers.add_parser("list-users", help="List users matching filters, one page at a time", formatter_class=CustomHelpFormatter)
+    add_user_filter_arguments(list_users_parser)
+    list_users_parser.add_argument("--offset", type=int, default=0, help="Number of users to skip (default 0)")
+    list_users_parser.add_argument("--limit", type=int, default=50, help="Users per page (default 50)")
+    list_users_parser.add_argument("--json", action="store_true", help="Print the users as JSON")
+
+    bulk_users_parser = subparsers.add_parser("bulk-users", help="Activate, deactivate or delete every user matching filters in one write", formatter_class=CustomHelpFormatter)
+    bulk_users_parser.add_argument("--action", required=True, choices=["activate", "deactivate", "delete"], help="What to do with the matching users")
+    add_user_filter_arguments(bulk_users_parser)
+
+    # --- Project Management ---
+    project_parser = subparsers.add_parser("create-project", help="Create a new project", formatter_class=CustomHelpFormatter)
+    project_parser.add_argument("--title", required=True, help="Project Title")
+    project_parser.add_argument("--start_date", required=True, help="Project Start Date (dd/mm/yyyy)")
+    project_parser.add_argument("--owner", required=True, help="Owner of the project")
+
+    # --- Purge Data ---
+    purge_parser = subparsers.add_parser("purge-data", help="Purge all data")
+
+    # --- Task Management ---
+    task_parser = subparsers.add_parser("add-task", help="Add a new task", formatter_class=CustomHelpFormatter)
+    task_parser.add_argument("--project_title", required=True, help="Project Title")
+    task_parser.add_argument("--title", required=True, help="Task Title")
+    task_parser.add_argument("--description", help="Description (Optional)")
+    task_parser.add_argument("--duration", default=1, type=int, help="Duration in days (Optional)")
+    task_parser.add_argument("--priority", choices=["CRITICAL", "HIGH", "MEDIUM", "LOW"], default="MEDIUM", help="Task priority (Optional)")
+    task_parser.add_argument("--status", choices=["BACKLOG","TODO", "DOING", "DONE", "ARCHIVED"], default="TODO", help="Task status (Optional)")
+
+    task_parser = subparsers.add_parser("move-task", help="Move a task to a different status")
+    task_parser.add_argument("--project_title", required=True, help="Project Title")
+    task_parser.add_argument("--task_title", required=True, help="Task Title")
+    task_parser.add_argument("--new_status", required=True, choices=["BACKLOG","TODO", "DOING", "DONE", "ARCHIVED"], help="New task status")
+    task_parser.add_argument("--position", type=int, help="Position in the new column, 1 being the top (default: bottom)")
+
+    task_parser = subparsers.add_parser("delete-task", help="Delete a task", formatter_class=CustomHelpFormatter)
+    task_parser.add_argument("--project_title", required=True, help="Project Title")
+    task_parser.add_argument("--task_title", required=True, help="Task Title")
+
+    task_parser = subparsers.add_parser("assign-member", help="Assign a user to a task")
+    task_parser.add_argument("--project_title", required=True, help="Project Title")
+    task_parser.add_argument("--task_title", required=True, help="Task Title")
+    task_parser.add_argument("--username", required=True, help="Username of the member to assign")
+
+    task_parser = subparsers.add_parser("remove_assignee", help="Remove a user from a task")
+    task_parser.add_argument("--project_title", required=True, help="Project Title")
+    task_parser.add_argument("--task_title", required=True, help="Task Title")
+    task_parser.add_argument("--username", required=True, help="Username of the member to assign")
+
+    # --- Member Management ---
+    member_parser = subparsers.add_parser("add-member", help="Add a user to a project", formatter_class=CustomHelpFormatter)
+    member_parser.add_argument("--project_title", required=True, help="Project Title")
+    member_parser.add_argument("--username", required=True, help="Username")
+
+    member_parser = subparsers.add_parser("remove-member", help="Remove a user from a project")
+    member_parser.add_argument("--project_title", required=True, help="Project Title")
+    member_parser.add_argument("--username", required=True, help="Username")
+
+    # --- Backups ---
+    backup_parser = subparsers.add_parser("backup", help="Back up users, projects and comments, saving only what changed", formatter_class=CustomHelpFormatter)
+    backup_parser.add_argument("--full", action="store_true", help="Compare every project by content instead of by version")
+    backup_parser.add_argument("--keep_last", type=int, default=10, help="Backups to keep regardless of age (default 10)")
+    backup_parser.add_argument("--keep_days", type=int, default=30, help="Keep the last backup of each of this many days (default 30)")
+
+    subparsers.add_parser("list-backups", help="List the saved backups")
+
+    restore_parser = subparsers.add_parser("restore", help="Restore the newest backup taken at or before a time", formatter_class=CustomHelpFormatter)
+    restore_parser.add_argument("--at", type=datetime.fromisoformat, help="Timestamp such as 2024-05-01T12:00 (default: the latest backup)")
+
+    subparsers.add_parser("snapshot", help="Build or refresh the read-only snapshot reports share")
+
+    # --- Undo ---
+    subparsers.add_parser("undo", help="Revert the last task or member change made from the command line")
+    subparsers.add_parser("redo", help="Apply the last undone change again")
+
+    # --- Comment Management ---
+    add_comment_parser = subparsers.add_parser("add-comment", help="Add a comment to a task", formatter_class=CustomHelpFormatter)
+    add_comment_parser.add_argument("--project_title", required=True, help="Project Title")
+    add_comment_parser.add_argument("--task_title", required=True, help="Task Title")
+    add_comment_parser.add_argument("--comment_body", required=True, help="Comment body")
+    add_comment_parser.add_argument("--author", required=True, help="Author of the comment")
+
+    edit_comment_parser = subparsers.add_parser("edit-comment", help="Edit a comment on a task")
+    edit_comment_parser.add_argument("--project_title", required=True, help="Project Title")
+    edit_comment_parser.add_argument("--task_title", required=True, help="Task Title")
+    edit_comment_parser.add_argument("--comment_id", required=True, help="Id of the comment to edit")
+    edit_comment_parser.add_argument("--new_comment", required=True, help="New comment body")
+
+    delete_comment_parser = subparsers.add_parser("delete-comment", help="Delete a comment on a task")
+    delete_comment_parser.add_argument("--project_title", required=True, help="Project Title")
+    delete_comment_parser.add_argument("--task_title", required=True, help="Task Title")
+    delete_comment_parser.add_argument("--comment_id", required=True, help="Id of the comment to delete")
+
+    list_comments_parser = subparsers.add_parser("list-comments", help="List a page of the comments on a task", formatter_class=CustomHelpFormatter)
+    list_comments_parser.add_argument("--project_title", required=True, help="Project Title")
+    list_comments_parser.add_argument("--task_title", required=True, help="Task Title")
+    list_comments_parser.add_argument("--offset", type=int, default=0, help="Number of comments to skip (default 0)")
+    list_comments_parser.add_argument("--limit", type=int, default=20, help="Comments per page (default 20)")
+    list_comments_parser.add_argument("--json", action="store_true", help="Print the comments as JSON")
+
+    subparsers.add_parser("compact-comments", help="Rewrite the comment store without edited or deleted comments", formatter_class=CustomHelpFormatter)
+
+    compact_changes_parser = subparsers.add_parser("compact-changes", help="Drop old entries from the change feed", formatter_class=CustomHelpFormatter)
+    compact_changes_parser.add_argument("--hours", type=float, default=168, help="Keep the entries of the last this many hours (default 168, a week)")
+
+    # --- Subtasks ---
+    add_subtask_parser = subparsers.add_parser("add-subtask", help="Add a checklist item to a task or under another item", formatter_class=CustomHelpFormatter)
+    add_subtask_parser.add_argument("--project_title", required=True, help="Project Title")
+    add_subtask_parser.add_argument("--task_title", required=True, help="Task Title")
+    add_subtask_parser.add_argument("--title", required=True, help="Item title")
+    add_subtask_parser.add_argument("--duration", type=int, default=0, help="Days the item needs (default 0)")
+    add_subtask_parser.add_argument("--parent", help="Id of the item to add it under, such as 2.1 (default: the task)")
+
+    check_subtask_parser = subparsers.add_parser("check-subtask", help="Check a checklist item and everything under it", formatter_class=CustomHelpFormatter)
+    check_subtask_parser.add_argument("--project_title", required=True, help="Project Title")
+    check_subtask_parser.add_argument("--task_title", required=True, help="Task Title")
+    check_subtask_parser.add_argument("--id", required=True, help="Item id")
+    check_subtask_parser.add_argument("--uncheck", action="store_true", help="Uncheck it instead")
+
+    remove_subtask_parser = subparsers.add_parser("remove-subtask", help="Remove a checklist item and everything under it")
+    remove_subtask_parser.add_argument("--project_title", required=True, help="Project Title")
+    remove_subtask_parser.add_argument("--task_title", required=True, help="Task Title")
+    remove_subtask_parser.add_argument("--id", required=True, help="Item id")
+
+    list_subtasks_parser = subparsers.add_parser("list-subtasks", help="Show a task's checklist with its progress", formatter_class=CustomHelpFormatter)
+    list_subtasks_parser.add_argument("--project_title", required=True, help="Project Title")
+    list_subtasks_parser.add_argument("--task_title", required=True, help="Task Title")
+    list_subtasks_parser.add_argument("--json", action="store_true", help="Print the checklist as JSON")
+
+    # --- Attachments ---
+    add_attachment_parser = subparsers.add_parser("add-attachment", help="Attach a file to a task", formatter_class=CustomHelpFormatter)
+    add_attachment_parser.add_argument("--project_title", required=True, help="Project Title")
+    add_attachment_parser.add_argument("--task_title", required=True, help="Task Title")
+    add_attachment_parser.add_argument("--file", required=True, help="File to attach")
+    add_attachment_parser.add_argument("--name", help="Attachment name (default: the file's name)")
+
+    list_attachments_parser = subparsers.add_parser("list-attachments", help="List the files attached to a task", formatter_class=CustomHelpFormatter)
+    list_attachments_parser.add_argument("--project_title", required=True, help="Project Title")
+    list_attachments_parser.add_argument("--task_title", required=True, help="Task Title")
+    list_attachments_parser.add_argument("--json", action="store_true", help="Print the attachments as JSON")
+
+    get_attachment_parser = subparsers.add_parser("get-attachment", help="Write an attached file out", formatter_class=CustomHelpFormatter)
+    get_attachment_parser.add_argument("--project_title", required=True, help="Project Title")
+    get_attachment_parser.add_argument("--task_title", required=True, help="Task Title")
+    get_attachment_parser.add_argument("--name", required=True, help="Attachment name")
+    get_attachment_parser.add_argument("--output", default="-", help="Output file, or '-' for stdout (default)")
+
+    remove_attachment_parser = subparsers.add_parser("remove-attachment", help="Detach a file from a task")
+    remove_attachment_parser.add_argument("--project_title", required=True, help="Project Title")
+    remove_attachment_parser.add_argument("--task_title", required=True, help="Task Title")
+    remove_attachment_parser.add_argument("--name", required=True, help="Attachment name")
+
+    attachments_gc_parser = subparsers.add_parser("attachments-gc", help="Delete stored files no task, backup or undo step uses", formatter_class=CustomHelpFormatter)
+    attachments_gc_parser.add_argument("--min_age", type=int, default=3600, help="Keep files younger than N seconds (default 3600)")
+
+    # --- Sessions ---
+    login_parser = subparsers.add_parser("login", help="Log in and cache a session token", formatter_class=CustomHelpFormatter)
+    login_parser.add_argument("--username", required=True, help="Username")
+    login_parser.add_argument("--password", required=True, help="Password")
+
+    subparsers.add_parser("logout", help="Forget the cached session token")
+
+    whoami_parser = subparsers.add_parser("whoami", help="Show the user the session token belongs to")
+    whoami_parser.add_argument("--token", help="Token to check (default: the cached session token)")
+
+    # --- Password Hashing ---
+    bench_bcrypt_parser = subparsers.add_parser("bench-bcrypt", help="Measure bcrypt hash time per cost and recommend one", formatter_class=CustomHelpFormatter)
+    bench_bcrypt_parser.add_argument("--min_cost", type=int, default=4, help="Lowest cost to measure (default 4)")
+    bench_bcrypt_parser.add_argument("--max_cost", type=int, default=16, help="Highest cost to measure (default 16)")
+    bench_bcrypt_parser.add_argument("--target_ms", type=float, default=250, help="Acceptable hash time in milliseconds (default 250)")
+
+    # --- Log Analysis ---
+    log_stats_parser = subparsers.add_parser("log-stats", help="Summarise the structured application log per operation", formatter_class=CustomHelpFormatter)
+    log_stats_parser.add_argument("--log", nargs="+", help="Log files to read (default: app.log and the files it was rotated into)")
+    log_stats_parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+
+    # --- Instrumentation ---
+    stats_parser = subparsers.add_parser("stats", help="Show call counts and latencies recorded with TRELLOMIZE_STATS=1", formatter_class=CustomHelpFormatter)
+    stats_parser.add_argument("--file", default=None, help="Stats file to read (default: TRELLOMIZE_STATS_FILE or stats.json)")
+    stats_parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    stats_parser.add_argument("--reset", action="store_true", help="Delete the stats file after showing it")
+
+    # --- Benchmark Fixtures ---
+    fixture_parser = subparsers.add_parser("generate-fixture", help="Write a synthetic workspace for benchmarks", formatter_class=CustomHelpFormatter)
+    fixture_parser.add_argument("--users", type=int, default=100, help="Number of users (default 100)")
+    fixture_parser.add_argument("--projects", type=int, default=10, help="Number of projects (default 10)")
+    fixture_parser.add_argument("--tasks_per_status", default="20", help="Tasks per status in each project: N, or e.g. TODO=100,DONE=50 (default 20)")
+    fixture_parser.add_argument("--comments", type=int, default=2, help="Comments per task (default 2)")
+    fixture_parser.add_argument("--assignees", type=int, default=1, help="Assignees per task (default 1)")
+    fixture_parser.add_argument("--members", type=int, default=5, help="Members per project besides the owner (default 5)")
+    fixture_parser.add_argument("--seed", type=int, default=0, help="Random seed (default 0)")
+    fixture_parser.add_argument("--user_file", default="users.json", help="Users file to write (default users.json)")
+    fixture_parser.add_argument("--data_file", default="data.json", help="Data file to write (default data.json)")
+
+    # --- Memory Profiling ---
+    profile_memory_parser = subparsers.add_parser("profile-memory", help="Report memory and disk size per project, status, comments and users", formatter_class=CustomHelpFormatter)
+    profile_memory_parser.add_argument("--top", type=int, default=20, help="Show the N largest projects (default 20)")
+    profile_memory_parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+
+    # --- Project Statistics ---
+    project_stats_parser = subparsers.add_parser("project-stats", help="Show task counts, overdue tasks and burndown of a project", formatter_class=CustomHelpFormatter)
+    project_stats_parser.add_argument("--project_title", required=True, help="Title of the project")
+    project_stats_parser.add_argument("--json", action="store_true", help="Print the statistics as JSON")
+
+    # --- Dependencies ---
+    add_dependency_parser = subparsers.add_parser("add-dependency", help="Mark a task as blocked by another task", formatter_class=CustomHelpFormatter)
+    add_dependency_parser.add_argument("--project_title", required=True, help="Title of the project")
+    add_dependency_parser.add_argument("--task_title", required=True, help="Title of the blocked task")
+    add_dependency_parser.add_argument("--blocked_by", required=True, help="Title of the task it waits for")
+
+    remove_dependency_parser = subparsers.add_parser("remove-dependency", help="Remove a dependency between two tasks", formatter_class=CustomHelpFormatter)
+    remove_dependency_parser.add_argument("--project_title", required=True, help="Title of the project")
+    remove_dependency_parser.add_argument("--task_title", required=True, help="Title of the blocked task")
+    remove_dependency_parser.add_argument("--blocked_by", required=True, help="Title of the task it waits for")
+
+    schedule_parser = subparsers.add_parser("schedule", help="Show earliest and latest dates of every task and the critical path", formatter_class=CustomHelpFormatter)
+    schedule_parser.add_argument("--project_title", required=True, help="Title of the project")
+    schedule_parser.add_argument("--json", action="store_true", help="Print the schedule as JSON")
+
+    # --- Name Completion ---
+    suggest_parser = subparsers.add_parser("suggest", help="Complete a username, project title or task title, or suggest what was meant", formatter_class=CustomHelpFormatter)
+    suggest_parser.add_argument("--kind", required=True, choices=["users", "projects", "tasks"], help="What to complete")
+    suggest_parser.add_argument("--text", required=True, help="Prefix or misspelled name")
+    suggest_parser.add_argument("--project_title", help="Project whose task titles to complete (for --kind tasks)")
+    suggest_parser.add_argument("--limit", type=int, default=5, help="Maximum number of names (default 5)")
+
+    # --- Task Reports ---
+    task_report_parser = subparsers.add_parser("task-report", help="Cross-project task report from a columnar snapshot of the data", formatter_class=CustomHelpFormatter)
+    task_report_parser.add_argument("--columns_file", default=None, help="Snapshot file (default: the data file name plus .columns)")
+    task_report_parser.add_argument("--rebuild", action="store_true", help="Rebuild the snapshot even if it is up to date")
+    task_report_parser.add_argument("--top", type=int, default=20, help="Show the N busiest assignees (default 20)")
+    task_report_parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+
+    # --- Digests ---
+    digest_parser = subparsers.add_parser("digest", help="Write a daily digest file for every user from one pass over the workspace", formatter_class=CustomHelpFormatter)
+    digest_parser.add_argument("--output_dir", default="digests", help="Directory for the digest files (default digests)")
+    digest_parser.add_argument("--format", choices=["markdown", "json", "both"], default="markdown", help="File format (default markdown)")
+    digest_parser.add_argument("--days", type=int, default=3, help="Include open tasks due within N days (default 3)")
+    digest_parser.add_argument("--hours", type=int, default=24, help="Include moves and comments of the last N hours (default 24)")
+    digest_parser.add_argument("--workers", type=int, default=1, help="Worker processes (default 1)")
+
+    # --- Batch Mode ---
+    batch_parser = subparsers.add_parser("batch", help="Run a script of commands against one loaded copy of the data", formatter_class=CustomHelpFormatter)
+    batch_parser.add_argument("--file", default="-", help="Script file with one command per line, or '-' for stdin (default)")
+    batch_parser.add_argument("--commit_every", type=int, default=0, help="Commit after every N commands (default: once at the end)")
+    batch_parser.add_argument("--stop_on_error", action="store_true", help="Stop at the first failing command")
+    batch_parser.add_argument("--report", help="Write the per-command report to this JSON file")
+
+    return parser
+
+
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+
+class _FileLock:
+    """A reentrant lock shared by threads in this process and, through flock, by other processes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.handle = None
+
+    def acquire(self):
+        self.thread_lock.acquire()
+        if self.depth == 0 and fcntl is not None:
+            self.handle = open(self.path, "a")
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        self.depth += 1
+
+    def release(self):
+        self.depth -= 1
+        if self.depth == 0 and self.handle is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+            self.handle = None
+        self.thread_lock.release()
+
+
+FEED_BLOCK_SIZE = 1 << 16
+
+
+def reversed_lines(f):
+    """
+    Yields the complete lines of the binary file f, last first, reading
+    it backwards in blocks. A last line without a newline is an unfinished
+    append and is left out.
+    """
+    position = f.seek(0, os.SEEK_END)
+    rest, trailing = b"", True
+    while position > 0:
+        size = min(FEED_BLOCK_SIZE, position)
+        position -= size
+        f.seek(position)
+        pieces = (f.read(size) + rest).split(b"\n")
+        # The first piece may be the end of a line that starts in an earlier block.
+        rest = pieces.pop(0)
+        for piece in reversed(pieces):
+            if trailing:
+                trailing = False
+            elif piece:
+                yield piece
+    if rest and not trailing:
+        yield rest
+
+
+class ChangeFeed:
+    """
+    Reads the append-only change feed written next to the data file, one
+    JSON entry per line. Each poll() only reads what was appended since
+    the previous one.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.offset = 0
+        self.inode = None
+
+    def seek_end(self):
+        """
+        Skips everything already in the feed.
+        """
+        try:
+            stat = os.stat(self.filename)
+            self.offset, self.inode = stat.st_size, stat.st_ino
+        except FileNotFoundError:
+            self.offset, self.inode = 0, None
+
+    def poll(self):
+        """
+        Returns the entries appended since the last poll, or None when the
+        feed was replaced and the reader has to reload from the data file.
+        """
+        try:
+            with open(self.filename, "rb") as f:
+                inode = os.fstat(f.fileno()).st_ino
+                f.seek(0, os.SEEK_END)
+                replaced = (self.inode is not None and inode != self.inode) or f.tell() < self.offset
+                self.inode = inode
+                if replaced:
+                    self.offset = 0
+                    return None
+                f.seek(self.offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            if self.offset:
+                self.offset, self.inode = 0, None
+                return None
+            return []
+        # A writer may be mid-append; leave a partial last line for the next poll.
+        end = chunk.rfind(b"\n") + 1
+        self.offset += end
+        return [json.loads(line) for line in chunk[:end].splitlines() if line]
+
+    def since(self, project_id, version):
+        """
+        Returns the project's entries newer than version, oldest first. A
+        project's entries are appended in version order, so the feed is read
+        from the end back to version and no further.
+        """
+        changes = []
+        try:
+            f = open(self.filename, "rb")
+        except FileNotFoundError:
+            return changes
+        with f:
+            for line in reversed_lines(f):
+                change = json.loads(line)
+                if change["project_id"] != project_id:
+                    continue
+                if change["version"] <= version:
+                    break
+                changes.append(change)
+        changes.reverse()
+        return changes
+
+
+class CommentStore:
+    """
+    Task comments in an append-only JSON lines file next to the data file,
+    so they are only read when they are shown. Each line adds, edits or
+    deletes a comment; the last line for a comment id wins. The index of
+    where each task's comments are is built on first use and then only
+    reads what was appended since.
+    """
+
+    def __init__(self, filename, end=None):
+        self.filename = filename
+        # Only the first end bytes are read, for a snapshot of the store.
+        self.end = end
+        self._staged = []
+        # Task id -> {comment id: (offset, length) in the file, or a staged record}.
+        self._index = None
+        self._offset = 0
+        self._inode = None
+
+    def stage(self, record):
+        """
+        Queues a record, appended to the file by the next flush().
+        """
+        self._staged.append(record)
+
+    def flush(self):
+        if self._staged:
+            staged, self._staged = self._staged, []
+            with open(self.filename, "a") as f:
+                f.write("".join(json.dumps(record) + "\n" for record in staged))
+
+    def discard(self):
+        """
+        Drops the staged records of an aborted batch.
+        """
+        if self._staged:
+            self._staged = []
+            self._index = None
+
+    def _apply(self, record, location):
+        if "id" not in record:
+            # A deleted task takes all of its comments with it.
+            self._index.pop(record["task"], None)
+        elif record.get("deleted"):
+            self._index.get(record["task"], {}).pop(record["id"], None)
+        else:
+            self._index.setdefault(record["task"], {})[record["id"]] = location
+
+    def _load(self):
+        try:
+            f = open(self.filename, "rb")
+        except FileNotFoundError:
+            self._index, self._offset, self._inode = {}, 0, None
+        else:
+            with f:
+                stat = os.fstat(f.fileno())
+                if self._index is None or stat.st_ino != self._inode or stat.st_size < self._offset:
+                    # First use, or the file was compacted or removed since.
+                    self._index, self._offset, self._inode = {}, 0, stat.st_ino
+                f.seek(self._offset)
+                decode = json.JSONDecoder().raw_decode
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # A writer is mid-append; read the rest next time.
+                        break
+                    if self.end is not None and self._offset + len(line) > self.end:
+                        break
+                    self._apply(decode(line.decode())[0], (self._offset, len(line)))
+                    self._offset += len(line)
+        for record in self._staged:
+            self._apply(record, record)
+        return self._index
+
+    def _read(self, locations):
+        try:
+            f = open(self.filename, "rb")
+        except FileNotFoundError:
+            # Nothing was flushed yet, so every location is a staged record.
+            f = nullcontext()
+        records = []
+        with f:
+            for location in locations:
+                if isinstance(location, dict):
+                    record = location
+                else:
+                    f.seek(location[0])
+                    record = json.loads(f.read(location[1]))
+                records.append({key: value for key, value in record.items() if key != "task"})
+        return records
+
+    def count(self, task_id):
+        return len(self._load().get(task_id, {}))
+
+    def get(self, task_id, comment_id):
+        """
+        Returns a comment of a task by id, or None.
+        """
+        location = self._load().get(task_id, {}).get(comment_id)
+        return self._read([location])[0] if location is not None else None
+
+    def list(self, task_id, offset=0, limit=None):
+        """
+        Returns a task's comments, oldest first, reading only the requested page.
+        """
+        comments = self._load().get(task_id, {})
+        stop = None if limit is None else offset + limit
+        return self._read(list(itertools.islice(comments.values(), offset, stop)))
+
+    def write(self, records):
+        """
+        Replaces the file with records, dropping anything staged.
+        """
+        self.replace("".join(json.dumps(record) + "\n" for record in records).encode())
+
+    def replace(self, content):
+        """
+        Replaces the file with content, e.g. from a backup, dropping anything staged.
+        """
+        tmp_filename = f"{self.filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_filename, "wb") as f:
+            f.write(content)
+        os.replace(tmp_filename, self.filename)
+        self._staged = []
+        self._index = None
+
+    def compact(self, task_ids, extra=()):
+        """
+        Rewrites the file with only the live comments of the tasks in
+        task_ids, followed by the records in extra. Returns the bytes saved.
+        """
+        self.flush()
+        before = os.path.getsize(self.filename) if os.path.exists(self.filename) else 0
+        records = []
+        for task_id, comments in self._load().items():
+            if task_id in task_ids and comments:
+                records.extend(dict(record, task=task_id) for record in self._read(list(comments.values())))
+        records.extend(extra)
+        self.write(records)
+        return before - os.path.getsize(self.filename)
+
+    def remove(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+        self._staged = []
+        self._index = None
+
+
+class PrefixIndex:
+    """
+    Case-insensitive prefix lookups over a set of names. The names are kept
+    as a sorted list of (folded name, name), which answers prefix queries
+    like a trie with one bisect and costs two list entries per name.
+    """
+
+    def __init__(self, names=()):
+        self._keys = sorted({(name.casefold(), name) for name in names})
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, name):
+        key = (name.casefold(), name)
+        i = bisect.bisect_left(self._keys, key)
+        return i < len(self._keys) and self._keys[i] == key
+
+    def add(self, name):
+        key = (name.casefold(), name)
+        i = bisect.bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            self._keys.insert(i, key)
+
+    def discard(self, name):
+        key = (name.casefold(), name)
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def complete(self, prefix, limit=10):
+        """
+        Returns up to limit names starting with prefix, ignoring case, in order.
+        """
+        folded = prefix.casefold()
+        names = []
+        for i in range(bisect.bisect_left(self._keys, (folded,)), len(self._keys)):
+            if len(names) == limit or not self._keys[i][0].startswith(folded):
+                break
+            names.append(self._keys[i][1])
+        return names
+
+    def _next_chars(self, prefix):
+        """
+        Returns the characters that follow prefix in some name, one bisect per character.
+        """
+        chars = []
+        i = bisect.bisect_left(self._keys, (prefix,))
+        while i < len(self._keys) and self._keys[i][0].startswith(prefix):
+            key = self._keys[i][0]
+            if len(key) == len(prefix):
+                i += 1
+                continue
+            chars.append(key[len(prefix)])
+            i = bisect.bisect_left(self._keys, (prefix + chr(ord(chars[-1]) + 1),), i)
+        return chars
+
+    def suggest(self, text, limit=5, candidates=50):
+        """
+        Returns the names text was probably meant to be: its completions if
+        there are any, otherwise the most similar names that start with
+        text after one typo is fixed (a missing, extra or wrong character,
+        or two swapped neighbours), or failing that the names sharing the
+        longest prefix with text.
+        """
+        names = self.complete(text, limit)
+        if names:
+            return names
+        folded = text.casefold()
+        variants = set()
+        for i in range(len(folded) + 1):
+            head = folded[:i]
+            if i < len(folded):
+                variants.add(head + folded[i + 1:])
+            if i < len(folded) - 1:
+                variants.add(head + folded[i + 1] + folded[i] + folded[i + 2:])
+            # Only characters that some name has after head can fix a wrong or missing one.
+            for char in self._next_chars(head):
+                variants.add(head + char + folded[i + 1:])
+                variants.add(head + char + folded[i:])
+        found = set()
+        for variant in variants:
+            if variant and len(found) < candidates:
+                found.update(self.complete(variant, limit))
+        if not found:
+            for length in range(len(folded) - 1, 0, -1):
+                found.update(self.complete(folded[:length], candidates))
+                if found:
+                    break
+        matcher = difflib.SequenceMatcher(b=folded)
+        scored = []
+        for name in found:
+            matcher.set_seq1(name.casefold())
+            scored.append((-matcher.ratio(), name))
+        return [name for score, name in sorted(scored)[:limit] if score <= -0.5]
+
+
+class NameIndex:
+    """
+    Prefix indexes of the usernames, the project titles and the task titles of each project.
+    """
+
+    def __init__(self, user_data, data):
+        self.users = PrefixIndex(user["username"] for user in user_data.get("users", []))
+        self.projects = PrefixIndex(project["title"] for project in data.get("projects", []))
+        self.tasks = {
+            project["title"]: PrefixIndex(task["title"] for task_list in project.get("tasks", {}).values() for task in task_list)
+            for project in data.get("projects", [])
+        }
+
+    def get(self, kind, project_title=None):
+        """
+        Returns the index of kind ("users", "projects" or "tasks"); tasks need the project title.
+        """
+        if kind == "tasks":
+            return self.tasks.setdefault(project_title, PrefixIndex())
+        if kind in ("users", "projects"):
+            return getattr(self, kind)
+        raise ValueError(f"Unknown name kind '{kind}'.")
+
+    def update(self, kind, old=None, new=None, project_title=None):
+        """
+        Applies an addition (old is None), removal (new is None) or rename.
+        """
+        index = self.get(kind, project_title)
+        if old is not None:
+            index.discard(old)
+            if kind == "projects":
+                self.tasks.pop(old, None)
+        if new is not None:
+            index.add(new)
+
+
+class UndoHistory:
+    """
+    Bounded undo and redo stacks of one session. An entry holds the state
+    before and after an operation of only the tasks or member list it
+    changed, so undoing costs the size of the change. The oldest entries are
+    dropped beyond limit entries or max_bytes. With a filename the stacks
+    are kept in that file, so they outlive a single command: each push,
+    undo or redo appends a line, and the file is rewritten with just the
+    stacks once it has grown to more than twice their size.
+    """
+
+    def __init__(self, limit=100, max_bytes=1 << 20, filename=None):
+        self.limit = limit
+        self.max_bytes = max_bytes
+        self.filename = filename
+        # Entries are kept serialised: immutable, and their size is their length.
+        self.stacks = {"undo": deque(), "redo": deque()}
+        self.sizes = {"undo": 0, "redo": 0}
+        # Signature and length of the file as last read or written.
+        self._signature = None
+        self._file_size = 0
+
+    def _load(self):
+        """
+        Replays the file, unless it is unchanged since this history last
+        read or wrote it.
+        """
+        if self.filename is None or _file_signature(self.filename) == self._signature:
+            return
+        self._reset()
+        self._file_size = 0
+        try:
+            f = open(self.filename)
+        except FileNotFoundError:
+            self._signature = None
+            return
+        with f:
+            self._signature = _file_signature(self.filename)
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A damaged or half-appended line; the lines after it can't be trusted.
+                    break
+                self._file_size += len(line)
+                self._replay(record)
+        if self._trim():
+            self._compact()
+
+    def _replay(self, record):
+        if "push" in record:
+            self._push([json.dumps(entry) for entry in record["push"]])
+            for _ in range(record.get("trim", 0)):
+                self._pop("undo", left=True)
+        elif "shift" in record:
+            self._shift(record["shift"])
+        elif "clear" in record:
+            self._reset()
+        else:
+            # The stacks written out whole, by compaction or an older version.
+            self._reset()
+            for action, stack in self.stacks.items():
+                stack.extend(json.dumps(entry) for entry in record.get(action, []))
+                self.sizes[action] = sum(len(entry) for entry in stack)
+
+    def _append(self, line):
+        if self.filename is None:
+            return
+        with open(self.filename, "a") as f:
+            f.write(line + "\n")
+        self._file_size += len(line) + 1
+        self._signature = _file_signature(self.filename)
+        if self._file_size > 2 * sum(self.sizes.values()):
+            self._compact()
+
+    def _compact(self):
+        # The entries are JSON already, so the file is just the two lists around them.
+        line = "{" + ", ".join(f'"{action}": [{", ".join(stack)}]' for action, stack in self.stacks.items()) + "}\n"
+        tmp_filename = f"{self.filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_filename, "w") as f:
+            f.write(line)
+        os.replace(tmp_filename, self.filename)
+        self._file_size = len(line)
+        self._signature = _file_signature(self.filename)
+
+    def _reset(self):
+        for action, stack in self.stacks.items():
+            stack.clear()
+            self.sizes[action] = 0
+
+    def _pop(self, action, left=False):
+        stack = self.stacks[action]
+        entry = stack.popleft() if left else stack.pop()
+        self.sizes[action] -= len(entry)
+        return entry
+
+    def _push(self, entries):
+        self.stacks["redo"].clear()
+        self.sizes["redo"] = 0
+        self.stacks["undo"].extend(entries)
+        self.sizes["undo"] += sum(len(entry) for entry in entries)
+
+    def _shift(self, action):
+        other = "redo" if action == "undo" else "undo"
+        entry = self._pop(action)
+        self.stacks[other].append(entry)
+        self.sizes[other] += len(entry)
+
+    def _trim(self):
+        """
+        Drops the oldest undo entries until both stacks fit within limit
+        and max_bytes, and returns how many were dropped.
+        """
+        dropped = 0
+        while self.stacks["undo"] and (sum(len(stack) for stack in self.stacks.values()) > self.limit or sum(self.sizes.values()) > self.max_bytes):
+            self._pop("undo", left=True)
+            dropped += 1
+        return dropped
+
+    def __len__(self):
+        self._load()
+        return len(self.stacks["undo"])
+
+    def entries(self):
+        """
+        Returns every entry of both stacks, decoded.
+        """
+        self._load()
+        return [json.loads(entry) for stack in self.stacks.values() for entry in stack]
+
+    def push(self, entries):
+        """
+        Adds entries for new changes, which makes the redo stack obsolete.
+        """
+        self._load()
+        self._push(entries)
+        dropped = self._trim()
+        self._append('{"push": [' + ", ".join(entries) + f'], "trim": {dropped}}}')
+
+    def peek(self, action):
+        """
+        Returns the entry the next undo or redo applies.
+        """
+        self._load()
+        if not self.stacks[action]:
+            raise ValueError(f"Nothing to {action}!")
+        return json.loads(self.stacks[action][-1])
+
+    def shift(self, action):
+        """
+        Moves the entry just undone (or redone) to the other stack.
+        """
+        self._shift(action)
+        self._append(json.dumps({"shift": action}))
+
+    def clear(self):
+        self._load()
+        self._reset()
+        self._append('{"clear": true}')
+
+
+def attachment_hashes(tasks):
+    """
+    Returns the hashes of the files attached to tasks.
+    """
+    return {attachment["sha256"] for task in tasks for attachment in task.get("attachments", [])}
+
+
+class AttachmentStore:
+    """
+    Files attached to tasks, each saved once in a directory under the
+    SHA-256 of its content; tasks only keep the hash, name and size, so
+    data.json stays small. Files are copied in and read back in blocks,
+    or memory-mapped, never loaded whole.
+    """
+
+    block_size = 1 << 20
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, digest):
+        return os.path.join(self.directory, digest)
+
+    def put(self, filename):
+        """
+        Copies filename into the store unless a file with the same content
+        is there already. Returns its hash and size.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_filename = self.path(f"{os.getpid()}.{threading.get_ident()}.tmp")
+        sha256, size = hashlib.sha256(), 0
+        with open(filename, "rb") as source, open(tmp_filename, "wb") as f:
+            for block in iter(lambda: source.read(self.block_size), b""):
+                sha256.update(block)
+                f.write(block)
+                size += len(block)
+        digest = sha256.hexdigest()
+        if os.path.exists(self.path(digest)):
+            os.remove(tmp_filename)
+            # Freshen it, so a collection running now leaves it alone.
+            os.utime(self.path(digest))
+        else:
+            os.replace(tmp_filename, self.path(digest))
+        return digest, size
+
+    def open(self, digest):
+        try:
+            return open(self.path(digest), "rb")
+        except FileNotFoundError:
+            raise ValueError(f"Attachment '{digest}' is missing from the store!") from None
+
+    def map(self, digest):
+        """
+        Returns a read-only memory map of a file, or b"" for an empty one.
+        """
+        with self.open(digest) as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def copy(self, digest, out):
+        """
+        Streams a file to the binary file object out, checking its hash on the way.
+        """
+        sha256 = hashlib.sha256()
+        with self.open(digest) as f:
+            for block in iter(lambda: f.read(self.block_size), b""):
+                sha256.update(block)
+                out.write(block)
+        if sha256.hexdigest() != digest:
+            raise ValueError(f"Attachment '{digest}' is damaged!")
+
+    def gc(self, used, min_age=3600):
+        """
+        Deletes the files whose hash isn't in used, and leftovers of
+        interrupted copies, if they are older than min_age seconds.
+        Returns the number of files and bytes deleted.
+        """
+        removed, freed = 0, 0
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return removed, freed
+        cutoff = time.time() - min_age
+        for name in names:
+            if name in used:
+                continue
+            stat = os.stat(self.path(name))
+            if stat.st_mtime < cutoff:
+                os.remove(self.path(name))
+                removed += 1
+                freed += stat.st_size
+        return removed, freed
+
+
+class BackupStore:
+    """
+    Deduplicated backups of a workspace in a directory. Every project, the
+    users, the rest of the data file and every stretch appended to the
+    comment store is saved once, as a chunk named by the SHA-256 of its
+    content; each backup is a manifest listing its chunks. A project with
+    the same id and version as in the previous backup reuses its chunk
+    without being serialised, so a backup costs what changed since the last.
+    """
+
+    def __init__(self, directory, keep_last=10, keep_days=30):
+        self.directory = directory
+        # Retention: the newest keep_last backups and the newest of each of the last keep_days days.
+        self.keep_last = keep_last
+        self.keep_days = keep_days
+
+    def _path(self, kind, name):
+        return os.path.join(self.directory, kind, name)
+
+    def _write(self, path, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_filename = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_filename, "wb") as f:
+            f.write(content)
+        os.replace(tmp_filename, path)
+
+    @staticmethod
+    def _name(timestamp):
+        return timestamp.strftime("%Y%m%dT%H%M%S.%f") + ".json"
+
+    @staticmethod
+    def _time(name):
+        return datetime.strptime(name[:-len(".json")], "%Y%m%dT%H%M%S.%f")
+
+    def put_chunk(self, content, written):
+        """
+        Saves content unless a chunk with the same hash exists, counting
+        what was saved in written. Returns the hash.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._path("chunks", digest)
+        if not os.path.exists(path):
+            self._write(path, content)
+            written["chunks"] += 1
+            written["bytes"] += len(content)
+        return digest
+
+    def get_chunk(self, digest):
+        with open(self._path("chunks", digest), "rb") as f:
+            content = f.read()
+        if hashlib.sha256(content).hexdigest() != digest:
+            raise ValueError(f"Backup chunk '{digest}' is damaged!")
+        return content
+
+    def list(self):
+        """
+        Returns the names of the backups' manifests, oldest first.
+        """
+        try:
+            names = os.listdir(os.path.join(self.directory, "manifests"))
+        except FileNotFoundError:
+            return []
+        return sorted(name for name in names if name.endswith(".json"))
+
+    def manifest(self, name):
+        with open(self._path("manifests", name)) as f:
+            return json.load(f)
+
+    def find(self, at=None):
+        """
+        Returns the manifest of the newest backup taken at or before at (a datetime), or None.
+        """
+        names = self.list()
+        if at is not None:
+            names = [name for name in names if self._time(name) <= at]
+        return self.manifest(names[-1]) if names else None
+
+    def save(self, user_data, users_signature, data, comments_filename, full=False):
+        """
+        Backs up user_data and data, as loaded from files whose users file
+        had users_signature, and the comment store. With full, every
+        project is serialised and compared by content. Returns the manifest.
+        """
+        previous = None if full else self.find()
+        written = {"chunks": 0, "bytes": 0}
+        timestamp = datetime.now()
+
+        if previous and users_signature is not None and previous["users"]["signature"] == list(users_signature):
+            users = previous["users"]
+        else:
+            signature = list(users_signature) if users_signature else None
+            users = {"chunk": self.put_chunk(json.dumps(user_data).encode(), written), "signature": signature}
+
+        known = {(entry["id"], entry["version"]): entry for entry in previous["data"]["projects"]} if previous else {}
+        projects = []
+        for project in data.get("projects", []):
+            entry = known.get((project.get("id"), project.get("version")))
+            if entry is None or project.get("id") is None or "attachments" not in entry or not os.path.exists(self._path("chunks", entry["chunk"])):
+                tasks = [task for task_list in project.get("tasks", {}).values() for task in task_list]
+                entry = {"chunk": self.put_chunk(json.dumps(project).encode(), written), "attachments": sorted(attachment_hashes(tasks))}
+            projects.append({"id": project.get("id"), "title": project["title"], "version": project.get("version"), "chunk": entry["chunk"], "attachments": entry["attachments"]})
+        rest = {key: value for key, value in data.items() if key != "projects"}
+
+        # The comment store is only appended to, so only what was added since the last backup is read.
+        comments = {"inode": None, "segments": []}
+        try:
+            f = open(comments_filename, "rb")
+        except FileNotFoundError:
+            pass
+        else:
+            with f:
+                stat = os.fstat(f.fileno())
+                comments["inode"] = stat.st_ino
+                if previous and previous["comments"]["inode"] == stat.st_ino:
+                    comments["segments"] = list(previous["comments"]["segments"])
+                offset = sum(length for _, length in comments["segments"])
+                if stat.st_size < offset:
+                    comments["segments"], offset = [], 0
+                if stat.st_size > offset:
+                    f.seek(offset)
+                    content = f.read(stat.st_size - offset)
+                    comments["segments"].append([self.put_chunk(content, written), len(content)])
+
+        manifest = {
+            "timestamp": timestamp.isoformat(),
+            "users": users,
+            "data": {"chunk": self.put_chunk(json.dumps(rest).encode(), written), "projects": projects},
+            "comments": comments,
+            "written": written,
+        }
+        self._write(self._path("manifests", self._name(timestamp)), json.dumps(manifest, indent=2).encode())
+        return manifest
+
+    def load(self, manifest):
+        """
+        Returns the user data, data and comment store content of a backup.
+        """
+        user_data = json.loads(self.get_chunk(manifest["users"]["chunk"]))
+        data = {"projects": [json.loads(self.get_chunk(entry["chunk"])) for entry in manifest["data"]["projects"]]}
+        data.update(json.loads(self.get_chunk(manifest["data"]["chunk"])))
+        comments = b"".join(self.get_chunk(digest) for digest, _ in manifest["comments"]["segments"])
+        return user_data, data, comments
+
+    def attachment_hashes(self):
+        """
+        Returns the hashes of the files attached to tasks in any backup.
+        """
+        used = set()
+        for name in self.list():
+            for entry in self.manifest(name)["data"]["projects"]:
+                used.update(entry.get("attachments", []))
+        return used
+
+    def prune(self, now=None):
+        """
+        Deletes the backups the retention policy doesn't keep, then the
+        chunks no remaining backup uses. Returns the number of backups deleted.
+        """
+        now = now or datetime.now()
+        names = self.list()
+        keep = set(names[-self.keep_last:]) if self.keep_last else set()
+        daily = {}
+        for name in names:
+            if now - self._time(name) <= timedelta(days=self.keep_days):
+                daily[self._time(name).date()] = name
+        keep.update(daily.values())
+        removed = [name for name in names if name not in keep]
+        if not removed:
+            return 0
+        for name in removed:
+            os.remove(self._path("manifests", name))
+        used = set()
+        for name in keep:
+            manifest = self.manifest(name)
+            used.update([manifest["users"]["chunk"], manifest["data"]["chunk"]])
+            used.update(entry["chunk"] for entry in manifest["data"]["projects"])
+            used.update(digest for digest, _ in manifest["comments"]["segments"])
+        for digest in os.listdir(os.path.join(self.directory, "chunks")):
+            if digest not in used and not digest.endswith(".tmp"):
+                os.remove(self._path("chunks", digest))
+        return len(removed)
+
+
+SNAPSHOT_MAGIC = b"TRLSNAP1"
+
+
+class WorkspaceSnapshot:
+    """
+    A read-only view of the workspace as of one committed data file, for
+    reports. It is a file with one JSON blob per project plus the users,
+    memory-mapped, so processes reading the same version share it through
+    the page cache and only decode the projects they look at. Writers never
+    wait for a snapshot and never change what it shows; every call returns
+    freshly decoded objects, so callers can't change it either.
+    """
+
+    def __init__(self, mapped, header, comments_filename):
+        self.mapped = mapped
+        self.header = header
+        self.source = header["source"]
+        self.taken_at = header["taken_at"]
+        self._base = len(SNAPSHOT_MAGIC) + 8 + header["length"]
+        # Each project entry is [title, id, version, member usernames, offset, length].
+        self._projects = {entry[0]: entry for entry in header["projects"]}
+        self._users = None
+        comments = header["comments"]
+        current = _file_signature(comments_filename)
+        # If the comment store was compacted since, its offsets changed; compacting keeps live comments, so read it all.
+        compacted = comments["inode"] is not None and current is not None and current[0] != comments["inode"]
+        self.comments = CommentStore(comments_filename, None if compacted else comments["size"])
+
+    @classmethod
+    def open(cls, filename, comments_filename):
+        with open(filename, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"'{filename}' is not a workspace snapshot")
+        start = len(SNAPSHOT_MAGIC) + 8
+        length = int.from_bytes(mapped[len(SNAPSHOT_MAGIC):start], "little")
+        header = json.loads(mapped[start:start + length])
+        header["length"] = length
+        return cls(mapped, header, comments_filename)
+
+    def _blob(self, offset, length):
+        return json.loads(self.mapped[self._base + offset:self._base + offset + length])
+
+    def close(self):
+        self.mapped.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def versions(self):
+        """
+        The version of every project in the snapshot, by title.
+        """
+        return {title: version for title, _, version, _, _, _ in self.header["projects"]}
+
+    def list_projects(self):
+        return [self._blob(offset, length) for *_, offset, length in self.header["projects"]]
+
+    def get_project(self, title):
+        entry = self._projects.get(title)
+        return self._blob(*entry[4:]) if entry else None
+
+    def get_projects_for_user(self, username):
+        # Membership is in the header, so only the user's projects are decoded.
+        return [self._blob(offset, length) for *_, members, offset, length in self.header["projects"] if username in members]
+
+    def get_tasks_for_project(self, project_title):
+        project = self.get_project(project_title)
+        if not project:
+            raise ValueError(f"Project with title '{project_title}' not found!")
+        return [task for task_list in project.get("tasks", {}).values() for task in task_list]
+
+    def get_task(self, project_title, task_title):
+        for task in self.get_tasks_for_project(project_title):
+            if task["title"] == task_title:
+                return task
+        return None
+
+    def _user_list(self):
+        if self._users is None:
+            self._users = self._blob(*self.header["users"]).get("users", [])
+        return self._users
+
+    def get_user(self, username):
+        for user in self._user_list():
+            if user["username"] == username:
+                return dict(user)
+        return None
+
+    def list_users(self):
+        return [dict(user) for user in self._user_list()]
+
+    def get_members(self):
+        return [user["username"] for user in self._user_list() if not user.get("is_admin")]
+
+    def get_comments(self, project_title, task_title, offset=0, limit=None):
+        task = self.get_task(project_title, task_title)
+        if not task:
+            raise ValueError(f"Task with title '{task_title}' not found in project '{project_title}'.")
+        if "comments" in task:
+            return task["comments"][offset:None if limit is None else offset + limit]
+        if "id" not in task:
+            return []
+        return self.comments.list(task["id"], offset, limit)
+
+
+def build_snapshot(user_filename, data_filename, snapshot_filename, previous=None):
+    """
+    Writes a snapshot of the workspace as it is now to snapshot_filename.
+    The files are read without locking; if data_filename is replaced
+    meanwhile they are read again. Projects unchanged since previous (a
+    WorkspaceSnapshot) are copied from it without being serialised again.
+    """
+    comments_filename = f"{data_filename}.comments"
+    for _ in range(5):
+        with open(data_filename, "rb") as f:
+            stat = os.fstat(f.fileno())
+            data = json.load(f)
+        with open(user_filename, "rb") if os.path.exists(user_filename) else nullcontext() as f:
+            users = f.read() if f else b"{}"
+        comments = _file_signature(comments_filename)
+        if _file_signature(data_filename) == (stat.st_ino, stat.st_size, stat.st_mtime_ns):
+            break
+    old = {}
+    if previous is not None:
+        old = {(entry[1], entry[2]): entry for entry in previous.header["projects"] if None not in entry[1:3]}
+
+    blobs, entries, offset = [], [], 0
+    for project in data.get("projects", []):
+        entry = old.get((project.get("id"), project.get("version")))
+        if entry is not None:
+            blob = previous.mapped[previous._base + entry[4]:previous._base + entry[4] + entry[5]]
+        else:
+            blob = json.dumps(project).encode()
+        members = [username for member in project.get("members", []) for username in member]
+        entries.append([project["title"], project.get("id"), project.get("version"), members, offset, len(blob)])
+        blobs.append(blob)
+        offset += len(blob)
+    blobs.append(users)
+    header = {
+        "source": [stat.st_ino, stat.st_size, stat.st_mtime_ns],
+        "taken_at": datetime.now().isoformat(),
+        "projects": entries,
+        "users": [offset, len(users)],
+        "comments": {"inode": comments[0] if comments else None, "size": comments[1] if comments else 0},
+    }
+    header_bytes = json.dumps(header).encode()
+    tmp_filename = f"{snapshot_filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_filename, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(len(header_bytes).to_bytes(8, "little"))
+        f.write(header_bytes)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_filename, snapshot_filename)
+
+
+def open_snapshot(user_filename="users.json", data_filename="data.json", snapshot_filename=None):
+    """
+    Returns a WorkspaceSnapshot of the last committed data file. The
+    snapshot saved next to it is shared when it is of that version;
+    otherwise a new one is built and saved for the next reader.
+    """
+    snapshot_filename = snapshot_filename or f"{data_filename}.snapshot"
+    comments_filename = f"{data_filename}.comments"
+    signature = _file_signature(data_filename)
+    if signature is None:
+        raise ValueError(f"'{data_filename}' not found!")
+    previous = None
+    try:
+        previous = WorkspaceSnapshot.open(snapshot_filename, comments_filename)
+        if previous.source == list(signature):
+            return previous
+    except (FileNotFoundError, ValueError):
+        pass
+    build_snapshot(user_filename, data_filename, snapshot_filename, previous)
+    if previous is not None:
+        previous.close()
+    return WorkspaceSnapshot.open(snapshot_filename, comments_filename)
+
+
+def _file_signature(filename):
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def locked_write(method):
+    """
+    Decorator that runs a manager method which reads, changes and writes
+    the data under the data file lock, so concurrent sessions don't lose
+    each other's updates or record the same project version twice.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.locked():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+@instrument_methods
+class DataManager:
+    """
+    A class for managing project and user data.
+    """
+
+    def __init__(self, user_filename="users.json", data_filename="data.json"):
+        self.user_filename = user_filename
+        self.data_filename = data_filename
+        self.changes_filename = f"{data_filename}.changes"
+        self.comments = CommentStore(f"{data_filename}.comments")
+        self.backups = BackupStore(f"{data_filename}.backups")
+        self.attachments = AttachmentStore(f"{data_filename}.attachments")
+        self._pending = None
+        self._changes = []
+        # Seconds spent waiting for the data file lock, for load measurements.
+        self.lock_wait = 0.0
+        # File signatures of the loaded data, and of the data the name index was built from.
+        self._loaded = {}
+        self._names = None
+        self._names_source = None
+        # An UndoHistory to record undoable changes in, and the change being recorded.
+        self.history = None
+        self._undo_delta = None
+        self._undo_entries = []
+        self.reload_data()
+
+    def reload_data(self):
+        """
+        Reload data from the JSON files.
+        """
+        # Every operation starts with a reload; drop what a failed one had noted.
+        self._undo_delta = None
+        if self._pending is not None:
+            # In a batch the loaded copy is authoritative until commit().
+            return
+        # Taken before loading, so a write racing with the load makes the signature stale rather than the data.
+        self._loaded = {filename: _file_signature(filename) for filename in (self.user_filename, self.data_filename)}
+        self.user_data = self._load_data(self.user_filename)
+        self.data = self._load_data(self.data_filename)
+
+    def reload_users(self):
+        """
+        Reload only the user file, for lookups that don't need project data.
+        """
+        self._undo_delta = None
+        if self._pending is not None:
+            return
+        self._loaded[self.user_filename] = _file_signature(self.user_filename)
+        self.user_data = self._load_data(self.user_filename)
+
+    def _load_data(self, filename):
+        try:
+            with open(filename, "r") as f, timed("DataManager._load_data"):
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_data(self, data, filename):
+        if self._undo_delta is not None and filename == self.data_filename:
+            self._finish_undo_entry()
+        if self._pending is not None:
+            self._pending[filename] = data
+            return
+        self._write_data(data, filename)
+
+    def _write_data(self, data, filename):
+        if "tasks" in data and not data["tasks"]:
+            del data["tasks"]
+        # Write to a temporary file and swap it in so readers never see a half-written file.
+        tmp_filename = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_filename, "w") as f, timed("DataManager._save_data"):
+            json.dump(data, f, indent=2)
+        os.replace(tmp_filename, filename)
+        if filename in self._loaded:
+            names_current = self._names_source == self._loaded
+            self._loaded[filename] = _file_signature(filename)
+            if names_current:
+                # The index was kept in step with the change that was just written.
+                self._names_source = dict(self._loaded)
+        if filename == self.data_filename:
+            self.comments.flush()
+            if self._undo_entries:
+                entries, self._undo_entries = self._undo_entries, []
+                self.history.push(entries)
+        if filename == self.data_filename and self._changes:
+            changes, self._changes = self._changes, []
+            with open(self.changes_filename, "a") as f:
+                f.write("".join(line + "\n" for line in changes))
+
+    def name_index(self, kind, project_title=None):
+        """
+        Returns the PrefixIndex of usernames ("users"), project titles
+        ("projects") or a project's task titles ("tasks"). The index is
+        built once and kept up to date by this manager's own changes; it
+        is only rebuilt when another process has changed the files.
+        """
+        if self._pending is None and any(_file_signature(filename) != signature for filename, signature in self._loaded.items()):
+            self.reload_data()
+        if self._names is None or self._names_source != self._loaded:
+            self._names = NameIndex(self.user_data, self.data)
+            self._names_source = dict(self._loaded)
+        return self._names.get(kind, project_title)
+
+    def suggest(self, kind, text, project_title=None, limit=5):
+        """
+        Returns names of kind that text is a prefix of, or failing that the
+        closest names, for tab completion and "did you mean" hints.
+        """
+        return self.name_index(kind, project_title).suggest(text, limit)
+
+    def _update_names(self, kind, old=None, new=None, project_title=None):
+        """
+        Keeps a built name index in step with a change about to be saved.
+        """
+        if self._names is not None and self._names_source == self._loaded:
+            self._names.update(kind, old, new, project_title)
+
+    def _record_change(self, project_title, op, task_title=None, task=None, **details):
+        """
+        Bumps the project's version and queues a change feed entry, appended
+        to the feed once the data file is written.
+        """
+        for project in self.data.get("projects", []):
+            if project["title"] == project_title:
+                break
+        else:
+            return
+        project["version"] = project.get("version", 0) + 1
+        change = {
+            "project": project_title,
+            "project_id": project.get("id"),
+            "version": project["version"],
+            "op": op,
+            "timestamp": datetime.now().isoformat(),
+        }
+        if task is not None:
+            task_title = task["title"]
+            change["task_data"] = task
+        if task_title is not None:
+            change["task"] = task_title
+        change.update(details)
+        if self._undo_delta is not None and op != "rebalance":
+            self._undo_delta["label"] = op
+            self._undo_delta["title"] = change.get("task", details.get("member"))
+        # Serialised now so later edits in the same batch don't leak into this entry.
+        self._changes.append(json.dumps(change))
+
+    def _undo_record(self, project_title):
+        if self._undo_delta is None:
+            self._undo_delta = {"project": project_title, "tasks": {}, "members": None, "comments": {}, "label": None, "title": None}
+        return self._undo_delta
+
+    def _remember_task(self, project_title, task, added=False, removed=False):
+        """
+        Notes the state of task before an undoable change to it. An added
+        task has no state before, a removed one none after.
+        """
+        if self.history is None:
+            return
+        tasks = self._undo_record(project_title)["tasks"]
+        if id(task) not in tasks:
+            task.setdefault("id", str(uuid.uuid4()))
+            tasks[id(task)] = [task, None if added else json.loads(json.dumps(task)), removed]
+        elif removed:
+            tasks[id(task)][2] = True
+
+    def _remember_comments(self, project_title, task):
+        """
+        Notes the comments of a task about to be deleted, which the comment
+        store drops with it, so undoing the delete can put them back.
+        """
+        if self.history is not None and task.get("comment_count") and "id" in task:
+            comments = self.comments.list(task["id"])
+            self._undo_record(project_title)["comments"][task["id"]] = [dict(comment, task=task["id"]) for comment in comments]
+
+    def _remember_members(self, project_title, project):
+        if self.history is not None:
+            record = self._undo_record(project_title)
+            if record["members"] is None:
+                record["members"] = [project, json.loads(json.dumps(project["members"]))]
+
+    def _finish_undo_entry(self):
+        """
+        Turns the noted states into an undo entry with the states after the
+        change. It goes into the history once the data file is written.
+        """
+        record, self._undo_delta = self._undo_delta, None
+        entry = {"label": record["label"], "title": record["title"], "project": record["project"], "tasks": [], "members": None}
+        for task, before, removed in record["tasks"].values():
+            after = None if removed else json.loads(json.dumps(task))
+            if before != after:
+                entry["tasks"].append({"id": task["id"], "before": before, "after": after})
+        if record["comments"]:
+            entry["comments"] = record["comments"]
+        if record["members"] is not None:
+            project, before = record["members"]
+            if before != project["members"]:
+                entry["members"] = {"before": before, "after": json.loads(json.dumps(project["members"]))}
+        if entry["tasks"] or entry["members"]:
+            self._undo_entries.append(json.dumps(entry))
+
+    @contextmanager
+    def locked(self):
+        """
+        Holds an exclusive lock on the data files for a read-modify-write.
+        """
+        path = os.path.abspath(f"{self.data_filename}.lock")
+        with _file_locks_guard:
+            lock = _file_locks.setdefault(path, _FileLock(path))
+        start = time.perf_counter()
+        with timed("DataManager.lock_wait"):
+            lock.acquire()
+        self.lock_wait += time.perf_counter() - start
+        try:
+            yield self
+        finally:
+            lock.release()
+
+    @contextmanager
+    def batch(self):
+        """
+        Applies every change made inside the block to one loaded copy of the
+        data and writes it back once on exit. Call commit() to write early.
+        """
+        with self.locked():
+            self._pending = {}
+            try:
+                yield self
+                self.commit()
+            except BaseException:
+                # Nothing from the block was written, but the name index may already include it.
+                self._names = None
+                raise
+            finally:
+                self._pending = None
+                self._changes = []
+                self._undo_entries = []
+                self.comments.discard()
+                self.reload_data()
+
+    def commit(self):
+        """
+        Writes the changes buffered by the current batch.
+        """
+        pending, self._pending = self._pending, {}
+        for filename, data in pending.items():
+            self._write_data(data, filename)
+
+    def write_workspace(self, user_data, data):
+        """
+        Replaces the user and data files and the comment store with
+        user_data and data, whose tasks may hold their comments inline.
+        """
+        self.comments.write(split_comments(data))
+        self._names = None
+        self._write_data(user_data, self.user_filename)
+        self._write_data(data, self.data_filename)
+
+    def snapshot(self):
+        """
+        Returns a read-only WorkspaceSnapshot of the last committed data,
+        shared with every other reader of the same version.
+        """
+        return open_snapshot(self.user_filename, self.data_filename)
+
+    def backup(self, full=False):
+        """
+        Backs up the user, data and comment files, then deletes the backups
+        the retention policy no longer keeps. Returns the new manifest.
+        """
+        with self.locked():
+            if self._pending is None and any(_file_signature(filename) != signature for filename, signature in self._loaded.items()):
+                self.reload_data()
+            manifest = self.backups.save(self.user_data, self._loaded.get(self.user_filename), self.data, self.comments.filename, full)
+            self.backups.prune()
+        return manifest
+
+    def restore(self, at=None):
+        """
+        Puts back the newest backup taken at or before at (a datetime; the
+        latest backup when None), after backing up the current state.
+        Returns the manifest of the restored backup.
+        """
+        with self.locked():
+            manifest = self.backups.find(at)
+            if manifest is None:
+                raise ValueError(f"No backup taken at or before {at.isoformat() if at else 'now'}!")
+            user_data, data, comments = self.backups.load(manifest)
+            if self._pending is not None:
+                # The files are replaced outright, so write what the batch changed first.
+                self.commit()
+            self.backup()
+            # Restoring is a change too: versions keep going up, so the next backup
+            # and the change feed never take a restored project for a later one.
+            versions = {project.get("id"): project.get("version", 0) for project in self.data.get("projects", [])}
+            for project in data["projects"]:
+                project["version"] = max(project.get("version", 0), versions.get(project.get("id"), 0)) + 1
+                # The feed is removed below, so it holds none of the changes up to here.
+                project["feed_from"] = project["version"]
+            self.comments.replace(comments)
+            self._names = None
+            self._changes = []
+            # In a batch the loaded copy is what the rest of the batch changes.
+            self.user_data, self.data = user_data, data
+            self._write_data(user_data, self.user_filename)
+            self._write_data(data, self.data_filename)
+            # Feed readers notice the feed is gone and reload, as after purge_data().
+            if os.path.exists(self.changes_filename):
+                os.remove(self.changes_filename)
+            if self.history is not None:
+                self.history.clear()
+            self.reload_data()
+        return manifest
+
+    @locked_write
+    def purge_data(self):
+        """
+        Deletes all user and project data, after backing it up.
+        """
+        if self._pending is not None:
+            # The side files are deleted right away, so write what the batch changed first.
+            self.commit()
+        manifest = self.backup()
+        print(f"[blue]Backup taken at {manifest['timestamp']}[/]")
+        try:
+            self.user_data = {"users": []}
+            self.data = {"projects": [], "tasks": []}
+            self._names = None
+            self._changes = []
+            self._write_data(self.user_data, self.user_filename)
+            self._write_data(self.data, self.data_filename)
+            # Feed readers notice the feed is gone and reload from scratch.
+            if os.path.exists(self.changes_filename):
+                os.remove(self.changes_filename)
+            self.comments.remove()
+            if self.history is not None:
+                self.history.clear()
+            print("[yellow]All data has been purged![/]")
+            self.reload_data()
+        except FileNotFoundError:
+            print("[bold red]Warning: No data to purge![/]")
+
+
+@instrument_methods
+class UserManager(DataManager):
+    """
+    A class for managing user data.
+    """
+
+    # bcrypt work factor for new hashes; None uses bcrypt_rounds().
+    bcrypt_rounds = None
+
+    def hash_password(self, password):
+        """
+        Hashes a password with the configured bcrypt work factor.
+        """
+        import bcrypt
+
+        rounds = self.bcrypt_rounds or bcrypt_rounds()
+        with timed("bcrypt.hashpw"):
+            return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+    @locked_write
+    def create_user(self, username, password, is_active=True, email=None, is_admin=False):
+        """
+        Creates a new user account.
+        """
+        self.reload_data()
+        users = self.user_data.get("users", [])
+
+        for user in users:
+            if user["username"] == username:
+                raise ValueError(f"User with username '{username}' already exists!")
+
+        user = {
+            "username": username,
+            "password": self.hash_password(password),
+            "email": email,
+            "is_active": is_active,
+            "is_admin": is_admin,
+        }
+        users.append(user)
+        self.user_data["users"] = users
+        self._update_names("users", new=username)
+        self._save_data(self.user_data, self.user_filename)
+        if email and is_active is not None:
+            print(f"[blue italic]User account created: username='{username}', password='{password}', Email='{email}', Is_active='{is_active}'[/]")
+        elif email:
+            print(f"[blue italic]User account created: username='{username}', password='{password}', Email='{email}'[/]")
+        else:
+            print(f"[blue italic]User account created: username='{username}', password='{password}', No email provided[/]")
+        return user
+
+    def get_user(self, username):
+        """
+        Retrieve user data by username.
+        """
+        # Logins look users up, so this leaves data.json alone.
+        self.reload_users()
+        for user in self.user_data.get("users", []):
+            if user["username"] == username:
+                return user
+        return None
+
+    @locked_write
+    def update_user(self, username, updates):
+        """
+        Update user data.
+        """
+        self.reload_data()
+        users = self.user_data.get("users", [])
+        for user in users:
+            if user["username"] == username:
+                if "password" in updates or updates.get("is_active") is False:
+                    # Invalidates every session token issued for the old password or active account.
+                    updates = dict(updates, session_version=user.get("session_version", 0) + 1)
+                user.update(updates)
+                break
+        else:
+            raise ValueError("User not found")
+
+        self._save_data(self.user_data, self.user_filename)
+
+    def authenticate(self, username, password):
+        """
+        Verifies a username and password and returns the user.
+        """
+        user = self.get_user(username)
+        if not user:
+            raise ValueError("user not found")
+        if not user["is_active"]:
+            raise ValueError("user is inactive")
+
+        import bcrypt
+
+        with timed("bcrypt.checkpw"):
+            password_matches = bcrypt.checkpw(password.encode("utf-8"), user["password"].encode("utf-8"))
+        if not password_matches:
+            raise ValueError("incorrect password")
+
+        if hash_cost(user["password"]) != (self.bcrypt_rounds or bcrypt_rounds()):
+            # Upgrade the stored hash to the configured cost while we have the plain password.
+            # This is not a password change, so existing sessions stay valid.
+            verified, new_hash = user["password"], self.hash_password(password)
+            with self.locked():
+                current = self.get_user(username)
+                # Leave it alone if the user was deleted or the password changed since it was checked.
+                if current and current["password"] == verified:
+                    current["password"] = new_hash
+                    self._save_data(self.user_data, self.user_filename)
+                    user = current
+        return user
+    
+    def get_members(self):
+        """
+        Retrieve all members.
+        """
+        self.reload_data()
+        users = self.user_data.get("users", [])
+        members = [user["username"] for user in users if not user.get("is_admin")]
+        return members
+
+    def _matching_users(self, filters=None):
+        """
+        Yields (user, number of projects) for every loaded non-admin user
+        that matches all of filters, counting memberships in one pass over
+        the projects. filters may hold is_active, email_domain, min_projects
+        and max_projects; missing or None entries match everyone.
+        """
+        filters = filters or {}
+        is_active = filters.get("is_active")
+        email_domain = filters.get("email_domain")
+        min_projects = filters.get("min_projects")
+        max_projects = filters.get("max_projects")
+        project_counts = {}
+        for project in self.data.get("projects", []):
+            for member in project.get("members", []):
+                for username in member:
+                    project_counts[username] = project_counts.get(username, 0) + 1
+        if email_domain is not None:
+            email_domain = email_domain.lstrip("@").lower()
+        for user in self.user_data.get("users", []):
+            projects = project_counts.get(user["username"], 0)
+            if user.get("is_admin"):
+                continue
+            if is_active is not None and user["is_active"] != is_active:
+                continue
+            if email_domain is not None and (user.get("email") or "").rpartition("@")[2].lower() != email_domain:
+                continue
+            if min_projects is not None and projects < min_projects:
+                continue
+            if max_projects is not None and projects > max_projects:
+                continue
+            yield user, projects
+
+    def list_users(self, filters=None, offset=0, limit=None):
+        """
+        Returns {"total": matching users, "users": one page of them} without
+        password hashes. filters are those of _matching_users().
+        """
+        self.reload_data()
+        stop = None if limit is None else offset + limit
+        page = []
+        total = 0
+        for user, projects in self._matching_users(filters):
+            if offset <= total and (stop is None or total < stop):
+                page.append({
+                    "username": user["username"],
+                    "email": user.get("email"),
+                    "is_active": user["is_active"],
+                    "is_admin": user.get("is_admin", False),
+                    "projects": projects,
+                })
+            total += 1
+        return {"total": total, "users": page}
+
+    @locked_write
+    def set_users_active(self, is_active, filters=None):
+        """
+        Activates or deactivates every user matching filters in one write.
+        Returns the usernames whose status changed.
+        """
+        self.reload_data()
+        changed = []
+        for user, _ in self._matching_users(filters):
+            if user["is_active"] != is_active:
+                user["is_active"] = is_active
+                if not is_active:
+                    # Same as update_user: deactivation ends the user's sessions.
+                    user["session_version"] = user.get("session_version", 0) + 1
+                changed.append(user["username"])
+        if changed:
+            self._save_data(self.user_data, self.user_filename)
+        return changed
+
+    @locked_write
+    def delete_users(self, filters):
+        """
+        Deletes every user matching filters and removes them from the
+        projects they are members of and the tasks they are assigned to.
+        Project owners are kept.
+        Returns {"deleted": usernames, "skipped": usernames that own projects}.
+        """
+        if not any(value is not None for value in (filters or {}).values()):
+            raise ValueError("Refusing to delete every user; give at least one filter.")
+        self.reload_data()
+        owners = {project["owner"] for project in self.data.get("projects", [])}
+        matched = {user["username"] for user, _ in self._matching_users(filters)}
+        deleted = matched - owners
+        if deleted:
+            self.user_data["users"] = [user for user in self.user_data.get("users", []) if user["username"] not in deleted]
+            for username in deleted:
+                self._update_names("users", old=username)
+            for project in self.data.get("projects", []):
+                members = [member for member in project.get("members", []) if not deleted.intersection(member)]
+                if len(members) != len(project.get("members", [])):
+                    project["members"] = members
+                    self._record_change(project["title"], "remove_member", members=members)
+                for task_list in project.get("tasks", {}).values():
+                    for task in task_list:
+                        removed = deleted.intersection(task["assignees"])
+                        if not removed:
+                            continue
+                        if "stats" not in project:
+                            project["stats"] = project_stats(project)
+                        count_task(project["stats"], task, -1)
+                        task["assignees"] = [username for username in task["assignees"] if username not in removed]
+                        count_task(project["stats"], task, 1)
+                        for username in sorted(removed):
+                            self._record_change(project["title"], "remove_assignee", task=task, member=username)
+            self._save_data(self.user_data, self.user_filename)
+            self._save_data(self.data, self.data_filename)
+        return {"deleted": sorted(deleted), "skipped": sorted(matched & owners)}
+
+
+@instrument_methods
+class ProjectManager(DataManager):
+    """
+    A class for managing project data.
+    """
+
+    @locked_write
+    def create_project(self, title, start_date, owner):
+        """
+        Creates a new project.
+        """
+        self.reload_data()
+        project_id = str(uuid.uuid4())
+        projects = self.data.get("projects", [])
+        for existing_project in projects:
+            if existing_project["title"] == title:
+                raise ValueError(f"Project with title '{title}' already exists!")
+
+        project = {
+            "id": project_id,
+            "title": title,
+            "start_date": datetime.strptime(start_date, "%d/%m/%Y").strftime("%Y-%m-%d"),
+            "owner": owner,
+            "members": [{owner: "owner"}],
+            "tasks": {"BACKLOG": [],"TODO": [], "DOING": [], "DONE": [], "ARCHIVED": []},
+            "version": 0,
+        }
+        project["stats"] = project_stats(project)
+        self.data.setdefault("projects", []).append(project)
+        self._update_names("projects", new=title)
+        self._record_change(title, "create_project")
+        self._save_data(self.data, self.data_filename)
+        print(f"[green]Project created with title: {title}[/]")
+        return project
+
+    def is_project_owner(self, project_title, username):
+        """
+        Checks if the given user is the owner of the project.
+        """
+        project = self.get_project(project_title)
+        if not project:
+            raise ValueError("Project not found!")
+
+        return project["owner"] == username
+
+    def get_project(self, title):
+        """
+        Retrieves a project by its title.
+        """
+        self.reload_data()
+        for project in self.data.get("projects", []):
+            if project["title"] == title:
+                return project
+        return None
+
+    def get_projects_for_user(self, username):
+        """
+        Retrieves a list of projects for a given user.
+        """
+        self.reload_data()
+        projects = self.data.get("projects", [])
+        user_projects = []
+        for project in projects:
+            members = [list(member.keys())[0] for member in project.get("members", [])]
+            if username in members:
+                user_projects.append(project)
+        return user_projects
+
+    def list_projects(self):
+        """
+        Retrieves and returns a list of all projects.
+        """
+        self.reload_data()
+        projects = self.data.get("projects", [])
+        if not projects:
+            print("[bold magenta]No projects found![/]")
+            return []
+        return projects
+
+    @locked_write
+    def add_member(self, project_title, username, role, project_manager):
+        """
+        Adds a user to a project.
+        """
+        self.reload_data()
+        project = project_manager.get_project(project_title)
+        if not project:
+            raise ValueError(f"Project with Title'{project_title}' not found!")
+
+        if username in project.get("members", []):
+            print(f"[bold red]Error: User '{username}' is already a member of the project![/]")
+            return
+        if not role:
+            role = "member"
+        self._remember_members(project_title, project)
+        project["members"].append({username: role})
+        self._record_change(project_title, "add_member", member=username, members=project["members"])
+        self._save_data(self.data, self.data_filename)
+
+    def _add_member(self, project_title, username, role=None):
+        self.add_member(project_title, username, role, self)
+
+    @locked_write
+    def remove_member_from_project(self, project_title, username):
+        """
+        Removes a user from a project.
+        """
+        self.reload_data()
+        project = self.get_project(project_title)
+        if not project:
+            raise ValueError("Project not found!")
+
+        usernames = [list(member.keys())[0] for member in project["members"]]
+        if username not in usernames:
+            raise ValueError("User is not a member of the project!")
+
+        self._remember_members(project_title, project)
+        del project["members"][usernames.index(username)]
+        self._record_change(project_title, "remove_member", member=username, members=project["members"])
+        self._save_data(self.data, self.data_filename)
+    
+    @locked_write
+    def delete_project(self, project_title):
+        """
+        Deletes a project.
+        """
+        self.reload_data()
+        project = self.get_project(project_title)
+        if not project:
+            raise ValueError(f"Project with title '{project_title}' not found!")
+
+        self._record_change(project_title, "delete_project")
+        self.data["projects"].remove(project)
+        self._update_names("projects", old=project_title)
+        self._save_data(self.data, self.data_filename)
+        
+    def get_member_role(self, project_title, username):
+        """
+        Retrieves the role of a member in a project.
+        """
+        self.reload_data()
+        project = self.get_project(project_title)
+        if not project:
+            raise ValueError(f"Project with title '{project_title}' not found!")
+
+        for member in project.get("members", []):
+            if username in member:
+                return member[username]
+        return None
+
+
+@instrument_methods
+class TaskManager(DataManager):
+    def get_project(self, project_title):
+        self.reload_data()
+        for project in self.data.get("projects", []):
+            if project["title"] == project_title:
+                return project
+        return None
+
+    def _project_tasks(self, project):
+        return {task["title"]: task for task_list in project["tasks"].values() for task in task_list}
+
+    def _rename_dependencies(self, project, old_title, new_title):
+        for task in self._project_tasks(project).values():
+            if old_title in task.get("blocked_by", []):
+                self._remember_task(project["title"], task)
+                task["blocked_by"][task["blocked_by"].index(old_title)] = new_title
+        rename_scheduled_task(project, old_title, new_title)
+
+    def _stats(self, project_title):
+        for project in self.data.get("projects", []):
+            if project["title"] == project_title:
+                if "stats" not in project:
+                    project["stats"] = project_stats(project)
+                return project["stats"]
+
+    @contextmanager
+    def _counting(self, project_title, task):
+        """
+        Keeps the project's statistics in step with changes made to task inside the block.
+        """
+        stats = self._stats(project_title)
+        count_task(stats, task, -1)
+        try:
+            yield
+        finally:
+            count_task(stats, task, 1)
+            record_burndown(stats)
+
+    @locked_write
+    def add_task(self, project_title, task_title, description, duration, priority, status="TODO"):
+        self.reload_data()
+        project = self.get_project(project_title)
+        if not project:
+            raise ValueError(f"Project with title '{project_title}' not found!")
+
+        if "tasks" not in project or not isinstance(project["tasks"], dict):
+            project["tasks"] = {"BACKLOG": [],"TODO": [], "DOING": [], "DONE": [], "ARCHIVED": []}
+        # Tasks are found by title, and the dependency graph is keyed by it.
+        if task_title in self._project_tasks(project):
+            raise ValueError(f"Task with title '{task_title}' already exists!")
+        task_list = self._column(project_title, project, status)
+
+        task = {
+            "id": str(uuid.uuid4()),
+            "title": task_title,
+            "description": description,
+            "start_date": date.today().isoformat(),
+            "end_date": (date.today() + timedelta(days=duration)).isoformat(),
+            "priority": priority,
+            "status": status,
+            "rank": rank_between(task_list[-1]["rank"] if task_list else None, None),
+            "comment_count": 0,
+            "assignees": [],
+            "blocked_by": [],
+        }
+
+        stats = self._stats(project_title)
+        self._remember_task(project_title, task, added=True)
+        task_list.append(task)
+        count_task(stats, task)
+        record_burndown(stats)
+        schedule_project(project, [task])
+        self._update_names("tasks", new=task_title, project_title=project_title)
+        self._record_change(project_title, "add_task", task=task)
+        self._save_data(self.data, self.data_filename)
+        return task
+    
+    @locked_write
+    def edit_task(self, project_title, task_title, new_title, new_description, new_duration, new_priority):
+        self.reload_data()
+        project = self.get_project(project_title)
+        if not project:
+            raise ValueError(f"Project with title '{project_title}' not found!")
+        if new_title and new_title != task_title and new_title in self._project_tasks(project):
+            raise ValueError(f"Task with title '{new_title}' already exists!")
+
+        for status, task_list in project["tasks"].items():
+            for task in task_list:
+                if task["title"] == task_title:
+                    self._remember_task(project_title, task)
+                    with self._counting(project_title, task):
+                        task["title"] = new_title if new_title else task["title"]
+                        task["description"] = new_description if new_description else task["description"]
+                        task["end_date"] = (date.fromisoformat(task["start_date"]) + timedelta(days=int(new_duration))).isoformat() if new_duration else task["end_date"]
+                        task["priority"] = new_priority if new_priority else task["priority"]
+                    if task["title"] != task_title:
+                        self._rename_dependencies(project, task_title, task["title"])
+                        self._update_names("tasks", task_title, task["title"], project_title)
+                    if new_duration:
+                        schedule_project(project, [task])
+                    self._record_change(project_title, "edit_task", task=task, old_title=task_title)
+                    self._save_data(self.data, self.data_filename)
+                    return
+        raise ValueError(f"Task with title '{task_title}' not found in project '{project_title}'.")
+
+    @locked_write
+    def delete_task(self, project_title, task_title):
+        self.reload_data()
+        project = self.get_project(project_title)
+        if not project:
+            raise ValueError(f"Project with title '{project_title}' not found!")
+
+        for task_list in project["tasks"].values():
+            for task in task_list:
+                if task["title"] == task_title:
+                    self._remember_task(project_title, task, removed=True)
+                    task_list.remove(task)
+                    stats = self._stats(project_title)
+                    count_task(stats, task, -1)
+                    record_burndown(stats)
+                    # The tasks it blocked start earlier; the tasks blocking it may get slack.
+                    changed = []
+                    for other in self._project_tasks(project).values():
+                        if task_title in other.get("blocked_by", []):
+                            self._remember_task(project_title, other)
+                            other["blocked_by"].remove(task_title)
+                            changed.append(other)
+                    schedule_project(project, changed, removed=[task_title])
+                    if task.get("comment_count") and "id" in task:
+                        self._remember_comments(project_title, task)
+                        self.comments.stage({"task": task["id"], "deleted": True})
+                    self._update_names("tasks", old=task_title, project_title=project_title)
+                    self._record_change(project_title, "delete_task", task_title=task_title, status=task["status"])
+                    self._save_data(self.data, self.data_filename)
+                    return
+        raise ValueError(f"Task with title '{task_title}' not found in project '{project_title}'.")
+
+    @locked_write
+    def move_task(self, project_title, task_title, new_status, position=None):
+        """
+        Moves a task to position (0 is the top) of the new_status column, or
+        to its bottom when position is None. Moving a task within its own
+        column reorders it. Only the task's status and rank change.
+        """
+        self.reload_data()
+        project = self.get_project(project_title)
+        if not project:
+            raise ValueError(f"Project with title '{project_title}' not found!")
+
+        found = next(((status, task_list, task) for status, task_list in project["tasks"].items()
+                      for task in task_list if task["title"] == task_title), None)
+        if found is None:
+            raise ValueError(f"Task with title '{task_title}' not found in project '{project_title}'.")
+        status, task_list, task = found
+        self._remember_task(project_title, task)
+        with self._counting(project_title, task):
+            task_list.remove(task)
+            column = self._column(project_title, project, new_status)
+            position = len(column) if position is None else max(0, min(position, len(column)))
+            rank = self._rank_at(column, position)
+            if rank is None:
+                self._rebalance(project_title, project, new_status)
+                rank = self._rank_at(column, position)
+            task["status"] = new_status
+            task["rank"] = rank
+            column.insert(position, task)
+        self._record_change(project_title, "move_task", task=task, from_status=status)
+        self._save_data(self.data, self.data_filename)
+
+    def _rank_at(self, column, position):
+        before = column[position - 1]["rank"] if position > 0 else None
+        after = column[position]["rank"] if position < len(column) else None
+        return rank_between(before, after)
+
+    def _rebalance(self, project_title, project, status):
+        for task in project["tasks"][status]:
+            self._remember_task(project_title, task)
+        ranks = rebalance_column(project["tasks"][status])
+        self._record_change(project_title, "rebalance", status=status, ranks=ranks)
+
+    def _column(self, project_title, project, status):
+        """
+        Returns the tasks of a status column, ranking them in their saved
+        order first if they were saved without ranks.
+        """
+        task_list = project["tasks"].setdefault(status, [])
+        if any("rank" not in task for task in task_list):
+            self._rebalance(project_title, project, status)
+        return task_list
+
+    @locked_write
+    def assignee_member(self, project_title, task_title, username):
+        self.reload_data()
+        project = self.get_project(project_title)
+        if not project:
+            raise ValueError("Project not found!")
+
+        task_found = False
+        for task_list in project["tasks"].values():
+            for task in task_list:
+                if task["title"] == task_title:
+                    task_found = True
+                    if username in task["assignees"]:
+                        raise ValueError("User already assigned to this task!")
+                    self._remember_task(project_title, task)
+                    with self._counting(project_title, task):
+                        task["assignees"].append(username)
+                    self._record_change(project_title, "assign_member", task=task, member=username)
+                    self._save_data(self.data, self.data_filename)
+                    return
+
+        if not task_found:
+            raise ValueError("Task not found in project!")
+
+    @locked_write
+    def remove_assignee(self, project_title, task_title, username):
+        self.reload_data()
+        project = self.get_project(project_title)
+        if not project:
+            raise ValueError("Project not found!")
+
+        for task_list in project["tasks"].values():
+            for task in task_list:
+                if task["title"] == task_title:
+                    if username not in task["assignees"]:
+                        raise ValueError("User is not assigned to this task!")
+                    self._remember_task(project_title, task)
+                    with self._counting(project_title, task):
+                        task["assignees"].remove(username)
+                    self._record_change(project_title, "remove_assignee", task=task, member=username)
+                    self._save_data(self.data, self.data_filename)
+                    return
+
+        raise ValueError("Task not found in project!")
+
+    def get_tasks_for_project(self, project_title):
+        self.reload_data()
+        project = self.get_project(project_title)
+        if not project:
+            raise ValueError(f"Project with title '{project_title}' not found!")
+
+        tasks = []
+        for task_list in project["tasks"].values():
+            tasks.extend(task_list)
+        return tasks
+
+    def get_task(self, project_title, task_title):
+        self.reload_data()
+        project = self.get_project(project_title)
+        if not project:
+            raise ValueError(f"Project with title '{project_title}' not found!")
+
+        for task_list in project["tasks"].values():
+            for task in task_list:
+                if task["title"] == task_title:
+                    return task
+        return None
+    
+    def _comment_task(self, project_title, task_title):
+        """
+        Returns the task whose comments are being changed, moving any
+        comments still inline in it (from an older data.json) to the comment store.
+        """
+        self.reload_data()
+        task = self.get_task(project_title, task_title)
+        if not task:
+            raise ValueError(f"Task with title '{task_title}' not found in project '{project_title}'.")
+        if "comments" in task or "id" not in task:
+            records = split_comments({"projects": [{"tasks": {"": [task]}}]})
+            for record in records:
+                self.comments.stage(record)
+        return task
+
+    @locked_write
+    def add_comment(self, project_title, task_title, comment, author):
+        """
+        Adds a comment to a task and returns it with its id.
+        """
+        task = self._comment_task(project_title, task_title)
+        record = {
+            "id": str(uuid.uuid4()),
+            "task": task["id"],
+            "comment": comment,
+            "author": author,
+            "timestamp": datetime.now().isoformat(),
+        }
+        with self._counting(project_title, task):
+            self.comments.stage(record)
+            task["comment_count"] += 1
+        self._record_change(project_title, "add_comment", task=task, comment_id=record["id"])
+        self._save_data(self.data, self.data_filename)
+        return self.comments.get(task["id"], record["id"])
+
+    @locked_write
+    def edit_comment(self, project_title, task_title, comment_id, new_comment):
+        task = self._comment_task(project_title, task_title)
+        comment = self.comments.get(task["id"], comment_id)
+        if comment is None:
+            raise ValueError(f"Comment '{comment_id}' not found on task '{task_title}'.")
+
+        comment.update(task=task["id"], comment=new_comment, timestamp=datetime.now().isoformat())
+        self.comments.stage(comment)
+        self._record_change(project_title, "edit_comment", task=task, comment_id=comment_id)
+        self._save_data(self.data, self.data_filename)
+
+    @locked_write
+    def delete_comment(self, project_title, task_title, comment_id):
+        task = self._comment_task(project_title, task_title)
+        if self.comments.get(task["id"], comment_id) is None:
+            raise ValueError(f"Comment '{comment_id}' not found on task '{task_title}'.")
+
+        with self._counting(project_title, task):
+            self.comments.stage({"id": comment_id, "task": task["id"], "deleted": True})
+            task["comment_count"] -= 1
+        self._record_change(project_title, "delete_comment", task=task, comment_id=comment_id)
+        self._save_data(self.data, self.data_filename)
+
+    def get_comments(self, project_title, task_title, offset=0, limit=None):
+        """
+        Returns a page of a task's comments, oldest first. Only the comment
+        store is read for them; tasks just carry their comment_count.
+        """
+        self.reload_data()
+        task = self.get_task(project_title, task_title)
+        if not task:
+            raise ValueError(f"Task with title '{task_title}' not found in project '{project_title}'.")
+        if "comments" in task:
+            task = self._migrate_comments(project_title, task_title)
+        if "id" not in task:
+            return []
+        return self.comments.list(task["id"], offset, limit)
+
+    @locked_write
+    def _migrate_comments(self, project_title, task_title):
+        """
+        Moves the comments still inline in a task to the comment store and
+        returns the task. The change bumps the project's version, so the
+        next backup saves the project without its inline comments.
+        """
+        task = self._comment_task(project_title, task_title)
+        self._record_change(project_title, "migrate_comments", task=task)
+        self._save_data(self.data, self.data_filename)
+        return task
+
+    @locked_write
+    def compact_comments(self):
+        """
+        Moves comments still inline in tasks to the comment store and
+        rewrites the store without edited, deleted or orphaned comments.
+        Returns the number of bytes the store shrank by.
+        """
+        self.reload_data()
+        migrated = [(project["title"], task) for project in self.data.get("projects", [])
+                    for task in self._project_tasks(project).values() if "comments" in task or "id" not in task]
+        records = split_comments(self.data)
+        for project_title, task in migrated:
+            self._record_change(project_title, "migrate_comments", task=task)
+        task_ids = {task["id"] for project in self.data.get("projects", []) for task in self._project_tasks(project).values()}
+        saved = self.comments.compact(task_ids, records)
+        self._save_data(self.data, self.data_filename)
+        return saved
+
+    @locked_write
+    def compact_changes(self, keep_hours=168):
+        """
+        Rewrites the change feed without the entries older than keep_hours.
+        Each project records in feed_from the last version dropped, so
+        get_changes can tell a reader it has fallen too far behind.
+        Returns the numbers of entries dropped and kept and the bytes freed.
+        """
+        self.reload_data()
+        cutoff = (datetime.now() - timedelta(hours=keep_hours)).isoformat()
+        dropped, kept, dropped_versions = 0, [], {}
+        try:
+            with open(self.changes_filename, "rb") as f:
+                for line in f:
+                    # The feed is appended in time order, so everything after the first recent entry is kept.
+                    if not kept:
+                        change = json.loads(line)
+                        if change["timestamp"] < cutoff:
+                            dropped += 1
+                            dropped_versions[change["project_id"]] = change["version"]
+                            continue
+                    kept.append(line)
+        except FileNotFoundError:
+            return {"dropped": 0, "kept": 0, "bytes": 0}
+        if not dropped:
+            return {"dropped": 0, "kept": len(kept), "bytes": 0}
+        # The watermarks are written first: if the feed isn't replaced after all, they only claim too little.
+        for project in self.data.get("projects", []):
+            if project.get("id") in dropped_versions:
+                project["feed_from"] = max(project.get("feed_from", 0), dropped_versions[project["id"]])
+        self._save_data(self.data, self.data_filename)
+        before = os.path.getsize(self.changes_filename)
+        tmp_filename = f"{self.changes_filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_filename, "wb") as f:
+            f.write(b"".join(kept))
+        os.replace(tmp_filename, self.changes_filename)
+        return {"dropped": dropped, "kept": len(kept), "bytes": before - os.path.getsize(self.changes_filename)}
+
+    def _attachment(self, project_title, task_title, name):
+        task = self.get_task(project_title, task_title)
+        if not task:
+            raise ValueError(f"Task with title '{task_title}' not found in project '{project_title}'.")
+        for attachment in task.get("attachments", []):
+            if attachment["name"] == name:
+                return task, attachment
+        raise ValueError(f"Attachment '{name}' not found on task '{task_title}'.")
+
+    @locked_write
+    def add_attachment(self, project_title, task_title, filename, name=None):
+        """
+        Copies a file into the attachment store and attaches it to a task
+        as name (the file's base name by default). Returns the attachment.
+        """
+        name = name or os.path.basename(filename)
+        task = self.get_task(project_title, task_title)
+        if not task:
+            raise ValueError(f"Task with title '{task_title}' not found in project '{project_title}'.")
+        if any(attachment["name"] == name for attachment in task.get("attachments", [])):
+            raise ValueError(f"Task '{task_title}' already has an attachment named '{name}'!")
+
+        digest, size = self.attachments.put(filename)
+        attachment = {"name": name, "sha256": digest, "size": size, "added": datetime.now().isoformat()}
+        self._remember_task(project_title, task)
+        task.setdefault("attachments", []).append(attachment)
+        self._record_change(project_title, "add_attachment", task=task, attachment=name)
+        self._save_data(self.data, self.data_filename)
+        return attachment
+
+    @locked_write
+    def remove_attachment(self, project_title, task_title, name):
+        """
+        Detaches a file from a task. Its content stays in the store until
+        gc_attachments() finds nothing uses it.
+        """
+        task, attachment = self._attachment(project_title, task_title, name)
+        self._remember_task(project_title, task)
+        task["attachments"].remove(attachment)
+        if not task["attachments"]:
+            del task["attachments"]
+        self._record_change(project_title, "remove_attachment", task=task, attachment=name)
+        self._save_data(self.data, self.data_filename)
+
+    def get_attachments(self, project_title, task_title):
+        task = self.get_task(project_title, task_title)
+        if not task:
+            raise ValueError(f"Task with title '{task_title}' not found in project '{project_title}'.")
+        return task.get("attachments", [])
+
+    def open_attachment(self, project_title, task_title, name):
+        """
+        Returns a read-only memory map of an attachment's content.
+        """
+        return self.attachments.map(self._attachment(project_title, task_title, name)[1]["sha256"])
+
+    def export_attachment(self, project_title, task_title, name, out):
+        """
+        Streams an attachment's content to the binary file object out.
+        """
+        self.attachments.copy(self._attachment(project_title, task_title, name)[1]["sha256"], out)
+
+    def gc_attachments(self, min_age=3600):
+        """
+        Deletes stored files no task uses, counting tasks in backups and in
+        the undo history as well. Files younger than min_age seconds are
+        kept, as an attachment may be on its way into a task. Returns the
+        number of files and bytes deleted.
+        """
+        with self.locked():
+            self.reload_data()
+            used = attachment_hashes(task for project in self.data.get("projects", []) for task in self._project_tasks(project).values())
+            used |= self.backups.attachment_hashes()
+            if self.history is not None:
+                for entry in self.history.entries():
+                    used |= attachment_hashes(state for task in entry["tasks"] for state in (task["before"], task["after"]) if state)
+            return self.attachments.gc(used, min_age)
 
+    def _subtask_task(self, project_title, task_title):
+        task = self.get_task(project_title, task_title)
+        if not task:
+            raise ValueError(f"Task with title '{task_title}' not found in project '{project_title}'.")
+        return task
 
+    @locked_write
+    def add_subtask(self, project_title, task_title, title, duration=0, parent_id=None):
+        """
+        Adds a checklist item to a task, or under item parent_id, needing
+        duration days. Returns the item.
+        """
+        if not title:
+            raise ValueError("Subtask title cannot be empty!")
+        if duration < 0:
+            raise ValueError("Subtask duration cannot be negative!")
+        task = self._subtask_task(project_title, task_title)
+        path = subtask_path(task, parent_id) if parent_id else []
+        parent = path[-1] if path else task
+        siblings = parent.get("subtasks", [])
+        number = int(siblings[-1]["id"].rsplit(".", 1)[-1]) + 1 if siblings else 1
+        item = {"id": f"{parent_id}.{number}" if parent_id else str(number), "title": title, "duration": duration, "done": False}
 
-def str2bool(v):
-    if isinstance(v, bool):
-        return v
-    if v.lower() in ("yes", "true", "t", "y", "1"):
-        return True
-    elif v.lower() in ("no", "false", "f", "n", "0"):
-        return False
-    else:
-        raise argparse.ArgumentTypeError("Boolean value expected.")
-    
-# Create main parser
-parser = argparse.ArgumentParser(description="Manage administrative tasks", formatter_class=CustomHelpFormatter)
-
-# Create subparsers for each command
-subparsers = parser.add_subparsers(dest="command", help="Command to execute")
-
-# --- Admin Management ---
-admin_parser = subparsers.add_parser("create-user",help="Create a new administrator account",formatter_class=CustomHelpFormatter)
-admin_parser.add_argument("--username", required=True, help="Username for the administrator account")
-admin_parser.add_argument("--password", required=True, help="Password for the administrator account")
-admin_parser.add_argument("--is_active", type=str2bool, nargs="?", const=True, default=True, help="Activate the administrator account")
-admin_parser.add_argument("--email", required=True, help="Email address for the administrator")
-
-# --- Project Management ---
-project_parser = subparsers.add_parser("create-project", help="Create a new project", formatter_class=CustomHelpFormatter)
-project_parser.add_argument("--title", required=True, help="Project Title")
-project_parser.add_argument("--start_date", required=True, help="Project Start Date (dd/mm/yyyy)")
-project_parser.add_argument("--owner", required=True, help="Owner of the project")
-
-# --- Purge Data ---
-purge_parser = subparsers.add_parser("purge-data", help="Purge all data")
-
-# --- Task Management ---
-task_parser = subparsers.add_parser("add-task", help="Add a new task", formatter_class=CustomHelpFormatter)
-task_parser.add_argument("--project_title", required=True, help="Project Title")
-task_parser.add_argument("--title", required=True, help="Task Title")
-task_parser.add_argument("--description", help="Description (Optional)")
-task_parser.add_argument("--duration", default=1, type=int, help="Duration in days (Optional)")
-task_parser.add_argument("--priority", choices=["CRITICAL", "HIGH", "MEDIUM", "LOW"], default="MEDIUM", help="Task priority (Optional)")
-task_parser.add_argument("--status", choices=["BACKLOG","TODO", "DOING", "DONE", "ARCHIVED"], default="TODO", help="Task status (Optional)")
-
-task_parser = subparsers.add_parser("move-task", help="Move a task to a different status")
-task_parser.add_argument("--project_title", required=True, help="Project Title")
-task_parser.add_argument("--task_title", required=True, help="Task Title")
-task_parser.add_argument("--new_status", required=True, choices=["BACKLOG","TODO", "DOING", "DONE", "ARCHIVED"], help="New task status")
-
-task_parser = subparsers.add_parser("delete-task", help="Delete a task", formatter_class=CustomHelpFormatter)
-task_parser.add_argument("--project_title", required=True, help="Project Title")
-task_parser.add_argument("--task_title", required=True, help="Task Title")
-
-task_parser = subparsers.add_parser("assign-member", help="Assign a user to a task")
-task_parser.add_argument("--project_title", required=True, help="Project Title")
-task_parser.add_argument("--task_title", required=True, help="Task Title")
-task_parser.add_argument("--username", required=True, help="Username of the member to assign")
-
-task_parser = subparsers.add_parser("remove_assignee", help="Remove a user from a task")
-task_parser.add_argument("--project_title", required=True, help="Project Title")
-task_parser.add_argument("--task_title", required=True, help="Task Title")
-task_parser.add_argument("--username", required=True, help="Username of the member to assign")
-
-# --- Member Management ---
-member_parser = subparsers.add_parser("add-member", help="Add a user to a project", formatter_class=CustomHelpFormatter)
-member_parser.add_argument("--project_title", required=True, help="Project Title")
-member_parser.add_argument("--username", required=True, help="Username")
-
-member_parser = subparsers.add_parser("remove-member", help="Remove a user from a project")
-member_parser.add_argument("--project_title", required=True, help="Project Title")
-member_parser.add_argument("--username", required=True, help="Username")
-
-# --- Comment Management ---
-add_comment_parser = subparsers.add_parser("add-comment", help="Add a comment to a task", formatter_class=CustomHelpFormatter)
-add_comment_parser.add_argument("--project_title", required=True, help="Project Title")
-add_comment_parser.add_argument("--task_title", required=True, help="Task Title")
-add_comment_parser.add_argument("--comment_body", required=True, help="Comment body")
-add_comment_parser.add_argument("--author", required=True, help="Author of the comment")
-
-edit_comment_parser = subparsers.add_parser("edit-comment", help="Edit a comment on a task")
-edit_comment_parser.add_argument("--project_title", required=True, help="Project Title")
-edit_comment_parser.add_argument("--task_title", required=True, help="Task Title")
-edit_comment_parser.add_argument("--comment_index", required=True, help="Index of the comment to edit")
-edit_comment_parser.add_argument("--new_comment", required=True, help="New comment body")
-
-delete_comment_parser = subparsers.add_parser("delete-comment", help="Delete a comment on a task")
-delete_comment_parser.add_argument("--project_title", required=True, help="Project Title")
-delete_comment_parser.add_argument("--task_title", required=True, help="Task Title")
-delete_comment_parser.add_argument("--comment_index", required=True, help="Index of the comment to delete")
+        self._remember_task(project_title, task)
+        with self._counting(project_title, task):
+            if path and not siblings:
+                # The parent stops counting as an item and counts its subtasks instead.
+                before = item_rollup(parent)
+                parent["subtasks"] = [item]
+                parent["rollup"] = item_rollup(item)
+                propagate_rollup(task, path[:-1], before, parent["rollup"])
+            else:
+                parent.setdefault("subtasks", []).append(item)
+                propagate_rollup(task, path, dict.fromkeys(ROLLUP_KEYS, 0), item_rollup(item))
+        self._record_change(project_title, "add_subtask", task=task, subtask=item["id"])
+        self._save_data(self.data, self.data_filename)
+        return item
 
-class DataManager:
-    """
-    A class for managing project and user data.
-    """
+    @locked_write
+    def check_subtask(self, project_title, task_title, subtask_id, done=True):
+        """
+        Checks (or with done=False unchecks) a checklist item and every item under it.
+        """
+        task = self._subtask_task(project_title, task_title)
+        path = subtask_path(task, subtask_id)
+        item = path[-1]
 
-    def __init__(self, user_filename="users.json", data_filename="data.json"):
-        self.user_filename = user_filename
-        self.data_filename = data_filename
-        self.reload_data()
+        self._remember_task(project_title, task)
+        with self._counting(project_title, task):
+            before = item_rollup(item)
+            _set_done(item, done)
+            propagate_rollup(task, path[:-1], before, item_rollup(item))
+        self._record_change(project_title, "check_subtask", task=task, subtask=subtask_id, done=done)
+        self._save_data(self.data, self.data_filename)
 
-    def reload_data(self):
+    @locked_write
+    def remove_subtask(self, project_title, task_title, subtask_id):
         """
-        Reload data from the JSON files.
+        Removes a checklist item and everything under it.
         """
-        self.user_data = self._load_data(self.user_filename)
-        self.data = self._load_data(self.data_filename)
+        task = self._subtask_task(project_title, task_title)
+        path = subtask_path(task, subtask_id)
+        item, ancestors = path[-1], path[:-1]
+        parent = ancestors[-1] if ancestors else task
 
-    def _load_data(self, filename):
-        try:
-            with open(filename, "r") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+        self._remember_task(project_title, task)
+        with self._counting(project_title, task):
+            parent["subtasks"].remove(item)
+            if ancestors and not parent["subtasks"]:
+                # The parent counts as an item again.
+                del parent["subtasks"]
+                propagate_rollup(task, ancestors[:-1], parent.pop("rollup"), item_rollup(parent))
+            else:
+                propagate_rollup(task, ancestors, item_rollup(item), dict.fromkeys(ROLLUP_KEYS, 0))
+        self._record_change(project_title, "remove_subtask", task=task, subtask=subtask_id)
+        self._save_data(self.data, self.data_filename)
 
-    def _save_data(self, data, filename):
-        if "tasks" in data and not data["tasks"]:
-            del data["tasks"]
-        with open(filename, "w") as f:
-            json.dump(data, f, indent=2)
+    def get_subtasks(self, project_title, task_title):
+        return self._subtask_task(project_title, task_title).get("subtasks", [])
 
-    def purge_data(self):
+    def get_rollup(self, project_title, task_title, subtask_id=None):
         """
-        Deletes all user and project data.
+        Returns the number of checklist items under a task (or one of its
+        items), how many are done, the percentage done and the days left.
         """
-        try:
-            with open(self.user_filename, "w") as f:
-                json.dump({"users": []}, f)
-            with open(self.data_filename, "w") as f:
-                json.dump({"projects": [], "tasks": []}, f)
-            print("[yellow]All data has been purged![/]")
-            self.reload_data()
-        except FileNotFoundError:
-            print("[bold red]Warning: No data to purge![/]")
+        task = self._subtask_task(project_title, task_title)
+        if subtask_id is None:
+            return rollup_summary(task.get("rollup", {}))
+        return rollup_summary(item_rollup(subtask_path(task, subtask_id)[-1]))
 
+    @locked_write
+    def add_dependency(self, project_title, task_title, blocked_by):
+        """
+        Marks task_title as blocked by blocked_by: it can't start before blocked_by is finished.
+        """
+        self.reload_data()
+        project = self.get_project(project_title)
+        if not project:
+            raise ValueError(f"Project with title '{project_title}' not found!")
+        tasks = self._project_tasks(project)
+        for title in (task_title, blocked_by):
+            if title not in tasks:
+                raise ValueError(f"Task with title '{title}' not found in project '{project_title}'.")
+        if task_title == blocked_by:
+            raise ValueError("A task cannot block itself!")
+        task = tasks[task_title]
+        if blocked_by in task.get("blocked_by", []):
+            raise ValueError(f"Task '{task_title}' is already blocked by '{blocked_by}'!")
+        path = find_dependency_path(project, task_title, blocked_by)
+        if path:
+            raise ValueError(f"Dependency would create a cycle: {' -> '.join(path + [task_title])}")
 
-class UserManager(DataManager):
-    """
-    A class for managing user data.
-    """
+        self._remember_task(project_title, task)
+        task.setdefault("blocked_by", []).append(blocked_by)
+        schedule_project(project, [task])
+        self._record_change(project_title, "add_dependency", task=task, blocked_by=blocked_by)
+        self._save_data(self.data, self.data_filename)
 
-    def create_user(self, username, password, is_active=True, email=None, is_admin=False):
+    @locked_write
+    def remove_dependency(self, project_title, task_title, blocked_by):
+        self.reload_data()
+        project = self.get_project(project_title)
+        if not project:
+            raise ValueError(f"Project with title '{project_title}' not found!")
+        task = self._project_tasks(project).get(task_title)
+        if not task:
+            raise ValueError(f"Task with title '{task_title}' not found in project '{project_title}'.")
+        if blocked_by not in task.get("blocked_by", []):
+            raise ValueError(f"Task '{task_title}' is not blocked by '{blocked_by}'!")
+
+        self._remember_task(project_title, task)
+        task["blocked_by"].remove(blocked_by)
+        schedule_project(project, [task])
+        self._record_change(project_title, "remove_dependency", task=task, blocked_by=blocked_by)
+        self._save_data(self.data, self.data_filename)
+
+    def get_schedule(self, project_title):
         """
-        Creates a new user account.
+        Returns the earliest and latest start and finish dates and the slack
+        of every task, ordered by earliest start, and the critical path.
         """
-        self.reload_data()
-        users = self.user_data.get("users", [])
+        project = self.get_project(project_title)
+        if not project:
+            raise ValueError(f"Project with title '{project_title}' not found!")
+        if "schedule" not in project:
+            schedule_project(project)
+        project_start = date.fromisoformat(project["start_date"])
 
-        for user in users:
-            if user["username"] == username:
-                raise ValueError(f"User with username '{username}' already exists!")
+        def day(offset):
+            return (project_start + timedelta(days=offset)).isoformat()
 
-        hashed_password = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
-        user = {
-            "username": username,
-            "password": hashed_password.decode("utf-8"),
-            "email": email,
-            "is_active": is_active,
-            "is_admin": is_admin,
+        tasks = self._project_tasks(project)
+        entries = sorted(project["schedule"]["tasks"].items(), key=lambda item: (item[1][0], item[0]))
+        return {
+            "start": project_start.isoformat(),
+            "finish": day(project["schedule"]["finish"]),
+            "duration_days": project["schedule"]["finish"],
+            "tasks": {
+                title: {
+                    "earliest_start": day(start),
+                    "earliest_finish": day(finish),
+                    "latest_start": day(latest_start),
+                    "latest_finish": day(latest_finish),
+                    "start_day": start,
+                    "duration_days": finish - start,
+                    "slack_days": latest_start - start,
+                    "blocked_by": tasks[title].get("blocked_by", []),
+                }
+                for title, (start, finish, latest_start, latest_finish) in entries
+            },
+            "critical_path": critical_path(project),
         }
-        users.append(user)
-        self.user_data["users"] = users
-        self._save_data(self.user_data, self.user_filename)
-        if email and is_active is not None:
-            print(f"[blue italic]User account created: username='{username}', password='{password}', Email='{email}', Is_active='{is_active}'[/]")
-        elif email:
-            print(f"[blue italic]User account created: username='{username}', password='{password}', Email='{email}'[/]")
-        else:
-            print(f"[blue italic]User account created: username='{username}', password='{password}', No email provided[/]")
-        return user
 
-    def get_user(self, username):
+    def get_project_stats(self, project_title):
         """
-        Retrieve user data by username.
+        Returns the project's task counts, overdue tasks, comment count and
+        burndown series from its maintained counters.
         """
-        self.reload_data()
-        for user in self.user_data.get("users", []):
-            if user["username"] == username:
-                return user
-        return None
+        project = self.get_project(project_title)
+        if not project:
+            raise ValueError(f"Project with title '{project_title}' not found!")
+        return summarize_project_stats(project.get("stats") or project_stats(project))
 
-    def update_user(self, username, updates):
+    def get_project_version(self, project_title):
+        project = self.get_project(project_title)
+        if not project:
+            raise ValueError(f"Project with title '{project_title}' not found!")
+        return project.get("version", 0)
+
+    def get_changes(self, project_title, since_version=0):
         """
-        Update user data.
+        Returns the change feed entries of a project newer than since_version.
+        Fails if compact_changes has dropped some of them; the caller has to
+        reload the project instead.
         """
-        self.reload_data()
-        users = self.user_data.get("users", [])
-        for user in users:
-            if user["username"] == username:
-                user.update(updates)
-                break
-        else:
-            raise ValueError("User not found")
+        # Polled often, so the data is only reloaded once another process has written it.
+        if self._pending is None and any(_file_signature(filename) != signature for filename, signature in self._loaded.items()):
+            self.reload_data()
+        project = next((project for project in self.data.get("projects", []) if project["title"] == project_title), None)
+        if not project:
+            raise ValueError(f"Project with title '{project_title}' not found!")
+        if since_version < project.get("feed_from", 0):
+            raise ValueError(f"Changes of '{project_title}' up to version {project['feed_from']} were compacted away; reload the project.")
+        if since_version >= project.get("version", 0):
+            return []
+        return ChangeFeed(self.changes_filename).since(project.get("id"), since_version)
 
-        self._save_data(self.user_data, self.user_filename)
-    
-    def get_members(self):
+    def undo(self):
         """
-        Retrieve all members.
+        Reverts the last change recorded in self.history and returns its
+        entry. Fails without changing anything if a task or member list it
+        touched has been changed since.
         """
-        self.reload_data()
-        users = self.user_data.get("users", [])
-        members = [user["username"] for user in users if not user.get("is_admin")]
-        return members
+        return self._replay("undo")
 
+    def redo(self):
+        """
+        Applies the change last reverted by undo() again.
+        """
+        return self._replay("redo")
 
-class ProjectManager(DataManager):
+    def _replay(self, action):
+        if self.history is None:
+            raise ValueError(f"Nothing to {action}!")
+        entry = self.history.peek(action)
+        current_state, new_state = ("after", "before") if action == "undo" else ("before", "after")
+        with self.locked():
+            project = self.get_project(entry["project"])
+            if not project:
+                raise ValueError(f"Project '{entry['project']}' no longer exists; the change can't be {action}ne.")
+            located = {task["id"]: (status, task) for status, task_list in project.get("tasks", {}).items()
+                       for task in task_list if "id" in task}
+            ids = {delta["id"] for delta in entry["tasks"]}
+            taken = {task["title"] for task_id, (_, task) in located.items() if task_id not in ids}
+            for delta in entry["tasks"]:
+                current = located.get(delta["id"])
+                expected, task = delta[current_state], delta[new_state]
+                if _task_state(current and current[1]) != _task_state(expected):
+                    raise ValueError(f"Task '{(expected or task)['title']}' has changed since; the change can't be {action}ne.")
+                if task and task["title"] in taken:
+                    raise ValueError(f"Task with title '{task['title']}' already exists!")
+            if entry["members"] and project["members"] != entry["members"][current_state]:
+                raise ValueError(f"The members of '{project['title']}' have changed since; the change can't be {action}ne.")
+
+            if entry["tasks"]:
+                stats = self._stats(project["title"])
+                changed, removed, columns = [], set(), set()
+                for delta in entry["tasks"]:
+                    if delta["id"] in located:
+                        status, old = located[delta["id"]]
+                        project["tasks"][status].remove(old)
+                        count_task(stats, old, -1)
+                        removed.add(old["title"])
+                for delta in entry["tasks"]:
+                    status, old = located.get(delta["id"], (None, None))
+                    task = delta[new_state]
+                    if task:
+                        # Comments aren't part of undo; keep the ones the task has now.
+                        task.pop("comments", None)
+                        if old:
+                            task.update({key: old[key] for key in ("comment_count", "comments") if key in old})
+                        else:
+                            # A deleted task's comments were dropped with it; add them back.
+                            for record in entry.get("comments", {}).get(task["id"], []):
+                                self.comments.stage(record)
+                            task["comment_count"] = self.comments.count(task["id"])
+                        project["tasks"].setdefault(task["status"], []).append(task)
+                        columns.add(task["status"])
+                        count_task(stats, task)
+                        changed.append(task)
+                        self._record_change(project["title"], "restore_task", task=task, **({"old_title": old["title"]} if old else {}))
+                    else:
+                        if old.get("comment_count"):
+                            self.comments.stage({"task": old["id"], "deleted": True})
+                        self._record_change(project["title"], "delete_task", task_title=old["title"], status=status)
+                    old_title, new_title = old and old["title"], task and task["title"]
+                    if old_title != new_title:
+                        self._update_names("tasks", old_title, new_title, project["title"])
+                # Sorted once all tasks are back, as a rebalanced column gets all its ranks back.
+                for status in columns:
+                    project["tasks"][status].sort(key=task_rank)
+                record_burndown(stats)
+                schedule_project(project, changed, removed - {task["title"] for task in changed})
+            if entry["members"]:
+                project["members"] = entry["members"][new_state]
+                self._record_change(project["title"], "restore_members", members=project["members"])
+            self._save_data(self.data, self.data_filename)
+            self.history.shift(action)
+        return entry
+
+class Workspace(UserManager, ProjectManager, TaskManager):
     """
-    A class for managing project data.
+    All manager operations over a single shared copy of the data.
     """
 
-    def create_project(self, title, start_date, owner):
+
+class SessionManager:
+    """
+    Issues and validates HMAC-signed login session tokens, so a user only
+    pays for bcrypt once per session. The current token is cached in a local
+    session file next to the users file.
+    """
+
+    def __init__(self, user_manager, ttl=timedelta(hours=12), session_filename=None, key_filename=None):
+        self.user_manager = user_manager
+        self.ttl = ttl
+        self.session_filename = session_filename or f"{user_manager.user_filename}.session"
+        self.key_filename = key_filename or f"{user_manager.user_filename}.key"
+        self._key = None
+        self._users_stat = None
+        self._user_states = {}
+
+    def _secret(self):
+        if self._key is None:
+            try:
+                with open(self.key_filename, "rb") as f:
+                    self._key = f.read()
+            except FileNotFoundError:
+                key = os.urandom(32)
+                # Written in full before it is linked into place, so no one reads a partial key.
+                tmp_filename = f"{self.key_filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+                fd = os.open(tmp_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(key)
+                try:
+                    os.link(tmp_filename, self.key_filename)
+                    self._key = key
+                except FileExistsError:
+                    # Another process created the key first; use theirs.
+                    with open(self.key_filename, "rb") as f:
+                        self._key = f.read()
+                finally:
+                    os.remove(tmp_filename)
+        return self._key
+
+    def _sign(self, payload):
+        return base64.urlsafe_b64encode(hmac.new(self._secret(), payload, hashlib.sha256).digest()).rstrip(b"=")
+
+    def _user_state(self, username):
+        # Re-read the users file only when it has changed since the last validation.
+        try:
+            stat = os.stat(self.user_manager.user_filename)
+            users_stat = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            users_stat = None
+        if users_stat != self._users_stat:
+            users = self.user_manager._load_data(self.user_manager.user_filename).get("users", [])
+            self._user_states = {
+                user["username"]: (user["is_active"], user.get("session_version", 0)) for user in users
+            }
+            self._users_stat = users_stat
+        return self._user_states.get(username)
+
+    def issue(self, username):
         """
-        Creates a new project.
+        Creates a session token for a user and caches it in the session file.
         """
-        self.reload_data()
-        project_id = str(uuid.uuid4())
-        projects = self.data.get("projects", [])
-        for existing_project in projects:
-            if existing_project["title"] == title:
-                raise ValueError(f"Project with title '{title}' already exists!")
-
-        project = {
-            "id": project_id,
-            "title": title,
-            "start_date": datetime.strptime(start_date, "%d/%m/%Y").strftime("%Y-%m-%d"),
-            "owner": owner,
-            "members": [{owner: "owner"}],
-            "tasks": {"BACKLOG": [],"TODO": [], "DOING": [], "DONE": [], "ARCHIVED": []},
+        user = self.user_manager.get_user(username)
+        if not user:
+            raise ValueError(f"User '{username}' not found!")
+        claims = {
+            "username": username,
+            "expires": int(time.time() + self.ttl.total_seconds()),
+            "version": user.get("session_version", 0),
         }
-        self.data.setdefault("projects", []).append(project)
-        self._save_data(self.data, self.data_filename)
-        print(f"[green]Project created with title: {title}[/]")
-        return project
+        payload = base64.urlsafe_b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8")).rstrip(b"=")
+        token = (payload + b"." + self._sign(payload)).decode("ascii")
+        fd = os.open(self.session_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"token": token}, f)
+        return token
 
-    def is_project_owner(self, project_title, username):
+    def current_token(self):
         """
-        Checks if the given user is the owner of the project.
+        Returns the cached session token, if any.
         """
-        project = self.get_project(project_title)
-        if not project:
-            raise ValueError("Project not found!")
-
-        return project["owner"] == username
+        try:
+            with open(self.session_filename) as f:
+                return json.load(f).get("token")
+        except (FileNotFoundError, ValueError):
+            return None
 
-    def get_project(self, title):
+    def validate(self, token=None):
         """
-        Retrieves a project by its title.
+        Returns the username a token was issued to, or None if the token is
+        forged, expired or revoked. Uses the cached token when none is given.
         """
-        self.reload_data()
-        for project in self.data.get("projects", []):
-            if project["title"] == title:
-                return project
-        return None
+        token = token or self.current_token()
+        if not token:
+            return None
+        try:
+            payload, signature = token.encode("ascii").split(b".")
+            if not hmac.compare_digest(signature, self._sign(payload)):
+                return None
+            claims = json.loads(base64.urlsafe_b64decode(payload + b"=" * (-len(payload) % 4)))
+        except (ValueError, UnicodeEncodeError):
+            return None
+        if claims["expires"] < time.time():
+            return None
+        state = self._user_state(claims["username"])
+        if state is None or not state[0] or state[1] != claims["version"]:
+            return None
+        return claims["username"]
 
-    def get_projects_for_user(self, username):
+    def revoke(self):
         """
-        Retrieves a list of projects for a given user.
+        Forgets the cached session token.
         """
-        self.reload_data()
-        projects = self.data.get("projects", [])
-        user_projects = []
-        for project in projects:
-            members = [list(member.keys())[0] for member in project.get("members", [])]
-            if username in members:
-                user_projects.append(project)
-        return user_projects
+        try:
+            os.remove(self.session_filename)
+        except FileNotFoundError:
+            pass
 
-    def list_projects(self):
+
+class AsyncDataManager:
+    """
+    Awaitable counterpart of DataManager.
+    File I/O and bcrypt run in an executor so the event loop is never blocked.
+    Reads run concurrently; writes to the same project are serialised in arrival
+    order, and the manager methods they call hold the data file lock for
+    their read-modify-write. The write locks are kept per event loop, so a
+    manager can be used from successive asyncio.run() calls.
+
+    Only the everyday operations are wrapped. Maintenance commands
+    (compact_comments, compact_changes, gc_attachments) and undo/redo,
+    which need a shared UndoHistory, are on the synchronous managers only.
+    """
+
+    manager_class = DataManager
+
+    def __init__(self, user_filename="users.json", data_filename="data.json", executor=None):
+        self.user_filename = user_filename
+        self.data_filename = data_filename
+        self.executor = executor
+        self._local = threading.local()
+        # Event loop -> {key: asyncio.Lock}; an asyncio.Lock can't be shared between loops.
+        self._write_locks = weakref.WeakKeyDictionary()
+
+    def _manager(self):
+        # Each worker thread gets its own manager so concurrent calls never share self.data.
+        manager = getattr(self._local, "manager", None)
+        if manager is None:
+            manager = self.manager_class(self.user_filename, self.data_filename)
+            self._local.manager = manager
+        return manager
+
+    def _call(self, method, args):
+        return getattr(self._manager(), method)(*args)
+
+    async def _read(self, method, *args):
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._call, method, args)
+
+    async def _write(self, key, method, *args):
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        lock = self._write_locks.setdefault(loop, {}).setdefault(key, asyncio.Lock())
+        async with lock:
+            return await loop.run_in_executor(self.executor, self._call, method, args)
+
+    async def purge_data(self):
         """
-        Retrieves and returns a list of all projects.
+        Deletes all user and project data.
         """
-        self.reload_data()
-        projects = self.data.get("projects", [])
-        if not projects:
-            print("[bold magenta]No projects found![/]")
-            return []
-        return projects
+        return await self._write(None, "purge_data")
+
+
+class AsyncUserManager(AsyncDataManager):
+    """
+    Awaitable counterpart of UserManager.
+    """
+
+    manager_class = UserManager
+
+    async def create_user(self, username, password, is_active=True, email=None, is_admin=False):
+        return await self._write("users", "create_user", username, password, is_active, email, is_admin)
+
+    async def get_user(self, username):
+        return await self._read("get_user", username)
+
+    async def authenticate(self, username, password):
+        # Not serialised with the user writes: bcrypt would hold up every other
+        # login, and a rehash takes the data file lock and rechecks the hash itself.
+        return await self._read("authenticate", username, password)
+
+    async def update_user(self, username, updates):
+        return await self._write("users", "update_user", username, updates)
+
+    async def get_members(self):
+        return await self._read("get_members")
+
+    async def list_users(self, filters=None, offset=0, limit=None):
+        return await self._read("list_users", filters, offset, limit)
+
+    async def set_users_active(self, is_active, filters=None):
+        return await self._write("users", "set_users_active", is_active, filters)
+
+    async def delete_users(self, filters):
+        return await self._write("users", "delete_users", filters)
+
+
+class AsyncProjectManager(AsyncDataManager):
+    """
+    Awaitable counterpart of ProjectManager.
+    """
+
+    manager_class = ProjectManager
+
+    async def create_project(self, title, start_date, owner):
+        return await self._write(title, "create_project", title, start_date, owner)
+
+    async def is_project_owner(self, project_title, username):
+        return await self._read("is_project_owner", project_title, username)
+
+    async def get_project(self, title):
+        return await self._read("get_project", title)
+
+    async def get_projects_for_user(self, username):
+        return await self._read("get_projects_for_user", username)
+
+    async def list_projects(self):
+        return await self._read("list_projects")
+
+    async def add_member(self, project_title, username, role=None):
+        return await self._write(project_title, "_add_member", project_title, username, role)
+
+    async def remove_member_from_project(self, project_title, username):
+        return await self._write(project_title, "remove_member_from_project", project_title, username)
+
+    async def delete_project(self, project_title):
+        return await self._write(project_title, "delete_project", project_title)
+
+    async def get_member_role(self, project_title, username):
+        return await self._read("get_member_role", project_title, username)
+
+
+class AsyncTaskManager(AsyncDataManager):
+    """
+    Awaitable counterpart of TaskManager.
+    """
 
-    def add_member(self, project_title, username, role, project_manager):
-        """
-        Adds a user to a project.
-        """
-        self.reload_data()
-        project = project_manager.get_project(project_title)
-        if not project:
-            raise ValueError(f"Project with Title'{project_title}' not found!")
+    manager_class = TaskManager
 
-        if username in project.get("members", []):
-            print(f"[bold red]Error: User '{username}' is already a member of the project![/]")
-            return
-        if not role:
-            role = "member"
-        project["members"].append({username: role})
-        self._save_data(self.data, self.data_filename)
+    async def add_task(self, project_title, task_title, description, duration, priority, status="TODO"):
+        return await self._write(project_title, "add_task", project_title, task_title, description, duration, priority, status)
 
-    def remove_member_from_project(self, project_title, username):
-        """
-        Removes a user from a project.
-        """
-        self.reload_data()
-        project = self.get_project(project_title)
-        if not project:
-            raise ValueError("Project not found!")
+    async def edit_task(self, project_title, task_title, new_title, new_description, new_duration, new_priority):
+        return await self._write(project_title, "edit_task", project_title, task_title, new_title, new_description, new_duration, new_priority)
 
-        usernames = [list(member.keys())[0] for member in project["members"]]
-        if username not in usernames:
-            raise ValueError("User is not a member of the project!")
+    async def delete_task(self, project_title, task_title):
+        return await self._write(project_title, "delete_task", project_title, task_title)
 
-        del project["members"][usernames.index(username)]
-        
-        self._save_data(self.data, self.data_filename)
-    
-    def delete_project(self, project_title):
-        """
-        Deletes a project.
-        """
-        self.reload_data()
-        project = self.get_project(project_title)
-        if not project:
-            raise ValueError(f"Project with title '{project_title}' not found!")
+    async def move_task(self, project_title, task_title, new_status, position=None):
+        return await self._write(project_title, "move_task", project_title, task_title, new_status, position)
 
-        self.data["projects"].remove(project)
-        self._save_data(self.data, self.data_filename)
-        
-    def get_member_role(self, project_title, username):
-        """
-        Retrieves the role of a member in a project.
-        """
-        self.reload_data()
-        project = self.get_project(project_title)
-        if not project:
-            raise ValueError(f"Project with title '{project_title}' not found!")
+    async def assignee_member(self, project_title, task_title, username):
+        return await self._write(project_title, "assignee_member", project_title, task_title, username)
 
-        for member in project.get("members", []):
-            if username in member:
-                return member[username]
-        return None
+    async def remove_assignee(self, project_title, task_title, username):
+        return await self._write(project_title, "remove_assignee", project_title, task_title, username)
 
+    async def get_tasks_for_project(self, project_title):
+        return await self._read("get_tasks_for_project", project_title)
 
-class TaskManager(DataManager):
-    def get_project(self, project_title):
-        self.reload_data()
-        for project in self.data.get("projects", []):
-            if project["title"] == project_title:
-                return project
-        return None
+    async def get_task(self, project_title, task_title):
+        return await self._read("get_task", project_title, task_title)
 
-    def add_task(self, project_title, task_title, description, duration, priority, status="TODO"):
-        self.reload_data()
-        project = self.get_project(project_title)
-        if not project:
-            raise ValueError(f"Project with title '{project_title}' not found!")
+    async def add_comment(self, project_title, task_title, comment, author):
+        return await self._write(project_title, "add_comment", project_title, task_title, comment, author)
 
-        task = {
-            "title": task_title,
-            "description": description,
-            "start_date": date.today().isoformat(),
-            "end_date": (date.today() + timedelta(days=duration)).isoformat(),
-            "priority": priority,
-            "status": status,
-            "comments": [],
-            "assignees": [],
-        }
+    async def edit_comment(self, project_title, task_title, comment_id, new_comment):
+        return await self._write(project_title, "edit_comment", project_title, task_title, comment_id, new_comment)
 
-        if "tasks" not in project or not isinstance(project["tasks"], dict):
-            project["tasks"] = {"BACKLOG": [],"TODO": [], "DOING": [], "DONE": [], "ARCHIVED": []}
+    async def delete_comment(self, project_title, task_title, comment_id):
+        return await self._write(project_title, "delete_comment", project_title, task_title, comment_id)
 
-        project["tasks"][status].append(task)
-        self._save_data(self.data, self.data_filename)
-        return task
-    
-    def edit_task(self, project_title, task_title, new_title, new_description, new_duration, new_priority):
-        self.reload_data()
-        project = self.get_project(project_title)
-        if not project:
-            raise ValueError(f"Project with title '{project_title}' not found!")
+    async def get_comments(self, project_title, task_title, offset=0, limit=None):
+        return await self._read("get_comments", project_title, task_title, offset, limit)
 
-        for status, task_list in project["tasks"].items():
-            for task in task_list:
-                if task["title"] == task_title:
-                    task["title"] = new_title if new_title else task["title"]
-                    task["description"] = new_description if new_description else task["description"]
-                    task["end_date"] = (task["start_date"] + timedelta(days=new_duration)).isoformat() if new_duration else task["end_date"]
-                    task["priority"] = new_priority if new_priority else task["priority"]
-                    self._save_data(self.data, self.data_filename)
-                    return
-        raise ValueError(f"Task with title '{task_title}' not found in project '{project_title}'.")
+    async def add_attachment(self, project_title, task_title, filename, name=None):
+        return await self._write(project_title, "add_attachment", project_title, task_title, filename, name)
 
-    def delete_task(self, project_title, task_title):
-        self.reload_data()
-        project = self.get_project(project_title)
-        if not project:
-            raise ValueError(f"Project with title '{project_title}' not found!")
+    async def remove_attachment(self, project_title, task_title, name):
+        return await self._write(project_title, "remove_attachment", project_title, task_title, name)
 
-        for task_list in project["tasks"].values():
-            for task in task_list:
-                if task["title"] == task_title:
-                    task_list.remove(task)
-                    self._save_data(self.data, self.data_filename)
-                    return
-        raise ValueError(f"Task with title '{task_title}' not found in project '{project_title}'.")
+    async def get_attachments(self, project_title, task_title):
+        return await self._read("get_attachments", project_title, task_title)
 
-    def move_task(self, project_title, task_title, new_status):
-        self.reload_data()
-        project = self.get_project(project_title)
-        if not project:
-            raise ValueError(f"Project with title '{project_title}' not found!")
+    async def add_subtask(self, project_title, task_title, title, duration=0, parent_id=None):
+        return await self._write(project_title, "add_subtask", project_title, task_title, title, duration, parent_id)
 
-        for status, task_list in project["tasks"].items():
-            for task in task_list:
-                if task["title"] == task_title:
-                    task["status"] = new_status
-                    task_list.remove(task)
-                    project["tasks"].setdefault(new_status, []).append(task)
-                    self._save_data(self.data, self.data_filename)
-                    return
+    async def check_subtask(self, project_title, task_title, subtask_id, done=True):
+        return await self._write(project_title, "check_subtask", project_title, task_title, subtask_id, done)
 
-        raise ValueError(f"Task with title '{task_title}' not found in project '{project_title}'.")
+    async def remove_subtask(self, project_title, task_title, subtask_id):
+        return await self._write(project_title, "remove_subtask", project_title, task_title, subtask_id)
 
-    def assignee_member(self, project_title, task_title, username):
-        self.reload_data()
-        project = self.get_project(project_title)
-        if not project:
-            raise ValueError("Project not found!")
+    async def get_subtasks(self, project_title, task_title):
+        return await self._read("get_subtasks", project_title, task_title)
 
-        task_found = False
-        for task_list in project["tasks"].values():
-            for task in task_list:
-                if task["title"] == task_title:
-                    task_found = True
-                    if username in task["assignees"]:
-                        raise ValueError("User already assigned to this task!")
-                    task["assignees"].append(username)
-                    self._save_data(self.data, self.data_filename)
-                    return
+    async def get_rollup(self, project_title, task_title, subtask_id=None):
+        return await self._read("get_rollup", project_title, task_title, subtask_id)
 
-        if not task_found:
-            raise ValueError("Task not found in project!")
+    async def export_attachment(self, project_title, task_title, name, out):
+        return await self._read("export_attachment", project_title, task_title, name, out)
 
-    def remove_assignee(self, project_title, task_title, username):
-        self.reload_data()
-        project = self.get_project(project_title)
-        if not project:
-            raise ValueError("Project not found!")
+    async def add_dependency(self, project_title, task_title, blocked_by):
+        return await self._write(project_title, "add_dependency", project_title, task_title, blocked_by)
 
-        for task_list in project["tasks"].values():
-            for task in task_list:
-                if task["title"] == task_title:
-                    if username not in task["assignees"]:
-                        raise ValueError("User is not assigned to this task!")
-                    task["assignees"].remove(username)
-                    self._save_data(self.data, self.data_filename)
-                    return
+    async def remove_dependency(self, project_title, task_title, blocked_by):
+        return await self._write(project_title, "remove_dependency", project_title, task_title, blocked_by)
 
-        raise ValueError("Task not found in project!")
+    async def get_schedule(self, project_title):
+        return await self._read("get_schedule", project_title)
 
-    def get_tasks_for_project(self, project_title):
-        self.reload_data()
-        project = self.get_project(project_title)
-        if not project:
-            raise ValueError(f"Project with title '{project_title}' not found!")
+    async def get_project_stats(self, project_title):
+        return await self._read("get_project_stats", project_title)
 
-        tasks = []
-        for task_list in project["tasks"].values():
-            tasks.extend(task_list)
-        return tasks
+    async def get_project_version(self, project_title):
+        return await self._read("get_project_version", project_title)
 
-    def get_task(self, project_title, task_title):
-        self.reload_data()
-        project = self.get_project(project_title)
-        if not project:
-            raise ValueError(f"Project with title '{project_title}' not found!")
+    async def get_changes(self, project_title, since_version=0):
+        return await self._read("get_changes", project_title, since_version)
 
-        for task_list in project["tasks"].values():
-            for task in task_list:
-                if task["title"] == task_title:
-                    return task
-        return None
-    
-    def add_comment(self, project_title, task_title, comment, author):
-        self.reload_data()
-        task = self.get_task(project_title, task_title)
-        if not task:
-            raise ValueError(f"Task with title '{task_title}' not found in project '{project_title}'.")
 
-        task["comments"].append({"comment": comment, "author": author, "timestamp": datetime.now().isoformat()})
-        self._save_data(self.data, self.data_filename)
+# bcrypt hash of "password" at cost 4, shared by generated users so fixtures build quickly.
+FIXTURE_PASSWORD_HASH = "$2b$04$3ovGfq0jiJ7t8ZlbPrpx5.E3lLetLIfjefWulMU/x5/GA.UayFYE6"
 
-    def edit_comment(self, project_title, task_title, comment_index, new_comment):
-        self.reload_data()
-        task = self.get_task(project_title, task_title)
-        if not task:
-            raise ValueError(f"Task with title '{task_title}' not found in project '{project_title}'.")
 
-        if comment_index >= len(task["comments"]):
-            raise ValueError(f"Comment index '{comment_index}' out of range.")
+def parse_status_counts(spec):
+    """
+    Parses "100" (that many tasks in every status) or "TODO=100,DONE=50"
+    into a mapping of status to task count.
+    """
+    if "=" not in spec:
+        return {status: int(spec) for status in TASK_STATUSES}
+    counts = {status: 0 for status in TASK_STATUSES}
+    for part in spec.split(","):
+        status, _, count = part.partition("=")
+        status = status.strip().upper()
+        if status not in counts:
+            raise ValueError(f"Unknown status '{status}'")
+        counts[status] = int(count)
+    return counts
 
-        task["comments"][comment_index]["comment"] = new_comment
-        task["comments"][comment_index]["timestamp"] = datetime.now().isoformat()
-        self._save_data(self.data, self.data_filename)
 
-    def delete_comment(self, project_title, task_title, comment_index):
-        self.reload_data()
-        task = self.get_task(project_title, task_title)
-        if not task:
-            raise ValueError(f"Task with title '{task_title}' not found in project '{project_title}'.")
+def generate_workspace(users, projects, tasks_per_status, comments=0, assignees=0, members=5, seed=0):
+    """
+    Builds synthetic user and project data for benchmarks.
+    tasks_per_status maps each status to the number of tasks it gets in every project.
+    Returns (user_data, data) in the same layout as users.json and data.json,
+    except that comments are inline in their tasks; DataManager.write_workspace
+    moves them to the comment store.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    user_list = [
+        {
+            "username": f"user{n}",
+            "password": FIXTURE_PASSWORD_HASH,
+            "email": f"user{n}@example{n % 10}.com",
+            "is_active": n % 20 != 0,
+            "is_admin": n == 0,
+        }
+        for n in range(users)
+    ]
+    usernames = [user["username"] for user in user_list] or ["owner"]
 
-        if comment_index >= len(task["comments"]):
-            raise ValueError(f"Comment index '{comment_index}' out of range.")
+    project_list = []
+    for p in range(projects):
+        owner = usernames[p % len(usernames)]
+        project_members = [owner] + [name for name in rng.sample(usernames, min(members, len(usernames))) if name != owner]
+        tasks = {status: [] for status in TASK_STATUSES}
+        for status, count in tasks_per_status.items():
+            for i in range(count):
+                start = today - timedelta(days=rng.randint(0, 60))
+                tasks[status].append({
+                    "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "title": f"Task {p}-{status}-{i}",
+                    "description": f"Generated task {i} in {status}",
+                    "start_date": start.isoformat(),
+                    "end_date": (start + timedelta(days=rng.randint(1, 30))).isoformat(),
+                    "priority": rng.choice(TASK_PRIORITIES),
+                    "status": status,
+                    "rank": i + 1,
+                    "comments": [
+                        {
+                            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                            "comment": f"Comment {c}",
+                            "author": rng.choice(project_members),
+                            "timestamp": (datetime.now() - timedelta(minutes=rng.randint(0, 100000))).isoformat(),
+                        }
+                        for c in range(comments)
+                    ],
+                    "assignees": rng.sample(project_members, min(assignees, len(project_members))),
+                })
+        project = {
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "title": f"Project {p}",
+            "start_date": (today - timedelta(days=90)).isoformat(),
+            "owner": owner,
+            "members": [{owner: "owner"}] + [{name: "member"} for name in project_members[1:]],
+            "tasks": tasks,
+        }
+        project["stats"] = project_stats(project)
+        project_list.append(project)
+    return {"users": user_list}, {"projects": project_list}
 
-        task["comments"].pop(comment_index)
-        self._save_data(self.data, self.data_filename)
+def _parsed_size(value):
+    """
+    Returns the bytes tracemalloc attributes to a freshly parsed copy of value.
+    """
+    text = json.dumps(value)
+    before = tracemalloc.get_traced_memory()[0]
+    parsed = json.loads(text)
+    size = tracemalloc.get_traced_memory()[0] - before
+    del parsed
+    return size
 
-    def get_comments(self, project_title, task_title):
-        self.reload_data()
-        task = self.get_task(project_title, task_title)
-        if not task:
-            raise ValueError(f"Task with title '{task_title}' not found in project '{project_title}'.")
 
-        return task["comments"]
+def _disk_bytes(project):
+    # A project sits two levels deep in data.json, so each of its lines carries 4 extra spaces.
+    text = json.dumps(project, indent=2)
+    return len(text) + 4 * (text.count("\n") + 1)
 
-if __name__ == "__main__":
-    data_manager = DataManager()
-    data_manager.reload_data()
-    user_manager = UserManager()
-    project_manager = ProjectManager()
-    task_manager = TaskManager()
 
-    args = parser.parse_args()
+def profile_memory(user_filename="users.json", data_filename="data.json"):
+    """
+    Loads the workspace under tracemalloc and reports the memory its parts
+    take once parsed: each project, its tasks per status and its comments,
+    plus the users. Also reports the bytes each project takes in data.json.
+    Comments are read from the comment store, which is not part of the
+    workspace's resident size.
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        loader = DataManager.__new__(DataManager)
+        loader.comments = CommentStore(f"{data_filename}.comments")
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        user_data = loader._load_data(user_filename)
+        data = loader._load_data(data_filename)
+        current, peak = tracemalloc.get_traced_memory()
+        report = {
+            "files": {
+                "users_bytes": os.path.getsize(user_filename) if os.path.exists(user_filename) else 0,
+                "data_bytes": os.path.getsize(data_filename) if os.path.exists(data_filename) else 0,
+                "comments_bytes": os.path.getsize(loader.comments.filename) if os.path.exists(loader.comments.filename) else 0,
+            },
+            "workspace": {"resident_bytes": current - before, "peak_load_bytes": peak - before},
+            "users": {
+                "count": len(user_data.get("users", [])),
+                "resident_bytes": _parsed_size(user_data.get("users", [])),
+            },
+            "projects": [],
+        }
+        for project in data.get("projects", []):
+            tasks = project.get("tasks", {})
+            comments = [
+                comment
+                for task_list in tasks.values()
+                for task in task_list
+                for comment in task.get("comments", []) + (loader.comments.list(task["id"]) if task.get("comment_count") else [])
+            ]
+            report["projects"].append({
+                "title": project["title"],
+                "resident_bytes": _parsed_size(project),
+                "disk_bytes": _disk_bytes(project),
+                "tasks": {
+                    status: {"count": len(task_list), "resident_bytes": _parsed_size(task_list)}
+                    for status, task_list in tasks.items()
+                },
+                "comments": {"count": len(comments), "resident_bytes": _parsed_size(comments)},
+            })
+        report["projects"].sort(key=lambda project: -project["resident_bytes"])
+        return report
+    finally:
+        if started:
+            tracemalloc.stop()
 
+
+def run_command(args, user_manager, project_manager, task_manager):
+    """
+    Executes a parsed command against the given managers.
+    """
     if args.command == "create-user":
         user_manager.create_user(args.username, args.password, args.is_active, args.email)
+    elif args.command == "list-users":
+        result = user_manager.list_users(user_filters(args), args.offset, args.limit)
+        if args.json:
+            sys.stdout.write(json.dumps(result, indent=2) + "\n")
+        else:
+            from rich.table import Table
+
+            table = Table(show_header=True, header_style="bold magenta")
+            for column in ("Username", "Email", "Active", "Projects"):
+                table.add_column(column)
+            for user in result["users"]:
+                table.add_row(user["username"], user["email"] or "-", str(user["is_active"]), str(user["projects"]))
+            print(table)
+            print(f"[blue]Users {args.offset + 1 if result['users'] else 0}-{args.offset + len(result['users'])} of {result['total']}[/]")
+    elif args.command == "bulk-users":
+        filters = user_filters(args)
+        if args.action == "delete":
+            result = user_manager.delete_users(filters)
+            print(f"[green]Deleted {len(result['deleted'])} users[/]")
+            if result["skipped"]:
+                print(f"[yellow]Kept {len(result['skipped'])} users who own projects: {', '.join(result['skipped'])}[/]")
+        else:
+            changed = user_manager.set_users_active(args.action == "activate", filters)
+            print(f"[green]{args.action.capitalize()}d {len(changed)} users[/]")
     elif args.command == "create-project":
         project_manager.create_project(args.title, args.start_date, args.owner)
     elif args.command == "purge-data":
-        data_manager.purge_data()
+        user_manager.purge_data()
     elif args.command == "add-task":
         task_manager.add_task(
             args.project_title,
-            args.task_title,
+            args.title,
             args.description,
             args.duration,
             args.priority,
             args.status,
         )
     elif args.command == "move-task":
-        task_manager.move_task(args.project_title, args.task_title, args.new_status)
+        position = args.position - 1 if args.position is not None else None
+        task_manager.move_task(args.project_title, args.task_title, args.new_status, position)
     elif args.command == "delete-task":
         task_manager.delete_task(args.project_title, args.task_title)
     elif args.command == "assign-member":
@@ -573,10 +4155,405 @@ if __name__ == "__main__":
     elif args.command == "remove-member":
         project_manager.remove_member_from_project(args.project_title, args.username)
     elif args.command == "add-comment":
-        task_manager.add_comment(args.project_title, args.task_title, args.comment_body, args.author)
+        comment = task_manager.add_comment(args.project_title, args.task_title, args.comment_body, args.author)
+        print(f"[green]Added comment {comment['id']}[/]")
     elif args.command == "edit-comment":
-        task_manager.edit_comment(args.project_title, args.task_title, int(args.comment_index), args.new_comment)
+        task_manager.edit_comment(args.project_title, args.task_title, args.comment_id, args.new_comment)
     elif args.command == "delete-comment":
-        task_manager.delete_comment(args.project_title, args.task_title, int(args.comment_index))
+        task_manager.delete_comment(args.project_title, args.task_title, args.comment_id)
+    elif args.command == "list-comments":
+        comments = task_manager.get_comments(args.project_title, args.task_title, args.offset, args.limit)
+        if args.json:
+            sys.stdout.write(json.dumps(comments, indent=2) + "\n")
+        else:
+            from rich.markup import escape
+
+            for comment in comments:
+                print(f"[blue]{comment['id']}[/] {comment['author']} at {comment['timestamp']}: {escape(comment['comment'])}")
+            if not comments:
+                print("[yellow]No comments found.[/]")
+    elif args.command == "add-subtask":
+        item = task_manager.add_subtask(args.project_title, args.task_title, args.title, args.duration, args.parent)
+        print(f"[green]Added subtask {item['id']}[/]")
+    elif args.command == "check-subtask":
+        task_manager.check_subtask(args.project_title, args.task_title, args.id, not args.uncheck)
+    elif args.command == "remove-subtask":
+        task_manager.remove_subtask(args.project_title, args.task_title, args.id)
+    elif args.command == "list-subtasks":
+        subtasks = task_manager.get_subtasks(args.project_title, args.task_title)
+        rollup = task_manager.get_rollup(args.project_title, args.task_title)
+        if args.json:
+            sys.stdout.write(json.dumps({"rollup": rollup, "subtasks": subtasks}, indent=2) + "\n")
+        else:
+            from rich.markup import escape
+
+            def show(items, depth):
+                for item in items:
+                    if item.get("subtasks"):
+                        summary = rollup_summary(item["rollup"])
+                        print(f"{'  ' * depth}{item['id']} {escape(item['title'])} [blue]{summary['done']}/{summary['items']} ({summary['percent']}%), {summary['remaining_days']} days left[/]")
+                        show(item["subtasks"], depth + 1)
+                    else:
+                        print(f"{'  ' * depth}{escape('[x]' if item['done'] else '[ ]')} {item['id']} {escape(item['title'])} ({item['duration']} day{'s' if item['duration'] != 1 else ''})")
+
+            print(f"[blue]{args.task_title}: {rollup['done']}/{rollup['items']} done ({rollup['percent']}%), {rollup['remaining_days']} days left[/]")
+            show(subtasks, 1)
+    elif args.command == "add-attachment":
+        attachment = task_manager.add_attachment(args.project_title, args.task_title, args.file, args.name)
+        print(f"[green]Attached '{attachment['name']}' ({attachment['size']} bytes, sha256 {attachment['sha256'][:12]})[/]")
+    elif args.command == "list-attachments":
+        attachments = task_manager.get_attachments(args.project_title, args.task_title)
+        if args.json:
+            sys.stdout.write(json.dumps(attachments, indent=2) + "\n")
+        else:
+            from rich.markup import escape
+
+            for attachment in attachments:
+                print(f"[blue]{attachment['sha256'][:12]}[/] {escape(attachment['name'])} ({attachment['size']} bytes, added {attachment['added']})")
+            if not attachments:
+                print("[yellow]No attachments found.[/]")
+    elif args.command == "get-attachment":
+        if args.output == "-":
+            task_manager.export_attachment(args.project_title, args.task_title, args.name, sys.stdout.buffer)
+        else:
+            with open(args.output, "wb") as f:
+                task_manager.export_attachment(args.project_title, args.task_title, args.name, f)
+    elif args.command == "remove-attachment":
+        task_manager.remove_attachment(args.project_title, args.task_title, args.name)
+    elif args.command == "attachments-gc":
+        removed, freed = task_manager.gc_attachments(args.min_age)
+        print(f"[green]Deleted {removed} unused attachment files ({freed} bytes)[/]")
+    elif args.command == "backup":
+        task_manager.backups.keep_last, task_manager.backups.keep_days = args.keep_last, args.keep_days
+        manifest = task_manager.backup(args.full)
+        written = manifest["written"]
+        print(f"[green]Backup taken at {manifest['timestamp']}: {len(manifest['data']['projects'])} projects, {written['chunks']} new chunks ({written['bytes']} bytes)[/]")
+    elif args.command == "list-backups":
+        for name in task_manager.backups.list():
+            manifest = task_manager.backups.manifest(name)
+            print(f"{manifest['timestamp']}  {len(manifest['data']['projects'])} projects  {manifest['written']['chunks']} new chunks ({manifest['written']['bytes']} bytes)")
+    elif args.command == "restore":
+        manifest = task_manager.restore(args.at)
+        print(f"[green]Restored the backup taken at {manifest['timestamp']}[/]")
+    elif args.command == "snapshot":
+        with task_manager.snapshot() as snapshot:
+            print(f"[green]Snapshot of {len(snapshot.versions)} projects taken at {snapshot.taken_at} ({len(snapshot.mapped)} bytes)[/]")
+    elif args.command in ("undo", "redo"):
+        entry = getattr(task_manager, args.command)()
+        print(f"[green]{'Undid' if args.command == 'undo' else 'Redid'} {entry['label']} of '{entry['title']}' in '{entry['project']}'[/]")
+    elif args.command == "compact-comments":
+        saved = task_manager.compact_comments()
+        print(f"[green]Comment store compacted, {saved} bytes freed[/]")
+    elif args.command == "compact-changes":
+        result = task_manager.compact_changes(args.hours)
+        print(f"[green]Change feed compacted, {result['dropped']} entries dropped, {result['kept']} kept, {result['bytes']} bytes freed[/]")
+    elif args.command == "bench-bcrypt":
+        results, recommended = benchmark_bcrypt(args.min_cost, args.max_cost, args.target_ms)
+        for result in results:
+            marker = " <- recommended" if result["cost"] == recommended else ""
+            print(f"cost {result['cost']:>2}: {result['ms']:>9.2f} ms{marker}")
+        print(f"[green]Set TRELLOMIZE_BCRYPT_ROUNDS={recommended} to hash in at most {args.target_ms:g} ms (current: {bcrypt_rounds()})[/]")
+    elif args.command == "log-stats":
+        lines = []
+        for path in args.log or rotated_logs("app.log"):
+            with open(path) as f:
+                lines.extend(f)
+        summary = analyze_log(lines)
+        if args.json:
+            sys.stdout.write(json.dumps(summary, indent=2) + "\n")
+        else:
+            from rich.table import Table
+
+            table = Table(show_header=True, header_style="bold magenta")
+            for column in ("Operation", "Count", "Errors", "Mean ms", "p50 ms", "p95 ms", "Max ms"):
+                table.add_column(column, justify="left" if column == "Operation" else "right")
+            for name, op in summary.items():
+                table.add_row(name, *("-" if value is None else str(value) for value in op.values()))
+            print(table)
+    elif args.command == "stats":
+        filename = args.file or STATS_FILENAME
+        try:
+            with open(filename) as f:
+                stats = json.load(f)
+        except FileNotFoundError:
+            stats = {}
+        # Include anything recorded by this process that hasn't been dumped yet.
+        summary = summarize_stats(merge_stats(stats, _stats))
+        if args.json:
+            sys.stdout.write(json.dumps(summary, indent=2) + "\n")
+        elif not summary:
+            print("[bold magenta]No statistics recorded. Run with TRELLOMIZE_STATS=1 to collect them.[/]")
+        else:
+            from rich.table import Table
+
+            table = Table(show_header=True, header_style="bold magenta")
+            for column in ("Operation", "Calls", "Total ms", "Mean ms", "p50 ms", "p95 ms", "Max ms"):
+                table.add_column(column, justify="left" if column == "Operation" else "right")
+            for name, entry in summary.items():
+                table.add_row(name, *(str(value) for value in entry.values()))
+            print(table)
+        if args.reset and os.path.exists(filename):
+            os.remove(filename)
+    elif args.command == "generate-fixture":
+        user_data, data = generate_workspace(
+            args.users, args.projects, parse_status_counts(args.tasks_per_status),
+            args.comments, args.assignees, args.members, args.seed,
+        )
+        DataManager(args.user_file, args.data_file).write_workspace(user_data, data)
+        task_count = sum(len(tasks) for project in data["projects"] for tasks in project["tasks"].values())
+        print(f"[green]Wrote {len(user_data['users'])} users to {args.user_file} and {len(data['projects'])} projects with {task_count} tasks to {args.data_file}[/]")
+    elif args.command == "profile-memory":
+        report = profile_memory(user_manager.user_filename, user_manager.data_filename)
+        if args.json:
+            sys.stdout.write(json.dumps(report, indent=2) + "\n")
+        else:
+            from rich.table import Table
+
+            def kib(size):
+                return f"{size / 1024:,.1f}"
+
+            print(f"[blue]Workspace: {kib(report['workspace']['resident_bytes'])} KiB resident "
+                  f"(peak {kib(report['workspace']['peak_load_bytes'])} KiB while loading), "
+                  f"data.json {kib(report['files']['data_bytes'])} KiB, users.json {kib(report['files']['users_bytes'])} KiB[/]")
+            print(f"[blue]Users: {report['users']['count']} using {kib(report['users']['resident_bytes'])} KiB[/]")
+            table = Table(show_header=True, header_style="bold magenta")
+            table.add_column("Project")
+            table.add_column("Resident KiB", justify="right")
+            table.add_column("Disk KiB", justify="right")
+            for status in TASK_STATUSES:
+                table.add_column(f"{status} KiB (n)", justify="right")
+            table.add_column("Comments KiB (n)", justify="right")
+            for project in report["projects"][:args.top]:
+                tasks = project["tasks"]
+                table.add_row(
+                    project["title"],
+                    kib(project["resident_bytes"]),
+                    kib(project["disk_bytes"]),
+                    *(f"{kib(tasks[status]['resident_bytes'])} ({tasks[status]['count']})" if status in tasks else "-" for status in TASK_STATUSES),
+                    f"{kib(project['comments']['resident_bytes'])} ({project['comments']['count']})",
+                )
+            print(table)
+    elif args.command == "project-stats":
+        stats = task_manager.get_project_stats(args.project_title)
+        if args.json:
+            sys.stdout.write(json.dumps(stats, indent=2) + "\n")
+        else:
+            from rich.table import Table
+
+            print(f"[blue]{args.project_title}: {stats['tasks']} tasks, {stats['overdue']} overdue, {stats['comments']} comments[/]")
+            checklist = stats["checklist"]
+            if checklist["items"]:
+                print(f"[blue]Checklists: {checklist['done']}/{checklist['items']} items done ({checklist['percent']}%), {checklist['remaining_days']} days left[/]")
+            for title, counts in (("Status", stats["status"]), ("Priority", stats["priority"]), ("Assignee", stats["assignee"])):
+                table = Table(show_header=True, header_style="bold magenta")
+                table.add_column(title)
+                table.add_column("Tasks", justify="right")
+                for key, count in counts.items():
+                    table.add_row(key, str(count))
+                print(table)
+            table = Table(show_header=True, header_style="bold magenta")
+            table.add_column("Date")
+            table.add_column("Open tasks", justify="right")
+            for day, count in stats["burndown"]:
+                table.add_row(day, str(count))
+            print(table)
+    elif args.command == "add-dependency":
+        task_manager.add_dependency(args.project_title, args.task_title, args.blocked_by)
+    elif args.command == "remove-dependency":
+        task_manager.remove_dependency(args.project_title, args.task_title, args.blocked_by)
+    elif args.command == "schedule":
+        schedule = task_manager.get_schedule(args.project_title)
+        if args.json:
+            sys.stdout.write(json.dumps(schedule, indent=2) + "\n")
+        else:
+            from rich.table import Table
+
+            print(f"[blue]{args.project_title}: {schedule['start']} to {schedule['finish']} ({schedule['duration_days']} days)[/]")
+            table = Table(show_header=True, header_style="bold magenta")
+            for column in ("Task", "Earliest start", "Earliest finish", "Latest start", "Latest finish", "Slack", "Blocked by"):
+                table.add_column(column)
+            critical = set(schedule["critical_path"])
+            for title, entry in schedule["tasks"].items():
+                table.add_row(
+                    title, entry["earliest_start"], entry["earliest_finish"], entry["latest_start"],
+                    entry["latest_finish"], str(entry["slack_days"]), ", ".join(entry["blocked_by"]),
+                    style="bold red" if title in critical else None,
+                )
+            print(table)
+            print(f"[red]Critical path: {' -> '.join(schedule['critical_path'])}[/]")
+    elif args.command == "suggest":
+        if args.kind == "tasks" and not args.project_title:
+            raise ValueError("--project_title is required to complete task titles.")
+        for name in task_manager.suggest(args.kind, args.text, args.project_title, args.limit):
+            sys.stdout.write(name + "\n")
+    elif args.command == "task-report":
+        from columnar import load_columns, task_report
+
+        start = time.perf_counter()
+        columns = load_columns(task_manager.data_filename, args.columns_file, args.rebuild)
+        loaded_ms = (time.perf_counter() - start) * 1000
+        report = task_report(columns)
+        report["load_ms"] = round(loaded_ms, 3)
+        report["mapped"] = columns.mapped is not None
+        if args.json:
+            sys.stdout.write(json.dumps(report, indent=2) + "\n")
+        else:
+            from rich.table import Table
+
+            how = "mapped the snapshot" if report["mapped"] else "rebuilt the snapshot"
+            print(f"[blue]{report['tasks']} tasks in {report['projects']} projects ({how} in {loaded_ms:.1f}ms, {report['backend']} backend)[/]")
+            table = Table(title="Planned days of finished tasks", show_header=True, header_style="bold magenta")
+            table.add_column("Project")
+            for column in ("Tasks", "Mean", "p50", "p90", "Max"):
+                table.add_column(column, justify="right")
+            cycle_time = report["cycle_time_days"]
+            for title, row in [("All projects", cycle_time["all"])] + list(cycle_time["projects"].items()):
+                table.add_row(title, *(str(value) for value in row.values()))
+            print(table)
+            table = Table(title="Tasks per assignee", show_header=True, header_style="bold magenta")
+            for column in ("Assignee", "Done", "Open"):
+                table.add_column(column, justify="left" if column == "Assignee" else "right")
+            for name, row in list(report["throughput_by_assignee"].items())[:args.top]:
+                table.add_row(name, str(row["done"]), str(row["open"]))
+            print(table)
+            table = Table(title="Planned duration (days)", show_header=True, header_style="bold magenta")
+            for label in report["duration_histogram"]:
+                table.add_column(label, justify="right")
+            table.add_row(*(str(count) for count in report["duration_histogram"].values()))
+            print(table)
+            table = Table(title="Finished per week", show_header=True, header_style="bold magenta")
+            table.add_column("Week of")
+            table.add_column("Tasks", justify="right")
+            for week, count in list(report["completed_per_week"].items())[-12:]:
+                table.add_row(week, str(count))
+            print(table)
+    elif args.command == "digest":
+        from digest import generate_digests
+
+        formats = ["markdown", "json"] if args.format == "both" else [args.format]
+        start = time.perf_counter()
+        summary = generate_digests(task_manager.user_filename, task_manager.data_filename, args.output_dir, formats, args.days, args.hours, args.workers)
+        elapsed = time.perf_counter() - start
+        print(f"[green]Wrote {summary['files']} digest files for {summary['users']} users to '{args.output_dir}' "
+              f"({summary['projects']} projects, {summary['events']} changes, {elapsed:.2f}s)[/]")
+    elif args.command == "login":
+        user_manager.authenticate(args.username, args.password)
+        sys.stdout.write(SessionManager(user_manager).issue(args.username) + "\n")
+    elif args.command == "logout":
+        SessionManager(user_manager).revoke()
+    elif args.command == "whoami":
+        username = SessionManager(user_manager).validate(args.token)
+        if not username:
+            raise ValueError("No valid session")
+        print(username)
+    else:
+        raise ValueError(f"Unknown command '{args.command}'")
+
+
+def parse_batch_line(line, parser=None):
+    """
+    Parses one batch script line into an argument list.
+    A line is either a command in the usual command-line syntax or a JSON
+    object such as {"command": "move-task", "project_title": "...", ...}.
+    """
+    if line.startswith("{"):
+        fields = json.loads(line)
+        argv = [fields.pop("command")]
+        options = _command_options(parser or build_parser(), argv[0])
+        for key, value in fields.items():
+            action = options.get(f"--{key}")
+            # A flag is given for true and left out for false; an option that
+            # takes a value gets false as its value. null leaves the option out.
+            if value is None or (value is False and action is not None and action.nargs == 0):
+                continue
+            if value is True and (action is None or action.nargs in (0, "?")):
+                argv.append(f"--{key}")
+            elif isinstance(value, list):
+                argv.extend([f"--{key}", *(str(item) for item in value)])
+            else:
+                argv.extend([f"--{key}", str(value).lower() if isinstance(value, bool) else str(value)])
+        return argv
+    return shlex.split(line)
+
+
+def _command_options(parser, command):
+    """
+    Returns the option string -> argparse action map of a subcommand, or an
+    empty map when parser has no such command.
+    """
+    for action in parser._actions:
+        if isinstance(action, argparse._SubParsersAction) and command in action.choices:
+            return action.choices[command]._option_string_actions
+    return {}
+
+
+def run_batch(lines, workspace, commit_every=0, stop_on_error=False, parser=None):
+    """
+    Runs each script line as a command against one loaded copy of the data,
+    committing once at the end or after every commit_every commands.
+    Returns a report entry per command.
+    """
+    parser = parser or build_parser()
+    report = []
+    executed = 0
+    with workspace.batch():
+        for line_number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entry = {"line": line_number, "command": line, "ok": True, "error": None}
+            errors = StringIO()
+            try:
+                with redirect_stderr(errors):
+                    args = parser.parse_args(parse_batch_line(line, parser))
+                if args.command == "batch":
+                    raise ValueError("Batch scripts cannot run nested batches")
+                run_command(args, workspace, workspace, workspace)
+            except SystemExit:
+                message = errors.getvalue().strip().splitlines()
+                entry.update(ok=False, error=message[-1] if message else "Invalid command")
+            except Exception as e:
+                entry.update(ok=False, error=str(e))
+            report.append(entry)
+            executed += 1
+            if commit_every and executed % commit_every == 0:
+                workspace.commit()
+            if stop_on_error and not entry["ok"]:
+                break
+    return report
+
+
+if __name__ == "__main__":
+    user_manager = UserManager()
+    project_manager = ProjectManager()
+    task_manager = TaskManager()
+    # Undo history shared by the commands run against these files.
+    history = UndoHistory(filename=f"{task_manager.data_filename}.undo")
+    user_manager.history = project_manager.history = task_manager.history = history
+
+    parser = build_parser()
+    args = parser.parse_args()
+
+    if args.command == "batch":
+        from rich.markup import escape
+
+        script = sys.stdin if args.file == "-" else open(args.file)
+        with script:
+            workspace = Workspace()
+            workspace.history = history
+            report = run_batch(script, workspace, args.commit_every, args.stop_on_error, parser)
+        for entry in report:
+            if entry["ok"]:
+                print(f"[green]ok[/]    line {entry['line']}: {escape(entry['command'])}")
+            else:
+                print(f"[bold red]error[/] line {entry['line']}: {escape(entry['command'])} -> {escape(entry['error'])}")
+        failed = sum(not entry["ok"] for entry in report)
+        print(f"[blue]{len(report) - failed} succeeded, {failed} failed[/]")
+        if args.report:
+            with open(args.report, "w") as f:
+                json.dump(report, f, indent=2)
+        sys.exit(1 if failed else 0)
+    elif args.command:
+        run_command(args, user_manager, project_manager, task_manager)
     else:
         parser.print_help()
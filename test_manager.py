@@ -1,9 +1,24 @@
+import asyncio
+import io
+import manager
+import subprocess
+import sys
+import time
 import unittest
 import os
 import json
+import shutil
 import bcrypt
-from datetime import date, timedelta
-from manager import UserManager, ProjectManager, TaskManager, DataManager
+from contextlib import redirect_stdout
+from unittest import mock
+from datetime import date, datetime, timedelta
+from manager import UserManager, ProjectManager, TaskManager, DataManager, hash_cost, benchmark_bcrypt
+from manager import AsyncUserManager, AsyncProjectManager, AsyncTaskManager
+from manager import ChangeFeed, SessionManager, Workspace, analyze_log, run_batch
+
+# Use the cheapest bcrypt cost so the suite stays fast.
+os.environ.setdefault("TRELLOMIZE_BCRYPT_ROUNDS", "4")
+
 
 class TestUserManager(unittest.TestCase):
     def setUp(self):
@@ -18,6 +33,9 @@ class TestUserManager(unittest.TestCase):
             os.remove(self.user_file)
         if os.path.exists(self.data_file):
             os.remove(self.data_file)
+        for suffix in (".changes", ".comments"):
+            if os.path.exists(f"{self.data_file}{suffix}"):
+                os.remove(f"{self.data_file}{suffix}")
 
     def test_create_user(self):
         self.user_manager.create_user("testuser", "password", True, "test@example.com")
@@ -39,6 +57,54 @@ class TestUserManager(unittest.TestCase):
         members = self.user_manager.get_members()
         self.assertEqual(members, ["memberuser"])
 
+    def test_list_users(self):
+        self.user_manager.create_user("adminuser", "password", True, "admin@example.com", is_admin=True)
+        for n in range(5):
+            self.user_manager.create_user(f"user{n}", "password", n % 2 == 0, f"user{n}@{'a' if n < 3 else 'b'}.com")
+        ProjectManager(self.user_file, self.data_file).create_project("Project", "01/01/2023", "user1")
+
+        result = self.user_manager.list_users({"is_active": True}, offset=1, limit=1)
+        self.assertEqual(result["total"], 3)
+        self.assertEqual([user["username"] for user in result["users"]], ["user2"])
+        self.assertNotIn("password", result["users"][0])
+        self.assertEqual(self.user_manager.list_users({"email_domain": "@B.com"})["total"], 2)
+        self.assertEqual([user["username"] for user in self.user_manager.list_users({"min_projects": 1})["users"]], ["user1"])
+
+    def test_bulk_users(self):
+        for n in range(4):
+            self.user_manager.create_user(f"user{n}", "password", True, f"user{n}@{'a' if n < 2 else 'b'}.com")
+        projects = ProjectManager(self.user_file, self.data_file)
+        projects.create_project("Project", "01/01/2023", "user0")
+        projects.add_member("Project", "user1", "member", projects)
+
+        self.assertEqual(self.user_manager.set_users_active(False, {"email_domain": "a.com"}), ["user0", "user1"])
+        self.assertEqual(self.user_manager.get_user("user1")["session_version"], 1)
+        self.assertEqual(self.user_manager.set_users_active(False, {"email_domain": "a.com"}), [])
+
+        with self.assertRaises(ValueError):
+            self.user_manager.delete_users({})
+        result = self.user_manager.delete_users({"is_active": False})
+        self.assertEqual(result, {"deleted": ["user1"], "skipped": ["user0"]})
+        self.assertIsNone(self.user_manager.get_user("user1"))
+        self.assertEqual(projects.get_project("Project")["members"], [{"user0": "owner"}])
+
+    def test_deleted_users_are_unassigned(self):
+        self.user_manager.create_user("alice", "password", True, "alice@x.com")
+        self.user_manager.create_user("bob", "password", True, "bob@y.com")
+        projects = ProjectManager(self.user_file, self.data_file)
+        projects.create_project("P", "01/01/2023", "alice")
+        projects.add_member("P", "bob", "member", projects)
+        tasks = TaskManager(self.user_file, self.data_file)
+        tasks.add_task("P", "t", "", 1, "LOW")
+        tasks.assignee_member("P", "t", "bob")
+        tasks.assignee_member("P", "t", "alice")
+        version = tasks.get_project_version("P")
+
+        self.assertEqual(self.user_manager.delete_users({"email_domain": "y.com"})["deleted"], ["bob"])
+        self.assertEqual(tasks.get_task("P", "t")["assignees"], ["alice"])
+        self.assertEqual(tasks.get_project("P")["stats"]["assignee"], {"alice": 1})
+        self.assertIn("remove_assignee", [change["op"] for change in tasks.get_changes("P", version)])
+
 
 class TestProjectManager(unittest.TestCase):
     def setUp(self):
@@ -55,6 +121,9 @@ class TestProjectManager(unittest.TestCase):
             os.remove(self.user_file)
         if os.path.exists(self.data_file):
             os.remove(self.data_file)
+        for suffix in (".changes", ".comments"):
+            if os.path.exists(f"{self.data_file}{suffix}"):
+                os.remove(f"{self.data_file}{suffix}")
 
     def test_create_project(self):
         project = self.project_manager.create_project("Test Project", "01/01/2023", "owner")
@@ -110,6 +179,9 @@ class TestTaskManager(unittest.TestCase):
             os.remove(self.user_file)
         if os.path.exists(self.data_file):
             os.remove(self.data_file)
+        for suffix in (".changes", ".comments"):
+            if os.path.exists(f"{self.data_file}{suffix}"):
+                os.remove(f"{self.data_file}{suffix}")
 
     def test_add_task(self):
         task = self.task_manager.add_task("Test Project", "Test Task", "Description", 2, "HIGH")
@@ -131,6 +203,37 @@ class TestTaskManager(unittest.TestCase):
         self.assertTrue(project["tasks"]["DOING"])
         self.assertFalse(project["tasks"]["TODO"])
 
+    def test_move_task_position(self):
+        for title in ("A", "B", "C"):
+            self.task_manager.add_task("Test Project", title, "", 1, "LOW")
+        self.task_manager.move_task("Test Project", "C", "TODO", 0)
+        self.task_manager.move_task("Test Project", "A", "DOING")
+        self.task_manager.add_task("Test Project", "D", "", 1, "LOW", status="DOING")
+        self.task_manager.move_task("Test Project", "B", "DOING", 1)
+        tasks = self.project_manager.get_project("Test Project")["tasks"]
+        self.assertEqual([task["title"] for task in tasks["TODO"]], ["C"])
+        self.assertEqual([task["title"] for task in tasks["DOING"]], ["A", "B", "D"])
+
+        # Keep splitting the same gap until the column has to be rebalanced.
+        for i in range(60):
+            self.task_manager.add_task("Test Project", f"T{i}", "", 1, "LOW", status="DOING")
+            self.task_manager.move_task("Test Project", f"T{i}", "DOING", 1)
+        column = self.project_manager.get_project("Test Project")["tasks"]["DOING"]
+        self.assertEqual([task["title"] for task in column], ["A"] + [f"T{i}" for i in reversed(range(60))] + ["B", "D"])
+        ranks = [task["rank"] for task in column]
+        self.assertEqual(ranks, sorted(set(ranks)))
+        self.assertIn("rebalance", [change["op"] for change in self.task_manager.get_changes("Test Project")])
+
+    def test_tasks_saved_without_ranks(self):
+        for title in ("A", "B"):
+            self.task_manager.add_task("Test Project", title, "", 1, "LOW")
+        for task in self.task_manager.data["projects"][0]["tasks"]["TODO"]:
+            del task["rank"]
+        self.task_manager._save_data(self.task_manager.data, self.data_file)
+        self.task_manager.move_task("Test Project", "B", "TODO", 0)
+        column = self.project_manager.get_project("Test Project")["tasks"]["TODO"]
+        self.assertEqual([(task["title"], task["rank"]) for task in column], [("B", 0), ("A", 1)])
+
     def test_assign_member(self):
         self.user_manager.create_user("member", "password", True, "member@example.com")
         self.task_manager.add_task("Test Project", "Test Task", "Description", 2, "HIGH")
@@ -150,23 +253,1372 @@ class TestTaskManager(unittest.TestCase):
         self.task_manager.add_task("Test Project", "Test Task", "Description", 2, "HIGH")
         self.task_manager.add_comment("Test Project", "Test Task", "This is a comment.", "owner")
         task = self.task_manager.get_task("Test Project", "Test Task")
-        self.assertEqual(len(task["comments"]), 1)
-        self.assertEqual(task["comments"][0]["comment"], "This is a comment.")
-        self.assertEqual(task["comments"][0]["author"], "owner")
+        self.assertEqual(task["comment_count"], 1)
+        self.assertNotIn("comments", task)
+        comments = self.task_manager.get_comments("Test Project", "Test Task")
+        self.assertEqual(comments[0]["comment"], "This is a comment.")
+        self.assertEqual(comments[0]["author"], "owner")
 
     def test_edit_comment(self):
         self.task_manager.add_task("Test Project", "Test Task", "Description", 2, "HIGH")
-        self.task_manager.add_comment("Test Project", "Test Task", "This is a comment.", "owner")
-        self.task_manager.edit_comment("Test Project", "Test Task", 0, "This is an edited comment.")
-        task = self.task_manager.get_task("Test Project", "Test Task")
-        self.assertEqual(task["comments"][0]["comment"], "This is an edited comment.")
+        comment = self.task_manager.add_comment("Test Project", "Test Task", "This is a comment.", "owner")
+        self.task_manager.edit_comment("Test Project", "Test Task", comment["id"], "This is an edited comment.")
+        comments = self.task_manager.get_comments("Test Project", "Test Task")
+        self.assertEqual(comments[0]["id"], comment["id"])
+        self.assertEqual(comments[0]["comment"], "This is an edited comment.")
 
     def test_delete_comment(self):
         self.task_manager.add_task("Test Project", "Test Task", "Description", 2, "HIGH")
-        self.task_manager.add_comment("Test Project", "Test Task", "This is a comment.", "owner")
-        self.task_manager.delete_comment("Test Project", "Test Task", 0)
+        first = self.task_manager.add_comment("Test Project", "Test Task", "First", "owner")
+        second = self.task_manager.add_comment("Test Project", "Test Task", "Second", "owner")
+        self.task_manager.delete_comment("Test Project", "Test Task", first["id"])
+        # Ids stay valid when earlier comments are deleted.
+        self.task_manager.edit_comment("Test Project", "Test Task", second["id"], "Second, edited")
+        with self.assertRaises(ValueError):
+            self.task_manager.delete_comment("Test Project", "Test Task", first["id"])
+        task = self.task_manager.get_task("Test Project", "Test Task")
+        self.assertEqual(task["comment_count"], 1)
+        self.assertEqual([comment["comment"] for comment in self.task_manager.get_comments("Test Project", "Test Task")], ["Second, edited"])
+
+    def test_comment_pages(self):
+        self.task_manager.add_task("Test Project", "Test Task", "Description", 2, "HIGH")
+        for n in range(5):
+            self.task_manager.add_comment("Test Project", "Test Task", f"Comment {n}", "owner")
+        page = self.task_manager.get_comments("Test Project", "Test Task", offset=2, limit=2)
+        self.assertEqual([comment["comment"] for comment in page], ["Comment 2", "Comment 3"])
+        self.assertEqual(self.task_manager.get_comments("Test Project", "Test Task", offset=5, limit=2), [])
+
+        # A second manager picks up comments appended by the first.
+        other = TaskManager(self.user_file, self.data_file)
+        self.assertEqual(len(other.get_comments("Test Project", "Test Task")), 5)
+        self.task_manager.add_comment("Test Project", "Test Task", "Comment 5", "owner")
+        self.assertEqual(other.get_comments("Test Project", "Test Task", offset=5)[0]["comment"], "Comment 5")
+
+    def test_inline_comments_are_moved_to_the_store(self):
+        self.task_manager.add_task("Test Project", "Test Task", "Description", 2, "HIGH")
+        self.task_manager.add_task("Test Project", "Gone", "Description", 2, "HIGH")
+        self.task_manager.add_comment("Test Project", "Gone", "Orphaned", "owner")
+        self.task_manager.delete_task("Test Project", "Gone")
+        # Tasks written before the comment store kept their comments inline.
         task = self.task_manager.get_task("Test Project", "Test Task")
-        self.assertFalse(task["comments"])
+        del task["id"], task["comment_count"]
+        task["comments"] = [{"comment": "Old", "author": "owner", "timestamp": "2023-01-01T00:00:00"}]
+        self.task_manager._save_data(self.task_manager.data, self.data_file)
+
+        self.assertGreater(self.task_manager.compact_comments(), 0)
+        task = self.task_manager.get_task("Test Project", "Test Task")
+        self.assertEqual(task["comment_count"], 1)
+        self.assertEqual(self.task_manager.get_comments("Test Project", "Test Task")[0]["comment"], "Old")
+        with open(f"{self.data_file}.comments") as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+class TestSessionManager(unittest.TestCase):
+    def setUp(self):
+        self.user_file = "test_users.json"
+        self.data_file = "test_data.json"
+        self.user_manager = UserManager(user_filename=self.user_file, data_filename=self.data_file)
+        self.user_manager.user_data = {"users": []}
+        self.user_manager._save_data(self.user_manager.user_data, self.user_file)
+        self.user_manager.create_user("testuser", "password", True, "test@example.com")
+        self.session_manager = SessionManager(self.user_manager)
+
+    def tearDown(self):
+        for filename in (self.user_file, self.data_file, f"{self.user_file}.session", f"{self.user_file}.key"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def test_authenticate(self):
+        self.assertEqual(self.user_manager.authenticate("testuser", "password")["username"], "testuser")
+        with self.assertRaises(ValueError):
+            self.user_manager.authenticate("testuser", "wrong")
+        with self.assertRaises(ValueError):
+            self.user_manager.authenticate("nobody", "password")
+
+    def test_authenticate_reads_only_the_user_file(self):
+        with mock.patch.object(self.user_manager, "_load_data", wraps=self.user_manager._load_data) as load:
+            self.user_manager.authenticate("testuser", "password")
+        self.assertEqual({call.args[0] for call in load.call_args_list}, {self.user_file})
+
+    def test_issue_and_validate(self):
+        token = self.session_manager.issue("testuser")
+        self.assertEqual(self.session_manager.validate(token), "testuser")
+        self.assertEqual(self.session_manager.current_token(), token)
+        self.assertEqual(SessionManager(self.user_manager).validate(), "testuser")
+
+    def test_tampered_token_is_rejected(self):
+        token = self.session_manager.issue("testuser")
+        payload, signature = token.split(".")
+        self.assertIsNone(self.session_manager.validate(payload[:-2] + "xx." + signature))
+        self.assertIsNone(self.session_manager.validate("garbage"))
+
+    def test_expired_token_is_rejected(self):
+        self.session_manager.ttl = timedelta(seconds=-1)
+        token = self.session_manager.issue("testuser")
+        self.assertIsNone(self.session_manager.validate(token))
+
+    def test_password_change_and_deactivation_revoke_tokens(self):
+        token = self.session_manager.issue("testuser")
+        self.user_manager.update_user("testuser", {"email": "new@example.com"})
+        self.assertEqual(self.session_manager.validate(token), "testuser")
+        self.user_manager.update_user("testuser", {"password": "new hash"})
+        self.assertIsNone(self.session_manager.validate(token))
+
+        token = self.session_manager.issue("testuser")
+        self.user_manager.update_user("testuser", {"is_active": False})
+        self.assertIsNone(self.session_manager.validate(token))
+
+    def test_login_rehashes_to_configured_cost(self):
+        token = self.session_manager.issue("testuser")
+        self.assertEqual(hash_cost(self.user_manager.get_user("testuser")["password"]), 4)
+        self.user_manager.bcrypt_rounds = 5
+        self.user_manager.authenticate("testuser", "password")
+        user = self.user_manager.get_user("testuser")
+        self.assertEqual(hash_cost(user["password"]), 5)
+        self.assertTrue(bcrypt.checkpw(b"password", user["password"].encode("utf-8")))
+        self.assertEqual(self.session_manager.validate(token), "testuser")
+
+    def test_rehash_keeps_a_concurrent_password_change(self):
+        other = UserManager(self.user_manager.user_filename, self.user_manager.data_filename)
+        hash_password = self.user_manager.hash_password
+
+        def change_meanwhile(password):
+            other.update_user("testuser", {"password": "changed hash"})
+            return hash_password(password)
+
+        self.user_manager.bcrypt_rounds = 5
+        self.user_manager.hash_password = change_meanwhile
+        self.user_manager.authenticate("testuser", "password")
+        self.assertEqual(self.user_manager.get_user("testuser")["password"], "changed hash")
+
+    def test_key_created_by_another_process_is_used(self):
+        link = os.link
+
+        def create_meanwhile(source, destination):
+            with open(destination, "wb") as f:
+                f.write(b"k" * 32)
+            link(source, destination)
+
+        with mock.patch.object(manager.os, "link", create_meanwhile):
+            token = self.session_manager.issue("testuser")
+        self.assertEqual(self.session_manager._secret(), b"k" * 32)
+        self.assertEqual(SessionManager(self.user_manager).validate(token), "testuser")
+        self.assertEqual([name for name in os.listdir(".") if name.startswith(f"{self.user_file}.key.")], [])
+
+    def test_benchmark_bcrypt_recommends_cost_within_target(self):
+        results, recommended = benchmark_bcrypt(min_cost=4, max_cost=6, target_ms=10000, runs=1)
+        self.assertEqual([result["cost"] for result in results], [4, 5, 6])
+        self.assertEqual(recommended, 6)
+
+    def test_validation_is_fast(self):
+        token = self.session_manager.issue("testuser")
+        self.session_manager.validate(token)
+        start = time.perf_counter()
+        for _ in range(1000):
+            self.session_manager.validate(token)
+        self.assertLess((time.perf_counter() - start) / 1000, 0.001)
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.user_file = "test_users.json"
+        self.data_file = "test_data.json"
+        self.workspace = Workspace(user_filename=self.user_file, data_filename=self.data_file)
+
+    def tearDown(self):
+        for filename in (self.user_file, self.data_file, f"{self.data_file}.lock", f"{self.data_file}.changes", f"{self.data_file}.comments"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def test_batch_runs_commands_and_reports_errors(self):
+        script = [
+            "# provisioning",
+            "create-user --username owner --password password --email owner@example.com",
+            "create-project --title 'Test Project' --start_date 01/01/2023 --owner owner",
+            '{"command": "add-task", "project_title": "Test Project", "title": "Test Task", "priority": "HIGH"}',
+            "move-task --project_title 'Test Project' --task_title 'Test Task' --new_status DOING",
+            "move-task --project_title 'Missing' --task_title 'Test Task' --new_status DONE",
+            "add-task --project_title 'Test Project'",
+        ]
+        report = run_batch(script, self.workspace)
+        self.assertEqual([entry["ok"] for entry in report], [True, True, True, True, False, False])
+        self.assertEqual(report[0]["line"], 2)
+        self.assertIn("not found", report[4]["error"])
+
+        task_manager = TaskManager(user_filename=self.user_file, data_filename=self.data_file)
+        task = task_manager.get_task("Test Project", "Test Task")
+        self.assertEqual(task["status"], "DOING")
+        self.assertEqual(task["priority"], "HIGH")
+
+    def test_jsonl_flags(self):
+        self.assertEqual(
+            manager.parse_batch_line('{"command": "list-users", "json": true, "active": true, "inactive": false, "email_domain": null}'),
+            ["list-users", "--json", "--active"],
+        )
+        self.assertEqual(manager.parse_batch_line('{"command": "log-stats", "log": ["a.log", "b.log"]}'), ["log-stats", "--log", "a.log", "b.log"])
+        script = [
+            "create-user --username owner --password password --email owner@example.com",
+            '{"command": "list-users", "json": true, "active": true}',
+        ]
+        with redirect_stdout(io.StringIO()) as out:
+            report = run_batch(script, self.workspace)
+        self.assertEqual([entry["ok"] for entry in report], [True, True])
+        self.assertIn('"owner"', out.getvalue())
+
+    def test_jsonl_false_option_value(self):
+        self.assertEqual(
+            manager.parse_batch_line('{"command": "create-user", "username": "bob", "is_active": false}'),
+            ["create-user", "--username", "bob", "--is_active", "false"],
+        )
+        script = [
+            '{"command": "create-user", "username": "bob", "password": "password", "email": "bob@example.com", "is_active": false}',
+            '{"command": "create-user", "username": "dave", "password": "password", "email": "dave@example.com", "is_active": true}',
+            "create-user --username carl --password password --email carl@example.com --is_active false",
+        ]
+        report = run_batch(script, self.workspace)
+        self.assertTrue(all(entry["ok"] for entry in report))
+        users = UserManager(user_filename=self.user_file, data_filename=self.data_file)
+        self.assertFalse(users.get_user("bob")["is_active"])
+        self.assertTrue(users.get_user("dave")["is_active"])
+        self.assertFalse(users.get_user("carl")["is_active"])
+
+    def test_batch_writes_only_on_commit(self):
+        with self.workspace.batch():
+            self.workspace.create_user("owner", "password", True, "owner@example.com")
+            self.workspace.create_project("Test Project", "01/01/2023", "owner")
+            self.assertFalse(os.path.exists(self.data_file))
+            self.workspace.commit()
+            self.assertTrue(os.path.exists(self.data_file))
+            self.workspace.add_task("Test Project", "Test Task", "", 1, "LOW")
+        project = ProjectManager(user_filename=self.user_file, data_filename=self.data_file).get_project("Test Project")
+        self.assertEqual(len(project["tasks"]["TODO"]), 1)
+
+    def test_stop_on_error(self):
+        script = [
+            "delete-task --project_title 'Missing' --task_title 'Task'",
+            "create-user --username owner --password password --email owner@example.com",
+        ]
+        report = run_batch(script, self.workspace, stop_on_error=True)
+        self.assertEqual(len(report), 1)
+        self.assertIsNone(UserManager(user_filename=self.user_file, data_filename=self.data_file).get_user("owner"))
+
+
+class TestChangeFeed(unittest.TestCase):
+    def setUp(self):
+        self.user_file = "test_users.json"
+        self.data_file = "test_data.json"
+        self.workspace = Workspace(user_filename=self.user_file, data_filename=self.data_file)
+        self.workspace.create_project("Feed", "01/01/2023", "owner")
+
+    def tearDown(self):
+        for filename in (self.user_file, self.data_file, f"{self.data_file}.lock", f"{self.data_file}.changes", f"{self.data_file}.comments"):
+            if os.path.exists(filename):
+                os.remove(filename)
+        shutil.rmtree(f"{self.data_file}.backups", ignore_errors=True)
+
+    def test_version_and_changes(self):
+        self.assertEqual(self.workspace.get_project_version("Feed"), 1)
+        self.workspace.add_task("Feed", "Task", "Description", 2, "HIGH")
+        self.workspace.move_task("Feed", "Task", "DOING")
+        self.workspace.delete_task("Feed", "Task")
+        self.assertEqual(self.workspace.get_project_version("Feed"), 4)
+
+        changes = self.workspace.get_changes("Feed", since_version=1)
+        self.assertEqual([change["op"] for change in changes], ["add_task", "move_task", "delete_task"])
+        self.assertEqual([change["version"] for change in changes], [2, 3, 4])
+        self.assertEqual(changes[1]["task_data"]["status"], "DOING")
+        self.assertEqual(changes[1]["from_status"], "TODO")
+        self.assertNotIn("task_data", changes[2])
+
+    def test_get_changes_reads_back_to_since_version(self):
+        self.workspace.create_project("Other", "01/01/2023", "owner")
+        self.workspace.add_task("Feed", "Old", "", 1, "LOW")
+        self.workspace.add_task("Other", "Task", "", 1, "LOW")
+        self.workspace.add_task("Feed", "New", "", 1, "LOW")
+        with mock.patch.object(self.workspace, "reload_data") as reload_data, \
+                mock.patch.object(manager.json, "loads", wraps=json.loads) as loads:
+            changes = self.workspace.get_changes("Feed", since_version=2)
+            self.assertEqual(self.workspace.get_changes("Feed", since_version=3), [])
+        self.assertEqual([change["task"] for change in changes], ["New"])
+        # The last three entries: New, Other's task and Old, which is where it stops.
+        self.assertEqual(loads.call_count, 3)
+        reload_data.assert_not_called()
+
+        other = TaskManager(user_filename=self.user_file, data_filename=self.data_file)
+        other.move_task("Feed", "New", "DONE")
+        self.assertEqual([change["version"] for change in self.workspace.get_changes("Feed", since_version=3)], [4])
+
+    def test_poll_reads_only_new_entries(self):
+        feed = ChangeFeed(self.workspace.changes_filename)
+        self.assertEqual(len(feed.poll()), 1)
+        self.assertEqual(feed.poll(), [])
+
+        other = TaskManager(user_filename=self.user_file, data_filename=self.data_file)
+        other.add_task("Feed", "Task", "Description", 2, "HIGH")
+        self.assertEqual([change["task"] for change in feed.poll()], ["Task"])
+
+        self.workspace.purge_data()
+        self.assertIsNone(feed.poll())
+
+    def test_batch_writes_feed_on_commit(self):
+        feed = ChangeFeed(self.workspace.changes_filename)
+        feed.seek_end()
+        with self.workspace.batch():
+            self.workspace.add_task("Feed", "Task1", "", 1, "LOW")
+            self.workspace.add_task("Feed", "Task2", "", 1, "LOW")
+            self.assertEqual(feed.poll(), [])
+        self.assertEqual([change["version"] for change in feed.poll()], [2, 3])
+
+    def test_compact_changes(self):
+        for title in ("Old1", "Old2", "New"):
+            self.workspace.add_task("Feed", title, "", 1, "LOW")
+        # Age the project's creation and the first two tasks by a month.
+        with open(self.workspace.changes_filename) as f:
+            changes = [json.loads(line) for line in f]
+        for change in changes[:3]:
+            change["timestamp"] = (datetime.now() - timedelta(days=30)).isoformat()
+        with open(self.workspace.changes_filename, "w") as f:
+            f.write("".join(json.dumps(change) + "\n" for change in changes))
+        feed = ChangeFeed(self.workspace.changes_filename)
+        feed.seek_end()
+
+        result = self.workspace.compact_changes(keep_hours=24)
+        self.assertEqual((result["dropped"], result["kept"]), (3, 1))
+        self.assertGreater(result["bytes"], 0)
+        self.assertEqual([change["task"] for change in self.workspace.get_changes("Feed", since_version=3)], ["New"])
+        with self.assertRaises(ValueError):
+            self.workspace.get_changes("Feed", since_version=2)
+        # Readers of the old feed reload, and then follow the new one.
+        self.assertIsNone(feed.poll())
+        self.workspace.move_task("Feed", "New", "DONE")
+        self.assertEqual([change["version"] for change in feed.poll()], [4, 5])
+        self.assertEqual(self.workspace.compact_changes(keep_hours=24)["dropped"], 0)
+
+
+class TestProjectStats(unittest.TestCase):
+    def setUp(self):
+        self.user_file = "test_users.json"
+        self.data_file = "test_data.json"
+        self.workspace = Workspace(user_filename=self.user_file, data_filename=self.data_file)
+        self.workspace.create_project("Stats", "01/01/2023", "owner")
+
+    def tearDown(self):
+        for filename in (self.user_file, self.data_file, f"{self.data_file}.lock", f"{self.data_file}.changes", f"{self.data_file}.comments"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def test_counters_follow_mutations(self):
+        self.workspace.add_task("Stats", "Task1", "", 2, "HIGH")
+        self.workspace.add_task("Stats", "Task2", "", 2, "LOW", "DOING")
+        self.workspace.add_task("Stats", "Task3", "", 2, "LOW")
+        self.workspace.assignee_member("Stats", "Task1", "owner")
+        self.workspace.add_comment("Stats", "Task1", "Comment", "owner")
+        self.workspace.move_task("Stats", "Task2", "DONE")
+        self.workspace.edit_task("Stats", "Task3", None, None, "5", "CRITICAL")
+        self.workspace.delete_task("Stats", "Task1")
+
+        project = self.workspace.get_project("Stats")
+        expected = manager.project_stats(project)
+        for key in ("status", "priority", "assignee", "due", "comments"):
+            self.assertEqual(project["stats"][key], expected[key])
+        self.assertEqual(self.workspace.get_task("Stats", "Task3")["end_date"], (date.today() + timedelta(days=5)).isoformat())
+
+        stats = self.workspace.get_project_stats("Stats")
+        self.assertEqual(stats["tasks"], 2)
+        self.assertEqual(stats["status"]["TODO"], 1)
+        self.assertEqual(stats["priority"]["CRITICAL"], 1)
+        self.assertEqual(stats["burndown"], [(date.today().isoformat(), 1)])
+
+    def test_overdue_and_command(self):
+        self.workspace.add_task("Stats", "Late", "", 1, "HIGH")
+        self.workspace.add_task("Stats", "Done", "", 1, "HIGH", "DONE")
+        tomorrow = date.today() + timedelta(days=1)
+        self.assertEqual(manager.summarize_project_stats(self.workspace.get_project("Stats")["stats"], today=tomorrow + timedelta(days=1))["overdue"], 1)
+
+        args = manager.build_parser().parse_args(["project-stats", "--project_title", "Stats", "--json"])
+        out = io.StringIO()
+        with redirect_stdout(out):
+            manager.run_command(args, self.workspace, self.workspace, self.workspace)
+        self.assertEqual(json.loads(out.getvalue())["status"]["DONE"], 1)
+
+
+class TestDependencies(unittest.TestCase):
+    def setUp(self):
+        self.user_file = "test_users.json"
+        self.data_file = "test_data.json"
+        self.workspace = Workspace(user_filename=self.user_file, data_filename=self.data_file)
+        self.workspace.create_project("Plan", "01/01/2023", "owner")
+        for title, duration in [("Design", 3), ("Build", 5), ("Docs", 2), ("Ship", 1)]:
+            self.workspace.add_task("Plan", title, "", duration, "MEDIUM")
+        self.workspace.add_dependency("Plan", "Build", "Design")
+        self.workspace.add_dependency("Plan", "Ship", "Build")
+        self.workspace.add_dependency("Plan", "Ship", "Docs")
+
+    def tearDown(self):
+        for filename in (self.user_file, self.data_file, f"{self.data_file}.lock", f"{self.data_file}.changes", f"{self.data_file}.comments"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def assertMatchesFullSchedule(self):
+        project = self.workspace.get_project("Plan")
+        incremental = project["schedule"]
+        manager.schedule_project(project)
+        full = project["schedule"]
+        self.assertEqual((incremental["finish"], incremental["tasks"]), (full["finish"], full["tasks"]))
+
+        def edges(graph):
+            return {title: (node["duration"], set(node["blocked_by"]), set(node["blocks"])) for title, node in graph.items()}
+
+        # The saved graph has the same edges, and its ranks still put every blocker first.
+        graph = incremental["graph"]
+        self.assertEqual(edges(graph), edges(full["graph"]))
+        for node in graph.values():
+            for blocker in node["blocked_by"]:
+                self.assertLess(graph[blocker]["rank"], node["rank"])
+
+    def test_task_titles_are_unique(self):
+        # The graph is keyed by title, so a second "Build" would merge with the first.
+        with self.assertRaises(ValueError):
+            self.workspace.add_task("Plan", "Build", "", 4, "MEDIUM")
+        with self.assertRaises(ValueError):
+            self.workspace.edit_task("Plan", "Docs", "Build", None, 4, None)
+        self.assertEqual(self.workspace.get_task("Plan", "Docs")["title"], "Docs")
+        self.assertEqual(len(self.workspace.get_schedule("Plan")["tasks"]), 4)
+        self.assertMatchesFullSchedule()
+
+    def test_schedule_and_critical_path(self):
+        schedule = self.workspace.get_schedule("Plan")
+        self.assertEqual(schedule["duration_days"], 9)
+        self.assertEqual(schedule["critical_path"], ["Design", "Build", "Ship"])
+        self.assertEqual(schedule["tasks"]["Ship"]["start_day"], 8)
+        self.assertEqual(schedule["tasks"]["Docs"]["slack_days"], 6)
+        self.assertEqual(schedule["tasks"]["Build"]["blocked_by"], ["Design"])
+        self.assertMatchesFullSchedule()
+
+    def test_cycles_are_rejected(self):
+        with self.assertRaisesRegex(ValueError, "cycle: Design -> Build -> Ship -> Design"):
+            self.workspace.add_dependency("Plan", "Design", "Ship")
+        with self.assertRaises(ValueError):
+            self.workspace.add_dependency("Plan", "Ship", "Ship")
+        self.assertEqual(self.workspace.get_task("Plan", "Design")["blocked_by"], [])
+
+    def test_edits_reschedule_affected_tasks(self):
+        self.workspace.edit_task("Plan", "Docs", None, None, "10", None)
+        self.assertEqual(self.workspace.get_schedule("Plan")["critical_path"], ["Docs", "Ship"])
+        self.assertMatchesFullSchedule()
+
+        self.workspace.edit_task("Plan", "Build", "Implement", None, None, None)
+        self.assertEqual(self.workspace.get_task("Plan", "Ship")["blocked_by"], ["Implement", "Docs"])
+        self.workspace.remove_dependency("Plan", "Ship", "Docs")
+        self.workspace.delete_task("Plan", "Implement")
+        self.assertEqual(self.workspace.get_task("Plan", "Ship")["blocked_by"], [])
+        self.assertEqual(self.workspace.get_schedule("Plan")["duration_days"], 10)
+        self.assertMatchesFullSchedule()
+
+    def test_changes_only_touch_nearby_tasks(self):
+        tasks = [{"title": f"T{n}", "start_date": "2023-01-01", "end_date": "2023-01-02", "blocked_by": []} for n in range(200)]
+        tasks.append({"title": "Long", "start_date": "2023-01-01", "end_date": "2023-02-01", "blocked_by": []})
+        project = {"tasks": {"TODO": tasks}}
+        manager.schedule_project(project)
+        graph = project["schedule"]["graph"]
+        ranks = {title: node["rank"] for title, node in graph.items() if title != "Long"}
+        first, last = min(ranks, key=ranks.get), max(ranks, key=ranks.get)
+
+        # A dependency against the ranks swaps just the two tasks.
+        blocked = next(task for task in tasks if task["title"] == first)
+        blocked["blocked_by"].append(last)
+        self.assertLess(manager.schedule_project(project, [blocked]), 10)
+        self.assertEqual(project["schedule"]["tasks"][first][:2], [1, 2])
+        self.assertEqual([title for title in ranks if graph[title]["rank"] != ranks[title]], sorted([first, last], key=ranks.get))
+        self.assertLess(graph[last]["rank"], graph[first]["rank"])
+
+
+class TestUndo(unittest.TestCase):
+    def setUp(self):
+        self.user_file = "test_users.json"
+        self.data_file = "test_data.json"
+        self.workspace = Workspace(user_filename=self.user_file, data_filename=self.data_file)
+        self.workspace.create_user("owner", "password", True, "owner@example.com")
+        self.workspace.create_user("member", "password", True, "member@example.com")
+        self.workspace.create_project("Undo", "01/01/2023", "owner")
+        self.workspace._add_member("Undo", "member")
+        for title in ("A", "B", "C"):
+            self.workspace.add_task("Undo", title, "", 2, "LOW")
+        self.workspace.add_dependency("Undo", "C", "B")
+        self.workspace.history = manager.UndoHistory()
+
+    def tearDown(self):
+        for filename in (self.user_file, self.data_file, f"{self.data_file}.lock", f"{self.data_file}.changes", f"{self.data_file}.comments", f"{self.data_file}.undo"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def snapshot(self):
+        project = self.workspace.get_project("Undo")
+        # Undo may leave the schedule's graph ranked differently, but never its dates.
+        state = {key: project[key] for key in ("tasks", "members", "stats")}
+        state["schedule"] = {key: project["schedule"][key] for key in ("finish", "tasks")}
+        return json.loads(json.dumps(state))
+
+    def test_undo_and_redo(self):
+        start = self.snapshot()
+        self.workspace.move_task("Undo", "C", "DOING")
+        self.workspace.delete_task("Undo", "B")
+        self.workspace.remove_member_from_project("Undo", "member")
+        end = self.snapshot()
+        self.assertEqual([self.workspace.undo()["label"] for _ in range(3)], ["remove_member", "delete_task", "move_task"])
+        self.assertEqual(self.snapshot(), start)
+        with self.assertRaises(ValueError):
+            self.workspace.undo()
+        for _ in range(3):
+            self.workspace.redo()
+        self.assertEqual(self.snapshot(), end)
+
+        # A change made since blocks the undo and leaves everything as it was.
+        self.workspace.undo()
+        TaskManager(self.user_file, self.data_file).move_task("Undo", "C", "DONE")
+        with self.assertRaises(ValueError):
+            self.workspace.undo()
+        self.assertEqual(self.workspace.get_task("Undo", "C")["status"], "DONE")
+
+        # A new change drops what could be redone.
+        self.workspace.add_task("Undo", "D", "", 1, "LOW")
+        with self.assertRaises(ValueError):
+            self.workspace.redo()
+
+    def test_undo_delete_keeps_comments(self):
+        for text in ("First", "Second"):
+            self.workspace.add_comment("Undo", "A", text, "owner")
+        self.workspace.delete_task("Undo", "A")
+        self.workspace.undo()
+        self.assertEqual([comment["comment"] for comment in self.workspace.get_comments("Undo", "A")], ["First", "Second"])
+        self.assertEqual(self.workspace.get_task("Undo", "A")["comment_count"], 2)
+
+        self.workspace.redo()
+        self.assertEqual(self.workspace.comments.count(self.workspace.history.peek("undo")["tasks"][0]["id"]), 0)
+        self.workspace.undo()
+        self.assertEqual(len(TaskManager(self.user_file, self.data_file).get_comments("Undo", "A")), 2)
+
+    def test_undo_rebalanced_column(self):
+        # Split the same gap until a move has to renumber the whole column.
+        for i in range(100):
+            self.workspace.add_task("Undo", f"T{i}", "", 1, "LOW")
+            before = [task["title"] for task in self.workspace.get_project("Undo")["tasks"]["TODO"]]
+            self.workspace.move_task("Undo", f"T{i}", "TODO", 1)
+            if len(self.workspace.history.peek("undo")["tasks"]) > 1:
+                break
+        self.assertGreater(len(self.workspace.history.peek("undo")["tasks"]), 2)
+        self.workspace.undo()
+        self.assertEqual([task["title"] for task in self.workspace.get_project("Undo")["tasks"]["TODO"]], before)
+
+    def test_history_is_bounded_and_saved(self):
+        filename = f"{self.data_file}.undo"
+        self.workspace.history = manager.UndoHistory(limit=2, filename=filename)
+        for status in ("DOING", "DONE", "ARCHIVED"):
+            self.workspace.move_task("Undo", "A", status)
+        history = manager.UndoHistory(filename=filename)
+        self.assertEqual(len(history), 2)
+        self.workspace.history = history
+        self.workspace.undo()
+        self.workspace.undo()
+        self.assertEqual(self.workspace.get_task("Undo", "A")["status"], "DOING")
+        with self.assertRaises(ValueError):
+            self.workspace.undo()
+
+        history = manager.UndoHistory(max_bytes=1)
+        self.workspace.history = history
+        self.workspace.move_task("Undo", "A", "TODO")
+        self.assertEqual(len(history), 0)
+
+    def test_history_file_is_appended_to(self):
+        filename = f"{self.data_file}.undo"
+        history = manager.UndoHistory(limit=2, filename=filename)
+        self.workspace.history = history
+        for status in ("DOING", "DONE", "ARCHIVED"):
+            self.workspace.move_task("Undo", "A", status)
+        self.workspace.undo()
+        with open(filename) as f:
+            lines = [json.loads(line) for line in f]
+        # Three pushes, the last dropping the oldest entry, and an undo; nothing rewritten.
+        self.assertEqual([line.get("trim") for line in lines[:3]], [0, 0, 1])
+        self.assertEqual(lines[3], {"shift": "undo"})
+        self.assertEqual(history.sizes, {action: sum(map(len, stack)) for action, stack in history.stacks.items()})
+
+        loaded = manager.UndoHistory(filename=filename)
+        self.assertEqual(loaded.entries(), history.entries())
+        self.assertEqual(loaded.sizes, history.sizes)
+
+
+class TestBackups(unittest.TestCase):
+    def setUp(self):
+        self.user_file = "test_users.json"
+        self.data_file = "test_data.json"
+        self.workspace = Workspace(user_filename=self.user_file, data_filename=self.data_file)
+        self.workspace.create_user("owner", "password", True, "owner@example.com")
+        for title in ("One", "Two", "Three"):
+            self.workspace.create_project(title, "01/01/2023", "owner")
+            self.workspace.add_task(title, "Task", "", 1, "LOW")
+        self.workspace.add_comment("One", "Task", "First", "owner")
+
+    def tearDown(self):
+        for filename in (self.user_file, self.data_file, f"{self.data_file}.lock", f"{self.data_file}.changes", f"{self.data_file}.comments"):
+            if os.path.exists(filename):
+                os.remove(filename)
+        shutil.rmtree(f"{self.data_file}.backups", ignore_errors=True)
+
+    def test_backup_saves_only_changes(self):
+        first = self.workspace.backup()
+        self.assertEqual(first["written"]["chunks"], 6)
+        self.assertEqual(self.workspace.backup()["written"]["chunks"], 0)
+
+        self.workspace.move_task("Two", "Task", "DONE")
+        self.workspace.add_comment("One", "Task", "Second", "owner")
+        second = self.workspace.backup()
+        # Projects One (its comment count) and Two, and the new comment.
+        self.assertEqual(second["written"]["chunks"], 3)
+        self.assertEqual(second["users"], first["users"])
+        self.assertEqual(second["data"]["projects"][2], first["data"]["projects"][2])
+        self.assertEqual(len(second["comments"]["segments"]), 2)
+
+        # --full compares projects by content; only the comment store is saved again, as one chunk.
+        self.assertEqual(self.workspace.backup(full=True)["written"]["chunks"], 1)
+
+    def test_restore_at(self):
+        first = self.workspace.backup()
+        self.workspace.delete_task("Two", "Task")
+        self.workspace.add_comment("One", "Task", "Second", "owner")
+        self.workspace.create_user("other", "password", True, "other@example.com")
+        self.workspace.backup()
+        self.workspace.purge_data()
+        self.assertEqual(len(self.workspace.backups.list()), 3)
+
+        # The latest backup is the one purge_data took.
+        self.workspace.restore()
+        self.assertIsNone(self.workspace.get_task("Two", "Task"))
+        self.assertEqual(len(self.workspace.get_comments("One", "Task")), 2)
+
+        self.workspace.restore(datetime.fromisoformat(first["timestamp"]))
+        self.assertIsNotNone(self.workspace.get_task("Two", "Task"))
+        self.assertIsNone(self.workspace.get_user("other"))
+        self.assertEqual([comment["comment"] for comment in self.workspace.get_comments("One", "Task")], ["First"])
+        self.assertGreater(self.workspace.get_project_version("Two"), first["data"]["projects"][1]["version"])
+        with self.assertRaises(ValueError):
+            self.workspace.restore(datetime(2000, 1, 1))
+
+    def test_restore_in_a_batch(self):
+        self.workspace.backup()
+        with self.workspace.batch():
+            self.workspace.add_task("One", "Extra", "", 1, "LOW")
+            self.workspace.restore()
+            self.workspace.add_task("One", "After", "", 1, "LOW")
+        reader = Workspace(user_filename=self.user_file, data_filename=self.data_file)
+        self.assertIsNone(reader.get_task("One", "Extra"))
+        self.assertIsNotNone(reader.get_task("One", "After"))
+        # The task added before the restore made it into the backup restore took.
+        reader.restore()
+        self.assertIsNotNone(reader.get_task("One", "Extra"))
+
+    def test_purge_in_a_batch(self):
+        # The comment store is deleted right away, so the purge must not wait for the batch to commit.
+        with self.assertRaises(ValueError), self.workspace.batch():
+            self.workspace.add_task("One", "Extra", "", 1, "LOW")
+            self.workspace.purge_data()
+            raise ValueError("later command failed")
+        reader = Workspace(user_filename=self.user_file, data_filename=self.data_file)
+        self.assertEqual(reader.data["projects"], [])
+        self.assertIsNone(reader.get_user("owner"))
+        reader.restore()
+        self.assertIsNotNone(reader.get_task("One", "Extra"))
+
+    def test_migrated_comments_are_not_restored_twice(self):
+        task = self.workspace.get_task("Two", "Task")
+        del task["id"], task["comment_count"]
+        task["comments"] = [{"comment": "Old", "author": "owner", "timestamp": "2023-01-01T00:00:00"}]
+        self.workspace._save_data(self.workspace.data, self.data_file)
+        self.workspace.backup()
+        version = self.workspace.get_project_version("Two")
+
+        self.assertEqual(len(self.workspace.get_comments("Two", "Task")), 1)
+        self.assertEqual(self.workspace.get_project_version("Two"), version + 1)
+        self.assertEqual(self.workspace.get_changes("Two", version)[0]["op"], "migrate_comments")
+        self.workspace.backup()
+        self.workspace.restore()
+        self.assertEqual([comment["comment"] for comment in self.workspace.get_comments("Two", "Task")], ["Old"])
+
+    def test_retention(self):
+        self.workspace.backups.keep_last = 2
+        self.workspace.backups.keep_days = 0
+        for title in ("One", "Two", "Three"):
+            self.workspace.move_task(title, "Task", "DONE")
+            self.workspace.backup()
+        names = self.workspace.backups.list()
+        self.assertEqual(len(names), 2)
+        chunks = os.listdir(os.path.join(self.workspace.backups.directory, "chunks"))
+        # users, the rest of data.json, one comment segment, Three before and after its move and the other projects.
+        self.assertEqual(len(chunks), 7)
+        self.workspace.restore()
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.user_file = "test_users.json"
+        self.data_file = "test_data.json"
+        self.workspace = Workspace(user_filename=self.user_file, data_filename=self.data_file)
+        self.workspace.create_user("owner", "password", True, "owner@example.com")
+        for title in ("One", "Two"):
+            self.workspace.create_project(title, "01/01/2023", "owner")
+            self.workspace.add_task(title, "Task", "", 1, "LOW")
+        self.workspace.add_comment("One", "Task", "First", "owner")
+
+    def tearDown(self):
+        for filename in (self.user_file, self.data_file, f"{self.data_file}.lock", f"{self.data_file}.changes", f"{self.data_file}.comments", f"{self.data_file}.snapshot"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def test_snapshot_is_a_fixed_view(self):
+        snapshot = self.workspace.snapshot()
+        self.workspace.move_task("One", "Task", "DONE")
+        self.workspace.add_comment("One", "Task", "Second", "owner")
+        self.workspace.create_user("other", "password", True, "other@example.com")
+
+        self.assertEqual(snapshot.get_task("One", "Task")["status"], "TODO")
+        self.assertEqual([comment["comment"] for comment in snapshot.get_comments("One", "Task")], ["First"])
+        self.assertIsNone(snapshot.get_user("other"))
+        self.assertEqual([project["title"] for project in snapshot.get_projects_for_user("owner")], ["One", "Two"])
+        snapshot.get_project("Two")["title"] = "Changed"
+        self.assertIsNotNone(snapshot.get_project("Two"))
+
+        with self.workspace.snapshot() as latest:
+            self.assertEqual(latest.get_task("One", "Task")["status"], "DONE")
+            self.assertEqual(len(latest.get_comments("One", "Task")), 2)
+            self.assertGreater(latest.versions["One"], snapshot.versions["One"])
+            self.assertEqual(latest.versions["Two"], snapshot.versions["Two"])
+        snapshot.close()
+
+    def test_readers_share_one_snapshot(self):
+        with self.workspace.snapshot():
+            inode = os.stat(f"{self.data_file}.snapshot").st_ino
+        with manager.open_snapshot(self.user_file, self.data_file) as snapshot:
+            self.assertEqual(os.stat(f"{self.data_file}.snapshot").st_ino, inode)
+            self.assertEqual(snapshot.get_members(), ["owner"])
+
+
+class TestAttachments(unittest.TestCase):
+    def setUp(self):
+        self.user_file = "test_users.json"
+        self.data_file = "test_data.json"
+        self.upload = "test_upload.bin"
+        self.workspace = Workspace(user_filename=self.user_file, data_filename=self.data_file)
+        self.workspace.create_project("Website", "01/01/2023", "owner")
+        for title in ("One", "Two"):
+            self.workspace.add_task("Website", title, "", 1, "LOW")
+        with open(self.upload, "wb") as f:
+            f.write(os.urandom(3 << 20))
+
+    def tearDown(self):
+        for filename in (self.user_file, self.data_file, self.upload, f"{self.data_file}.lock", f"{self.data_file}.changes", f"{self.data_file}.comments"):
+            if os.path.exists(filename):
+                os.remove(filename)
+        for directory in (f"{self.data_file}.attachments", f"{self.data_file}.backups"):
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def test_attachments_are_deduplicated(self):
+        first = self.workspace.add_attachment("Website", "One", self.upload)
+        second = self.workspace.add_attachment("Website", "Two", self.upload, "copy.bin")
+        self.assertEqual(first["sha256"], second["sha256"])
+        self.assertEqual(first["size"], 3 << 20)
+        self.assertEqual(os.listdir(f"{self.data_file}.attachments"), [first["sha256"]])
+        self.assertLess(os.path.getsize(self.data_file), 10000)
+        with self.assertRaises(ValueError):
+            self.workspace.add_attachment("Website", "One", self.upload)
+
+        with open(self.upload, "rb") as f:
+            content = f.read()
+        mapped = self.workspace.open_attachment("Website", "Two", "copy.bin")
+        self.assertEqual(mapped[:], content)
+        mapped.close()
+        out = io.BytesIO()
+        self.workspace.export_attachment("Website", "One", "test_upload.bin", out)
+        self.assertEqual(out.getvalue(), content)
+
+    def test_gc_removes_unused_files(self):
+        digest = self.workspace.add_attachment("Website", "One", self.upload)["sha256"]
+        self.workspace.add_attachment("Website", "Two", self.upload)
+        self.workspace.remove_attachment("Website", "One", "test_upload.bin")
+        self.assertEqual(self.workspace.gc_attachments(0), (0, 0))
+
+        self.workspace.backup()
+        self.workspace.delete_task("Website", "Two")
+        # The backup still has the attachment, and younger files are kept anyway.
+        self.assertEqual(self.workspace.gc_attachments(0), (0, 0))
+        shutil.rmtree(f"{self.data_file}.backups")
+        self.assertEqual(self.workspace.gc_attachments(), (0, 0))
+        self.assertEqual(self.workspace.gc_attachments(0), (1, 3 << 20))
+        self.assertEqual(self.workspace.get_attachments("Website", "One"), [])
+        with self.assertRaises(ValueError):
+            self.workspace.add_attachment("Website", "Missing", self.upload)
+
+
+class TestSubtasks(unittest.TestCase):
+    def setUp(self):
+        self.user_file = "test_users.json"
+        self.data_file = "test_data.json"
+        self.workspace = Workspace(user_filename=self.user_file, data_filename=self.data_file)
+        self.workspace.create_project("Website", "01/01/2023", "owner")
+        self.workspace.add_task("Website", "Launch", "", 10, "HIGH")
+
+    def tearDown(self):
+        for filename in (self.user_file, self.data_file, f"{self.data_file}.lock", f"{self.data_file}.changes", f"{self.data_file}.comments"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def walk(self, items):
+        """
+        The rollup of items recomputed from scratch.
+        """
+        total = {"items": 0, "done": 0, "remaining": 0}
+        for item in items:
+            rollup = self.walk(item["subtasks"]) if item.get("subtasks") else {"items": 1, "done": int(item["done"]), "remaining": 0 if item["done"] else item["duration"]}
+            if item.get("subtasks"):
+                self.assertEqual(item["rollup"], rollup)
+            for key in total:
+                total[key] += rollup[key]
+        return total
+
+    def assert_rollups(self):
+        task = self.workspace.get_task("Website", "Launch")
+        self.assertEqual(task.get("rollup", {"items": 0, "done": 0, "remaining": 0}), self.walk(task.get("subtasks", [])))
+        project = self.workspace.get_project("Website")
+        self.assertEqual(project["stats"].get("checklist", {}), manager.project_stats(project).get("checklist", {}))
+
+    def test_rollups_follow_changes(self):
+        self.assertEqual(self.workspace.add_subtask("Website", "Launch", "Design", 2)["id"], "1")
+        self.workspace.add_subtask("Website", "Launch", "Build", 5)
+        self.assertEqual(self.workspace.add_subtask("Website", "Launch", "Mockups", 3, "1")["id"], "1.1")
+        self.workspace.add_subtask("Website", "Launch", "Review", 1, "1")
+        self.workspace.add_subtask("Website", "Launch", "Colours", 1, "1.1")
+        self.assert_rollups()
+        self.assertEqual(self.workspace.get_rollup("Website", "Launch"), {"items": 3, "done": 0, "percent": 0, "remaining_days": 7})
+
+        self.workspace.check_subtask("Website", "Launch", "1.2")
+        self.workspace.check_subtask("Website", "Launch", "1.1")
+        self.assert_rollups()
+        self.assertEqual(self.workspace.get_rollup("Website", "Launch", "1"), {"items": 2, "done": 2, "percent": 100, "remaining_days": 0})
+        self.assertEqual(self.workspace.get_project_stats("Website")["checklist"], {"items": 3, "done": 2, "percent": 67, "remaining_days": 5})
+
+        self.workspace.check_subtask("Website", "Launch", "1", False)
+        self.workspace.remove_subtask("Website", "Launch", "1.1.1")
+        self.assert_rollups()
+        # Mockups has no subtasks left, so it counts as an item again.
+        self.assertEqual(self.workspace.get_rollup("Website", "Launch", "1"), {"items": 2, "done": 0, "percent": 0, "remaining_days": 4})
+        self.assertEqual(self.workspace.add_subtask("Website", "Launch", "Deploy", 1)["id"], "3")
+
+        with self.assertRaises(ValueError):
+            self.workspace.check_subtask("Website", "Launch", "1.9")
+        self.workspace.remove_subtask("Website", "Launch", "1")
+        self.workspace.remove_subtask("Website", "Launch", "2")
+        self.workspace.remove_subtask("Website", "Launch", "3")
+        self.assert_rollups()
+        self.assertNotIn("subtasks", self.workspace.get_task("Website", "Launch"))
+
+    def test_undo_restores_rollups(self):
+        self.workspace.history = manager.UndoHistory()
+        self.workspace.add_subtask("Website", "Launch", "Design", 2)
+        self.workspace.check_subtask("Website", "Launch", "1")
+        self.workspace.undo()
+        self.assert_rollups()
+        self.assertEqual(self.workspace.get_project_stats("Website")["checklist"]["done"], 0)
+
+
+class TestDigest(unittest.TestCase):
+    def setUp(self):
+        self.user_file = "test_users.json"
+        self.data_file = "test_data.json"
+        self.output_dir = "test_digests"
+        self.workspace = Workspace(user_filename=self.user_file, data_filename=self.data_file)
+        for username in ("alice", "bob", "carol"):
+            self.workspace.create_user(username, "password", True, f"{username}@example.com")
+        self.workspace.update_user("carol", {"is_active": False})
+        for title in ("One", "Two"):
+            self.workspace.create_project(title, "01/01/2023", "alice")
+            self.workspace.add_task(title, "Soon", "", 1, "LOW")
+            self.workspace.add_task(title, "Later", "", 30, "LOW")
+            for username in ("alice", "carol"):
+                self.workspace.assignee_member(title, "Soon", username)
+        self.workspace.assignee_member("Two", "Later", "bob")
+        self.workspace.move_task("Two", "Later", "DOING")
+        self.workspace.add_comment("Two", "Later", "First", "alice")
+        self.workspace.add_comment("Two", "Later", "Second", "alice")
+
+    def tearDown(self):
+        for filename in (self.user_file, self.data_file, f"{self.data_file}.lock", f"{self.data_file}.changes", f"{self.data_file}.comments", f"{self.data_file}.snapshot"):
+            if os.path.exists(filename):
+                os.remove(filename)
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_digest_per_user(self):
+        from digest import generate_digests
+
+        summary = generate_digests(self.user_file, self.data_file, self.output_dir, ["markdown", "json"])
+        self.assertEqual(summary["users"], 2)
+        self.assertEqual(sorted(os.listdir(self.output_dir)), ["alice.json", "alice.md", "bob.json", "bob.md"])
+        with open(os.path.join(self.output_dir, "alice.json")) as f:
+            alice = json.load(f)
+        self.assertEqual([(item["project"], item["task"]) for item in alice["due"]], [("One", "Soon"), ("Two", "Soon")])
+        with open(os.path.join(self.output_dir, "bob.json")) as f:
+            bob = json.load(f)
+        self.assertEqual(bob["due"], [])
+        self.assertEqual([(item["from"], item["to"]) for item in bob["moved"]], [("TODO", "DOING")])
+        self.assertEqual(bob["comments"], [{"project": "Two", "task": "Later", "count": 2}])
+        with open(os.path.join(self.output_dir, "bob.md")) as f:
+            self.assertIn("- Later (Two): 2 new comments", f.read())
+
+        # Nothing happened within the last hour of a day later.
+        summary = generate_digests(self.user_file, self.data_file, self.output_dir, ["json"], 0, 1, now=datetime.now() + timedelta(days=1))
+        self.assertEqual(summary["events"], 0)
+        self.assertEqual(summary["users"], 1)
+
+    def test_feed_is_read_back_to_the_cutoff_only(self):
+        from digest import read_events
+
+        changes = f"{self.data_file}.changes"
+        with open(changes, "rb") as f:
+            recent = f.read()
+        # Older entries are never decoded, so damaged ones don't matter.
+        with open(changes, "wb") as f:
+            f.write(b'{"op": "move_task", "timestamp": "2000-01-01T00:00:00", broken\n' * 1000 + recent + b'{"op": "add_com')
+        events = read_events(changes, datetime.now() - timedelta(hours=1))
+        self.assertEqual(sorted(change["op"] for changes in events.values() for change in changes), ["add_comment", "add_comment", "move_task"])
+
+    def test_workers_match_single_process(self):
+        from digest import generate_digests
+
+        generate_digests(self.user_file, self.data_file, self.output_dir, ["json"])
+        single = {name: open(os.path.join(self.output_dir, name)).read() for name in os.listdir(self.output_dir)}
+        shutil.rmtree(self.output_dir)
+        generate_digests(self.user_file, self.data_file, self.output_dir, ["json"], workers=2)
+        parallel = {name: open(os.path.join(self.output_dir, name)).read() for name in os.listdir(self.output_dir)}
+        self.assertEqual(parallel, single)
+
+
+class TestNameIndex(unittest.TestCase):
+    def setUp(self):
+        self.user_file = "test_users.json"
+        self.data_file = "test_data.json"
+        self.workspace = Workspace(user_filename=self.user_file, data_filename=self.data_file)
+        self.workspace.create_project("Website", "01/01/2023", "owner")
+        for title in ("Login page", "Logout button", "Landing page", "Search"):
+            self.workspace.add_task("Website", title, "", 1, "LOW")
+
+    def tearDown(self):
+        for filename in (self.user_file, self.data_file, f"{self.data_file}.lock", f"{self.data_file}.changes", f"{self.data_file}.comments"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def test_prefix_index(self):
+        index = manager.PrefixIndex(["beta", "Alpha", "alphabet", "gamma"])
+        self.assertEqual(index.complete("ALP"), ["Alpha", "alphabet"])
+        self.assertEqual(index.complete("a", limit=1), ["Alpha"])
+        index.discard("Alpha")
+        index.add("alpine")
+        self.assertNotIn("Alpha", index)
+        self.assertEqual(index.complete("alp"), ["alphabet", "alpine"])
+        self.assertEqual(index.suggest("gmama"), ["gamma"])
+        self.assertEqual(index.suggest("bta"), ["beta"])
+        self.assertEqual(index.suggest("zzz"), [])
+
+    def test_index_follows_changes(self):
+        self.assertEqual(self.workspace.suggest("tasks", "lo", "Website"), ["Login page", "Logout button"])
+        self.workspace.edit_task("Website", "Login page", "Sign-in page", None, None, None)
+        self.workspace.delete_task("Website", "Search")
+        self.workspace.create_project("Docs", "01/01/2023", "owner")
+        self.assertNotIn("Login page", self.workspace.name_index("tasks", "Website"))
+        self.assertEqual(self.workspace.suggest("tasks", "Sing-in", "Website"), ["Sign-in page"])
+        self.assertIn("Docs", self.workspace.name_index("projects"))
+
+        # Changes made by another process are picked up too.
+        TaskManager(self.user_file, self.data_file).add_task("Website", "Logging", "", 1, "LOW")
+        self.assertEqual(self.workspace.suggest("tasks", "log", "Website"), ["Logging", "Logout button"])
+        rebuilt = manager.NameIndex(self.workspace.user_data, self.workspace.data)
+        self.assertEqual(self.workspace.name_index("tasks", "Website")._keys, rebuilt.get("tasks", "Website")._keys)
+
+
+class TestLogAnalysis(unittest.TestCase):
+    def test_analyze_log(self):
+        lines = [
+            "2024-01-01T00:00:00 INFO old-style line",
+            json.dumps({"level": "INFO", "op": "task.add", "duration_ms": 2.0}),
+            json.dumps({"level": "INFO", "op": "task.add", "duration_ms": 4.0}),
+            json.dumps({"level": "ERROR", "op": "task.add"}),
+            json.dumps({"level": "INFO", "op": "board.view", "duration_ms": 1.0, "sample": 0.1}),
+        ]
+        summary = analyze_log(lines)
+        self.assertEqual(summary["task.add"]["count"], 3)
+        self.assertEqual(summary["task.add"]["errors"], 1)
+        self.assertEqual(summary["task.add"]["mean_ms"], 3.0)
+        self.assertEqual(summary["task.add"]["max_ms"], 4.0)
+        self.assertEqual(summary["board.view"]["count"], 10)
+
+    def test_rotated_logs(self):
+        names = ["test_app.2024-01-02_00-00-00_000000.log", "test_app.2024-01-01_00-00-00_000000.log", "test_app.log"]
+        for name in names:
+            open(name, "w").close()
+        try:
+            self.assertEqual(manager.rotated_logs("test_app.log"), [names[1], names[0], names[2]])
+        finally:
+            for name in names:
+                os.remove(name)
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.stats_file = "test_stats.json"
+        self.enabled = manager.STATS_ENABLED
+        manager.STATS_ENABLED = True
+        manager._stats.clear()
+
+    def tearDown(self):
+        manager.STATS_ENABLED = self.enabled
+        manager._stats.clear()
+        for filename in (self.stats_file, f"{self.stats_file}.lock", "test_users.json", "test_data.json", "test_data.json.lock", "test_data.json.changes", "test_data.json.comments"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def test_instrumented_records_calls(self):
+        @manager.instrumented("test.op")
+        def op():
+            time.sleep(0.002)
+
+        op()
+        op()
+        with manager.timed("test.block"):
+            pass
+        summary = manager.summarize_stats(manager._stats)
+        self.assertEqual(summary["test.op"]["count"], 2)
+        self.assertGreaterEqual(summary["test.op"]["max_ms"], 2)
+        self.assertGreaterEqual(summary["test.op"]["p95_ms"], summary["test.op"]["p50_ms"])
+        self.assertEqual(summary["test.block"]["count"], 1)
+
+    def test_disabled_returns_original_function(self):
+        manager.STATS_ENABLED = False
+
+        def op():
+            pass
+
+        self.assertIs(manager.instrumented("test.op")(op), op)
+        self.assertIs(manager.timed("test.block"), manager._no_timer)
+
+    def test_dump_merges_into_stats_file(self):
+        manager.record_timing("test.op", 0.001)
+        manager.dump_stats(self.stats_file)
+        manager.dump_stats(self.stats_file)
+        with open(self.stats_file) as f:
+            self.assertEqual(json.load(f)["test.op"]["count"], 2)
+
+    def test_manager_methods_are_instrumented_when_enabled(self):
+        code = (
+            "from manager import UserManager; "
+            "m = UserManager('test_users.json', 'test_data.json'); "
+            "m.get_members(); m.get_user('nobody')"
+        )
+        env = dict(os.environ, TRELLOMIZE_STATS="1", TRELLOMIZE_STATS_FILE=self.stats_file)
+        subprocess.run([sys.executable, "-c", code], env=env, check=True)
+        with open(self.stats_file) as f:
+            stats = json.load(f)
+        self.assertEqual(stats["UserManager.get_members"]["count"], 1)
+        self.assertEqual(stats["UserManager.get_user"]["count"], 1)
+        self.assertIn("DataManager.reload_data", stats)
+
+
+class TestFixtureGenerator(unittest.TestCase):
+    def test_generate_workspace(self):
+        counts = manager.parse_status_counts("TODO=3,DONE=2")
+        user_data, data = manager.generate_workspace(10, 4, counts, comments=2, assignees=1, members=3)
+        self.assertEqual(len(user_data["users"]), 10)
+        self.assertEqual(len(data["projects"]), 4)
+        project = data["projects"][0]
+        self.assertEqual(len(project["tasks"]["TODO"]), 3)
+        self.assertEqual(len(project["tasks"]["DONE"]), 2)
+        self.assertFalse(project["tasks"]["BACKLOG"])
+        task = project["tasks"]["TODO"][0]
+        self.assertEqual(len(task["comments"]), 2)
+        self.assertEqual(len(task["assignees"]), 1)
+        members = [list(member)[0] for member in project["members"]]
+        self.assertIn(task["assignees"][0], members)
+        self.assertEqual(manager.generate_workspace(10, 4, counts, seed=1), manager.generate_workspace(10, 4, counts, seed=1))
+
+    def test_parse_status_counts(self):
+        self.assertEqual(manager.parse_status_counts("5"), {status: 5 for status in manager.TASK_STATUSES})
+        with self.assertRaises(ValueError):
+            manager.parse_status_counts("NOPE=1")
+
+
+class TestColumnar(unittest.TestCase):
+    def setUp(self):
+        self.data_file = "test_data.json"
+        _, self.data = manager.generate_workspace(20, 3, manager.parse_status_counts("TODO=5,DOING=3,DONE=4"), comments=1, assignees=2)
+        DataManager("test_users.json", self.data_file)._write_data(self.data, self.data_file)
+
+    def tearDown(self):
+        for filename in (self.data_file, f"{self.data_file}.columns"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def backends(self):
+        """
+        Yields once per columns backend: numpy when it is installed, then the array fallback.
+        """
+        import columnar
+        if columnar.np is not None:
+            with self.subTest(backend="numpy"):
+                yield columnar
+        with self.subTest(backend="array"), mock.patch.object(columnar, "np", None):
+            yield columnar
+
+    def test_reports_match_the_tasks(self):
+        for columnar in self.backends():
+            columns = columnar.build_columns(self.data)
+            self.assertEqual(len(columns), 36)
+            for project in self.data["projects"]:
+                expected = {status: len(project["tasks"][status]) for status in manager.TASK_STATUSES}
+                self.assertEqual(columnar.status_counts(columns)[project["title"]], expected)
+
+            finished = {}
+            for project in self.data["projects"]:
+                for task in project["tasks"]["DONE"]:
+                    for username in task["assignees"]:
+                        finished[username] = finished.get(username, 0) + 1
+            throughput = columnar.throughput_by_assignee(columns)
+            self.assertEqual({name: row["done"] for name, row in throughput.items() if row["done"]}, finished)
+            self.assertEqual(columnar.cycle_times(columns)["all"]["count"], 12)
+            self.assertEqual(sum(columnar.duration_histogram(columns).values()), 36)
+            self.assertEqual(sum(columnar.completed_per_week(columns).values()), 12)
+
+    def test_backends_give_the_same_report(self):
+        reports = []
+        for columnar in self.backends():
+            report = columnar.task_report(columnar.build_columns(self.data))
+            report.pop("backend")
+            reports.append(json.loads(json.dumps(report, default=int)))
+        self.assertEqual(reports[0], reports[-1])
+
+    def test_snapshot_is_mapped_until_the_data_changes(self):
+        for columnar in self.backends():
+            if os.path.exists(f"{self.data_file}.columns"):
+                os.remove(f"{self.data_file}.columns")
+            built = columnar.load_columns(self.data_file)
+            self.assertIsNone(built.mapped)
+            mapped = columnar.load_columns(self.data_file)
+            self.assertIsNotNone(mapped.mapped)
+            self.assertEqual(columnar.task_report(mapped), columnar.task_report(built))
+
+        data = json.loads(json.dumps(self.data))
+        data["projects"].pop()
+        time.sleep(0.01)
+        DataManager("test_users.json", self.data_file)._write_data(data, self.data_file)
+        for rebuild, columnar in enumerate(self.backends()):
+            rebuilt = columnar.load_columns(self.data_file)
+            if rebuild == 0:
+                self.assertIsNone(rebuilt.mapped)
+            self.assertEqual(len(rebuilt.projects), 2)
+
+
+class TestProfileMemory(unittest.TestCase):
+    def setUp(self):
+        self.user_file = "test_users.json"
+        self.data_file = "test_data.json"
+        user_data, data = manager.generate_workspace(5, 3, manager.parse_status_counts("TODO=4,DONE=2"), comments=2)
+        writer = DataManager(self.user_file, self.data_file)
+        writer._write_data(user_data, self.user_file)
+        writer._write_data(data, self.data_file)
+
+    def tearDown(self):
+        for filename in (self.user_file, self.data_file, f"{self.data_file}.changes", f"{self.data_file}.comments"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def test_profile_memory(self):
+        report = manager.profile_memory(self.user_file, self.data_file)
+        self.assertEqual(report["users"]["count"], 5)
+        self.assertEqual(len(report["projects"]), 3)
+        project = report["projects"][0]
+        self.assertEqual(project["tasks"]["TODO"]["count"], 4)
+        self.assertEqual(project["comments"]["count"], 12)
+        self.assertGreater(project["tasks"]["TODO"]["resident_bytes"], project["tasks"]["DONE"]["resident_bytes"])
+        self.assertGreater(project["resident_bytes"], project["comments"]["resident_bytes"])
+        # Per-project disk bytes add up to data.json apart from the enclosing object and separators.
+        disk_total = sum(project["disk_bytes"] for project in report["projects"])
+        self.assertLess(report["files"]["data_bytes"] - disk_total, 50)
+        self.assertGreaterEqual(report["files"]["data_bytes"], disk_total)
+
+
+class TestLoadgen(unittest.TestCase):
+    def test_replay_loses_no_updates(self):
+        import loadgen
+        import tempfile
+
+        # The managers take the lock for every write themselves.
+        records = loadgen.generate_workload(120, projects=1, tasks_per_status=3, users=5)
+        with tempfile.TemporaryDirectory() as directory:
+            user_file, data_file = loadgen.write_fixture(directory, users=5, projects=1, tasks_per_status=3)
+            report = loadgen.replay(records, user_file, data_file, workers=4)
+            with open(f"{data_file}.changes") as f:
+                versions = [json.loads(line)["version"] for line in f]
+        self.assertEqual(report["operations"], 120)
+        self.assertEqual(report["lost_updates"]["total"], 0)
+        self.assertEqual(sorted(versions), list(range(versions[0], versions[0] + len(versions))))
+        self.assertEqual(report["lock_contention"]["writes"], sum(record["op"] not in loadgen.READ_OPS for record in records))
+
+    def test_lock_wait_is_measured(self):
+        import loadgen
+        import tempfile
+        import threading
+
+        records = [{"op": "add_task", "args": ["Project 0", "Waiting", "", 1, "LOW"]}]
+        with tempfile.TemporaryDirectory() as directory:
+            user_file, data_file = loadgen.write_fixture(directory, users=2, projects=1, tasks_per_status=1)
+            holder = DataManager(user_file, data_file)
+            locked, release = threading.Event(), threading.Event()
+
+            def hold():
+                with holder.locked():
+                    locked.set()
+                    release.wait()
+
+            thread = threading.Thread(target=hold)
+            thread.start()
+            locked.wait()
+            threading.Timer(0.1, release.set).start()
+            result, = loadgen.run_worker((user_file, data_file, records))
+            thread.join()
+        self.assertIsNone(result["error"])
+        self.assertGreaterEqual(result["lock_wait_ms"], 50)
+
+
+class TestScreen(unittest.TestCase):
+    def setUp(self):
+        import main
+        self.out = io.StringIO()
+        self.screen = main.Screen(self.out)
+        self.console = main._setup_console(file=self.screen, force_terminal=True, width=40, height=10)
+
+    def test_only_changed_lines_are_written(self):
+        self.assertEqual(self.screen.draw(self.console, ["a", "b", "c"]), 3)
+        self.assertEqual(self.screen.draw(self.console, ["a", "b", "c"]), 0)
+        self.assertEqual(self.screen.draw(self.console, ["a", "x", "c"]), 1)
+        self.assertIn("\x1b[2;1Hx", self.out.getvalue())
+
+    def test_full_redraw_after_scroll_or_clear(self):
+        self.screen.draw(self.console, ["a", "b"])
+        self.console.print("\n" * 8)
+        self.assertEqual(self.screen.draw(self.console, ["a", "b"]), 2)
+        self.console.clear()
+        self.assertEqual(self.screen.draw(self.console, ["a", "b"]), 2)
+        self.console.print("message")
+        self.assertEqual(self.screen.draw(self.console, ["a", "b"]), 0)
+
+
+class TestStartup(unittest.TestCase):
+    def test_import_defers_heavy_modules(self):
+        code = "import sys, main, manager; print(sorted(m for m in ('bcrypt', 'rich', 'loguru', 'asyncio') if m in sys.modules))"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "[]")
+        self.assertFalse(hasattr(__import__("manager"), "parser"))
+
+
+class TestAsyncManagers(unittest.IsolatedAsyncioTestCase):
+    clients = 8
+
+    def setUp(self):
+        self.user_file = "test_users.json"
+        self.data_file = "test_data.json"
+        self.project_manager = ProjectManager(user_filename=self.user_file, data_filename=self.data_file)
+        self.project_manager.data = {"projects": []}
+        self.project_manager._save_data(self.project_manager.data, self.data_file)
+        self.user_manager = AsyncUserManager(user_filename=self.user_file, data_filename=self.data_file)
+        self.async_project_manager = AsyncProjectManager(user_filename=self.user_file, data_filename=self.data_file)
+        self.task_manager = AsyncTaskManager(user_filename=self.user_file, data_filename=self.data_file)
+
+    def tearDown(self):
+        for filename in (self.user_file, self.data_file, f"{self.data_file}.lock", f"{self.data_file}.changes", f"{self.data_file}.comments"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    async def _max_loop_lag(self, work):
+        """Runs work while a heartbeat measures how long the loop was unable to run it."""
+        lag = 0.0
+        done = asyncio.Event()
+
+        async def heartbeat():
+            nonlocal lag
+            while not done.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lag = max(lag, time.perf_counter() - start - 0.005)
+
+        beat = asyncio.create_task(heartbeat())
+        try:
+            result = await work
+        finally:
+            done.set()
+            await beat
+        return result, lag
+
+    async def test_concurrent_clients_do_not_block_loop(self):
+        async def client(n):
+            username = f"user{n}"
+            await self.user_manager.create_user(username, "password", True, f"{username}@example.com")
+            await self.async_project_manager.create_project(f"Project{n}", "01/01/2023", username)
+            await self.task_manager.add_task(f"Project{n}", "Task", "Description", 2, "HIGH")
+            return await self.user_manager.get_user(username)
+
+        users, lag = await self._max_loop_lag(asyncio.gather(*(client(n) for n in range(self.clients))))
+        self.assertEqual(len(users), self.clients)
+        self.assertTrue(all(users))
+        self.assertLess(lag, 0.1)
+        self.assertEqual(len(self.project_manager.list_projects()), self.clients)
+
+    async def test_concurrent_writes_to_one_project_are_not_lost(self):
+        await self.async_project_manager.create_project("Shared", "01/01/2023", "owner")
+        await asyncio.gather(*(
+            self.task_manager.add_task("Shared", f"Task{n}", "", 1, "LOW") for n in range(self.clients)
+        ))
+        tasks = await self.task_manager.get_tasks_for_project("Shared")
+        self.assertEqual(sorted(task["title"] for task in tasks), sorted(f"Task{n}" for n in range(self.clients)))
+
+    async def test_authenticate_and_schedule(self):
+        await self.user_manager.create_user("owner", "password", True, "owner@example.com")
+        user, lag = await self._max_loop_lag(self.user_manager.authenticate("owner", "password"))
+        self.assertEqual(user["username"], "owner")
+        with self.assertRaises(ValueError):
+            await self.user_manager.authenticate("owner", "wrong")
+
+        await self.async_project_manager.create_project("Plan", "01/01/2023", "owner")
+        await self.task_manager.add_task("Plan", "Design", "", 3, "LOW")
+        await self.task_manager.add_task("Plan", "Build", "", 5, "LOW")
+        await self.task_manager.add_dependency("Plan", "Build", "Design")
+        schedule = await self.task_manager.get_schedule("Plan")
+        self.assertEqual(schedule["critical_path"], ["Design", "Build"])
+
+
+class TestAsyncManagerLoops(unittest.TestCase):
+    def tearDown(self):
+        for filename in ("test_users.json", "test_data.json", "test_data.json.lock", "test_data.json.changes", "test_data.json.comments"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+    def test_manager_outlives_its_event_loop(self):
+        project_manager = AsyncProjectManager(user_filename="test_users.json", data_filename="test_data.json")
+        task_manager = AsyncTaskManager(user_filename="test_users.json", data_filename="test_data.json")
+
+        async def add_tasks(run):
+            # Contended writes make the project's lock wait on the loop that is running.
+            await asyncio.gather(*(task_manager.add_task("Shared", f"Task{run}-{n}", "", 1, "LOW") for n in range(4)))
+
+        asyncio.run(project_manager.create_project("Shared", "01/01/2023", "owner"))
+        for run in range(2):
+            asyncio.run(add_tasks(run))
+        tasks = asyncio.run(task_manager.get_tasks_for_project("Shared"))
+        self.assertEqual(len(tasks), 8)
+
 
 if __name__ == "__main__":
     unittest.main()